@@ -0,0 +1,3 @@
+"""
+Micro-benchmarks for the backend (see benchmarks/run.py).
+"""
@@ -0,0 +1,114 @@
+"""
+Contact profiles and model outputs used by the benchmarks.
+
+Each size is a (contact, extraction) pair built deterministically from a
+seed, so runs are comparable:
+- small: a freshly created contact after a couple of chats
+- medium: a contact that has been chatted about for months
+- pathological: thousands of interests and topics and thousands of
+  personality notes, the worst case of profile growth
+
+Personality text is stored as merges leave it: de-duplicated and capped at
+PROFILE_TEXT_MAX_CHARS (db/profileText.py).
+"""
+import json
+import random
+from typing import Any, Dict, List
+
+from db.profileText import append_profile_text
+
+WORDS = [
+    "hiking", "jazz", "chess", "cooking", "football", "photography", "travel",
+    "gardening", "cycling", "painting", "reading", "yoga", "climbing", "movies",
+    "guitar", "baking", "surfing", "running", "sushi", "poetry", "board games",
+    "astronomy", "coffee", "wine", "podcasts", "skiing", "tennis", "knitting",
+]
+
+SIZES = {
+    # interests, topics, dates, likes, personality paragraphs, extracted interests, extracted likes
+    "small": dict(interests=3, topics=2, dates=1, likes=2, paragraphs=1, new_interests=2, new_likes=2),
+    "medium": dict(interests=50, topics=30, dates=10, likes=40, paragraphs=25, new_interests=30, new_likes=30),
+    "pathological": dict(interests=3000, topics=1000, dates=200, likes=3000, paragraphs=2500,
+                         new_interests=2000, new_likes=2000),
+}
+
+
+def _items(rng: random.Random, count: int) -> List[str]:
+    """count distinct interest-like strings"""
+    return [f"{rng.choice(WORDS)} {i}" for i in range(count)]
+
+
+def _personality(rng: random.Random, paragraphs: int) -> str:
+    """Personality text as it grows from appended extraction results"""
+    return "\n\n".join(
+        f"Seems {rng.choice(['calm', 'curious', 'funny', 'thoughtful'])} and enjoys "
+        f"{rng.choice(WORDS)}; mentioned {rng.choice(WORDS)} and {rng.choice(WORDS)} "
+        f"when we talked about {rng.choice(WORDS)} last time."
+        for _ in range(paragraphs)
+    )
+
+
+def build_profile(size: str, seed: int = 42) -> Dict[str, Any]:
+    """
+    Build the benchmark inputs for one profile size.
+
+    Args:
+        size: "small", "medium" or "pathological"
+        seed: Random seed
+
+    Returns:
+        Dictionary with the stored contact, the extracted data, the raw model
+        output it was parsed from and a user message
+    """
+    spec = SIZES[size]
+    rng = random.Random(seed)
+
+    interests = _items(rng, spec["interests"])
+    contact = {
+        "id": "00000000-0000-0000-0000-000000000001",
+        "name": "Alice Example",
+        "nickname": "Ali",
+        "relationship_type": "friend",
+        "relationship_strength": 4,
+        "recommended_contact_freq_days": 14,
+        "last_connection": "2025-01-15T12:00:00+00:00",
+        "interests": interests,
+        "conversation_topics": _items(rng, spec["topics"]),
+        "important_dates": [
+            {"date": f"2025-{(i % 12) + 1:02d}-{(i % 28) + 1:02d}", "description": f"event {i}"}
+            for i in range(spec["dates"])
+        ],
+        "preferences": {
+            "likes": interests[: spec["likes"] // 2] + _items(rng, spec["likes"] - spec["likes"] // 2),
+            "dislikes": _items(rng, max(1, spec["likes"] // 10)),
+        },
+        "family_details": "Has a sister in Lisbon and a dog named Max.",
+        "personality": append_profile_text(_personality(rng, spec["paragraphs"]), None),
+    }
+
+    # Half of the extracted values overlap with what is already stored
+    new_interests = interests[: spec["new_interests"] // 2] + _items(rng, spec["new_interests"] - spec["new_interests"] // 2)
+    extraction = {
+        "interests": new_interests,
+        "preferences": {
+            "likes": new_interests[: spec["new_likes"] // 2] + _items(rng, spec["new_likes"] - spec["new_likes"] // 2),
+            "dislikes": _items(rng, max(1, spec["new_likes"] // 10)),
+        },
+        "conversation_topics": _items(rng, max(1, spec["new_interests"] // 4)),
+        "important_dates": contact["important_dates"][:1] + [{"date": "2025-06-01", "description": "moving house"}],
+        "personality": "Seems excited about the new job.",
+        "last_connection": "yesterday",
+    }
+
+    raw_response = (
+        "Here is the extracted information:\n```json\n"
+        + json.dumps(extraction, indent=2)
+        + "\n```"
+    )
+
+    return {
+        "contact": contact,
+        "extraction": extraction,
+        "raw_response": raw_response,
+        "message": "We went hiking last weekend and she told me she's starting a new job in June.",
+    }
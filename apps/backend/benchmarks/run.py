@@ -0,0 +1,205 @@
+"""
+Micro-benchmarks for the CPU-side stages of a chat turn.
+
+Times each stage on small, medium and pathological profiles (see
+benchmarks/profiles.py), compares the results with the stored baseline and
+exits with status 1 if any stage got slower than the allowed threshold.
+
+Usage (from apps/backend):
+    python -m benchmarks.run                     # compare with baseline.json
+    python -m benchmarks.run --update-baseline   # record a new baseline
+    python -m benchmarks.run --filter normalize  # only matching benchmarks
+
+Baselines are machine-specific: record them on the machine that runs the
+comparison.
+"""
+import argparse
+import copy
+import io
+import json
+import platform
+import sys
+import time
+from contextlib import redirect_stdout
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from benchmarks.profiles import SIZES, build_profile
+
+BASELINE_PATH = Path(__file__).parent / "baseline.json"
+DEFAULT_THRESHOLD = 1.5
+MIN_BATCH_SECONDS = 0.05
+REPEATS = 5
+
+# A benchmark is (name, make_call) where make_call(inputs) returns
+# (fn, make_args, mutates): fn(*make_args()) is the timed call, and mutating
+# calls get a fresh copy of their arguments for every iteration.
+Benchmark = Tuple[str, Callable[[Dict[str, Any]], Tuple[Callable, Callable[[], tuple], bool]]]
+
+
+def _benchmarks() -> List[Benchmark]:
+    """The chat-turn stages to measure"""
+    # Imported here so the services' startup output doesn't mix with the report
+    with redirect_stdout(io.StringIO()):
+        from services.utils import clean_json_response, normalize_extracted_data
+        from services.chatService import ChatService
+        from services.contactService import ContactService
+        from services.extractionFilter import extraction_filter
+        from db.profileMerge import merge_profile
+        chat = ChatService(ContactService)
+
+    def conversation_prompt(contact: Dict, message: str) -> str:
+        # Prompt assembly as done by GeminiClient.handle_conversation, with the prefix sent inline
+        prefix = chat.client._static_prefix("chat")
+        return f"{prefix}\n\n{chat.client._build_conversation_prompt(contact, message)}"
+
+    normalized = lambda inputs: normalize_extracted_data(copy.deepcopy(inputs["extraction"]))
+
+    return [
+        ("clean_json_response",
+         lambda i: (clean_json_response, lambda: (i["raw_response"],), False)),
+        ("normalize_extracted_data",
+         lambda i: (normalize_extracted_data, lambda: (copy.deepcopy(i["extraction"]),), True)),
+        ("conversation_prompt",
+         lambda i: (conversation_prompt, lambda: (i["contact"], i["message"]), False)),
+        ("extraction_filter",
+         lambda i: (extraction_filter.classify, lambda: (i["message"],), False)),
+        ("profile_completeness",
+         lambda i: (chat._calculate_profile_completeness, lambda: (i["contact"],), False)),
+        ("build_profile_patch",
+         lambda i: (chat._build_profile_patch, lambda n=normalized(i): (n,), False)),
+        ("merge_profile",
+         lambda i: (merge_profile, lambda p=chat._build_profile_patch(normalized(i)): (i["contact"], p), False)),
+    ]
+
+
+def _time_call(fn: Callable, make_args: Callable[[], tuple], mutates: bool) -> float:
+    """Best time per call in seconds over REPEATS batches"""
+    def run_batch(number: int) -> float:
+        if mutates:
+            batch = [make_args() for _ in range(number)]
+        else:
+            args = make_args()
+            batch = [args] * number
+        with redirect_stdout(io.StringIO()):
+            start = time.perf_counter()
+            for args in batch:
+                fn(*args)
+            return time.perf_counter() - start
+
+    # Grow the batch until it runs long enough to time reliably
+    number = 1
+    while True:
+        elapsed = run_batch(number)
+        if elapsed >= MIN_BATCH_SECONDS:
+            break
+        number *= 10 if elapsed < MIN_BATCH_SECONDS / 10 else 2
+
+    best = elapsed / number
+    for _ in range(REPEATS - 1):
+        best = min(best, run_batch(number) / number)
+    return best
+
+
+def run(name_filter: Optional[str] = None) -> Dict[str, float]:
+    """
+    Run the benchmarks.
+
+    Args:
+        name_filter: Only run benchmarks whose "size/stage" name contains this
+
+    Returns:
+        Seconds per call keyed by "size/stage"
+    """
+    benchmarks = _benchmarks()
+    results = {}
+    for size in SIZES:
+        inputs = build_profile(size)
+        for stage, make_call in benchmarks:
+            name = f"{size}/{stage}"
+            if name_filter and name_filter not in name:
+                continue
+            results[name] = _time_call(*make_call(inputs))
+    return results
+
+
+def _format_time(seconds: float) -> str:
+    if seconds >= 1e-3:
+        return f"{seconds * 1e3:9.2f} ms"
+    return f"{seconds * 1e6:9.2f} us"
+
+
+def compare(results: Dict[str, float], baseline: Dict[str, float], threshold: float) -> List[str]:
+    """
+    Print the results next to the baseline.
+
+    Args:
+        results: Seconds per call keyed by "size/stage"
+        baseline: Baseline seconds per call keyed by "size/stage"
+        threshold: Slowdown ratio that counts as a regression
+
+    Returns:
+        Names of the benchmarks that regressed
+    """
+    regressions = []
+    print(f"{'benchmark':45} {'time':>12} {'baseline':>12} {'ratio':>7}")
+    for name, seconds in results.items():
+        base = baseline.get(name)
+        if base:
+            ratio = seconds / base
+            flag = ""
+            if ratio > threshold:
+                flag = "  REGRESSION"
+                regressions.append(name)
+            elif ratio < 1 / threshold:
+                flag = "  improved"
+            print(f"{name:45} {_format_time(seconds)} {_format_time(base)} {ratio:6.2f}x{flag}")
+        else:
+            print(f"{name:45} {_format_time(seconds)} {'-':>12}")
+
+    # CPU spent on these stages per chat turn, per profile size
+    print()
+    for size in SIZES:
+        total = sum(s for n, s in results.items() if n.startswith(f"{size}/"))
+        if total:
+            print(f"{size + ' total per chat turn':45} {_format_time(total)}")
+    return regressions
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Chat hot path micro-benchmarks")
+    parser.add_argument("--update-baseline", action="store_true",
+                        help="store the results as the new baseline")
+    parser.add_argument("--threshold", type=float, default=DEFAULT_THRESHOLD,
+                        help=f"slowdown ratio flagged as a regression (default {DEFAULT_THRESHOLD})")
+    parser.add_argument("--filter", dest="name_filter",
+                        help="only run benchmarks whose name contains this text")
+    parser.add_argument("--baseline", type=Path, default=BASELINE_PATH,
+                        help="baseline file (default benchmarks/baseline.json)")
+    args = parser.parse_args(argv)
+
+    results = run(args.name_filter)
+
+    stored = json.loads(args.baseline.read_text()) if args.baseline.exists() else {}
+    regressions = compare(results, stored.get("results", {}), args.threshold)
+
+    if args.update_baseline:
+        merged = {**stored.get("results", {}), **results}
+        args.baseline.write_text(json.dumps({
+            "recorded_at": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+            "python": platform.python_version(),
+            "machine": f"{platform.system()} {platform.machine()}",
+            "results": merged,
+        }, indent=2) + "\n")
+        print(f"\nBaseline written to {args.baseline}")
+        return 0
+
+    if regressions:
+        print(f"\n{len(regressions)} regression(s) over {args.threshold}x: {', '.join(regressions)}")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
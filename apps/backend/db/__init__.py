@@ -3,4 +3,10 @@ DB package for Lazor Connect API.
 This module exports all db configurations.
 """
 
-from db.supabase import supabase
\ No newline at end of file
+from db.supabase import get_supabase, get_async_supabase
+from db.contactRepository import (
+    ContactRepository,
+    create_contact_repository,
+    get_contact_repository,
+    set_contact_repository,
+)
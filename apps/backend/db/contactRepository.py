@@ -0,0 +1,242 @@
+"""
+Contact repository interface for Lazor Connect API.
+
+ContactService reads and writes contacts through a ContactRepository, so the
+storage backend can be swapped without touching the service:
+- "supabase": Supabase/PostgREST (default)
+- "sqlite": embedded SQLite database, for single-node deployments and
+  offline testing and benchmarking
+
+The backend is chosen with CONTACT_STORE; SQLITE_PATH sets the SQLite file
+(relative to apps/backend, whatever the working directory).
+"""
+import os
+import threading
+from abc import ABC, abstractmethod
+from typing import Any, Dict, List, Optional, Tuple
+
+from dotenv import load_dotenv
+
+from services.utils import resolve_data_path
+
+load_dotenv()
+
+CONTACT_STORE = os.getenv("CONTACT_STORE", "supabase")
+SQLITE_PATH = resolve_data_path(os.getenv("SQLITE_PATH", "lazor.db"))
+
+
+class ContactRepository(ABC):
+    """
+    Storage operations for contacts.
+
+    Contacts are plain dictionaries with the columns of the contacts table.
+    Every operation has a blocking version and an async version (prefixed
+    with "a"), mirroring ContactService.
+    """
+
+    @abstractmethod
+    def list_contacts(self,
+                      search: Optional[str] = None,
+                      relationship_type: Optional[str] = None,
+                      relationship_strength: Optional[int] = None,
+                      min_strength: Optional[int] = None,
+                      limit: int = 50,
+                      after: Optional[Tuple[str, str]] = None) -> List[Dict]:
+        """
+        List contacts sorted by (name, id)
+
+        Args:
+            search: Case-insensitive substring of the name
+            relationship_type: Exact relationship type
+            relationship_strength: Exact relationship strength
+            min_strength: Minimum relationship strength
+            limit: Maximum number of rows to return
+            after: (name, id) of the last row of the previous page
+
+        Returns:
+            Up to limit contacts that sort strictly after `after`
+        """
+
+    @abstractmethod
+    async def alist_contacts(self,
+                             search: Optional[str] = None,
+                             relationship_type: Optional[str] = None,
+                             relationship_strength: Optional[int] = None,
+                             min_strength: Optional[int] = None,
+                             limit: int = 50,
+                             after: Optional[Tuple[str, str]] = None) -> List[Dict]:
+        """Async version of list_contacts"""
+
+    @abstractmethod
+    def get_contact(self, contact_id: str) -> Optional[Dict]:
+        """Get a contact by id, or None if it doesn't exist"""
+
+    @abstractmethod
+    async def aget_contact(self, contact_id: str) -> Optional[Dict]:
+        """Async version of get_contact"""
+
+    @abstractmethod
+    def create_contact(self, payload: Dict) -> Dict:
+        """Insert a contact and return the stored row"""
+
+    @abstractmethod
+    async def acreate_contact(self, payload: Dict) -> Dict:
+        """Async version of create_contact"""
+
+    @abstractmethod
+    def create_contacts(self, payloads: List[Dict]) -> List[Dict]:
+        """Insert many contacts with one database call and return the stored rows in order"""
+
+    @abstractmethod
+    async def acreate_contacts(self, payloads: List[Dict]) -> List[Dict]:
+        """Async version of create_contacts"""
+
+    @abstractmethod
+    def update_contact(self, contact_id: str, data: Dict) -> Optional[Dict]:
+        """Overwrite the given fields of a contact; returns the stored row or None"""
+
+    @abstractmethod
+    async def aupdate_contact(self, contact_id: str, data: Dict) -> Optional[Dict]:
+        """Async version of update_contact"""
+
+    @abstractmethod
+    def update_contact_if_unchanged(self, contact_id: str, data: Dict, updated_at: str) -> Optional[Dict]:
+        """
+        Overwrite the given fields of a contact unless it was written since it was read
+
+        Args:
+            contact_id: The contact to update
+            data: The fields to overwrite
+            updated_at: The contact's updated_at as read
+
+        Returns:
+            The stored row, or None if the contact doesn't exist or its updated_at has changed
+        """
+
+    @abstractmethod
+    async def aupdate_contact_if_unchanged(self, contact_id: str, data: Dict, updated_at: str) -> Optional[Dict]:
+        """Async version of update_contact_if_unchanged"""
+
+    @abstractmethod
+    def merge_contact_profile(self, contact_id: str, patch: Dict) -> Optional[Dict]:
+        """
+        Atomically merge extracted profile data into a contact
+
+        List fields are unioned with the stored values, important_dates are
+        de-duplicated by (date, description), personality is appended sentence
+        by sentence without repeats and capped (see db/profileText.py) and any
+        other field overwrites the stored value
+        (see db/migrations/001_merge_contact_profile.sql and 004).
+
+        Returns:
+            The updated contact, or None if it doesn't exist
+        """
+
+    @abstractmethod
+    async def amerge_contact_profile(self, contact_id: str, patch: Dict) -> Optional[Dict]:
+        """Async version of merge_contact_profile"""
+
+    @abstractmethod
+    def merge_contact_profiles(self, patches: Dict[str, Dict]) -> Dict[str, Optional[Dict]]:
+        """
+        Merge profile data into many contacts with one database call
+
+        Every patch is merged with the rules of merge_contact_profile
+        (see db/migrations/005_merge_contact_profiles.sql).
+
+        Args:
+            patches: Profile patch per contact id
+
+        Returns:
+            The updated contact per contact id, None for contacts that don't exist
+        """
+
+    @abstractmethod
+    async def amerge_contact_profiles(self, patches: Dict[str, Dict]) -> Dict[str, Optional[Dict]]:
+        """Async version of merge_contact_profiles"""
+
+    @abstractmethod
+    def delete_contact(self, contact_id: str) -> bool:
+        """Delete a contact; returns whether a row was deleted"""
+
+    @abstractmethod
+    async def adelete_contact(self, contact_id: str) -> bool:
+        """Async version of delete_contact"""
+
+    @abstractmethod
+    def get_due_contacts(self, default_freq_days: int = 7, limit: Optional[int] = None) -> List[Dict]:
+        """
+        Get contacts that are due for contact, most overdue first
+
+        Args:
+            default_freq_days: Contact frequency for contacts without recommended_contact_freq_days
+            limit: Maximum number of contacts to return
+        """
+
+    @abstractmethod
+    async def aget_due_contacts(self, default_freq_days: int = 7, limit: Optional[int] = None) -> List[Dict]:
+        """Async version of get_due_contacts"""
+
+    @abstractmethod
+    def search_contacts(self,
+                        query: str,
+                        limit: int = 10,
+                        after: Optional[Tuple[float, str]] = None) -> List[Dict[str, Any]]:
+        """
+        Ranked search across the contact's text fields
+
+        Args:
+            query: Search text; every word matches as a prefix
+            limit: Maximum number of rows to return
+            after: (rank, id) of the last row of the previous page
+
+        Returns:
+            Rows of {"contact": {...}, "rank": float}, best match first
+        """
+
+    @abstractmethod
+    async def asearch_contacts(self,
+                               query: str,
+                               limit: int = 10,
+                               after: Optional[Tuple[float, str]] = None) -> List[Dict[str, Any]]:
+        """Async version of search_contacts"""
+
+
+_repository: Optional[ContactRepository] = None
+_repository_lock = threading.Lock()
+
+
+def create_contact_repository(store: str = CONTACT_STORE) -> ContactRepository:
+    """
+    Create a repository for the given backend.
+
+    Args:
+        store: "supabase" or "sqlite"
+
+    Returns:
+        A new ContactRepository
+    """
+    if store == "supabase":
+        from db.supabaseContactRepository import SupabaseContactRepository
+        return SupabaseContactRepository()
+    if store == "sqlite":
+        from db.sqliteContactRepository import SqliteContactRepository
+        return SqliteContactRepository(SQLITE_PATH)
+    raise ValueError(f"Unknown CONTACT_STORE: {store!r} (expected 'supabase' or 'sqlite')")
+
+
+def get_contact_repository() -> ContactRepository:
+    """Get the process-wide contact repository, creating it on first use."""
+    global _repository
+    if _repository is None:
+        with _repository_lock:
+            if _repository is None:
+                _repository = create_contact_repository()
+    return _repository
+
+
+def set_contact_repository(repository: Optional[ContactRepository]) -> None:
+    """Replace the process-wide contact repository (None resets it to CONTACT_STORE)."""
+    global _repository
+    with _repository_lock:
+        _repository = repository
@@ -0,0 +1,110 @@
+-- Atomic profile merge for contacts.
+--
+-- merge_contact_profile(p_contact_id, p_patch) applies a profile patch in a
+-- single statement, with the row locked for the duration of the merge:
+--   * interests, conversation_topics, preferences.likes/dislikes: union with the
+--     stored values (order preserved, duplicates removed)
+--   * important_dates: appended, de-duplicated by (date, description)
+--   * personality: appended to the stored text, separated by a blank line
+--   * nickname, birthday, relationship_type, family_details, last_connection:
+--     overwrite the stored value
+--
+-- Called from ContactService.merge_contact_profile through PostgREST RPC.
+-- Run once in the Supabase SQL editor (or with psql) before deploying.
+
+create or replace function public.jsonb_array_union(a jsonb, b jsonb)
+returns jsonb
+language sql
+immutable
+as $$
+  select coalesce(jsonb_agg(value order by ord), '[]'::jsonb)
+  from (
+    select value, min(ord) as ord
+    from jsonb_array_elements(
+      (case when jsonb_typeof(a) = 'array' then a else '[]'::jsonb end) ||
+      (case when jsonb_typeof(b) = 'array' then b else '[]'::jsonb end)
+    ) with ordinality as t(value, ord)
+    group by value
+  ) u
+$$;
+
+create or replace function public.merge_contact_profile(p_contact_id uuid, p_patch jsonb)
+returns setof public.contacts
+language plpgsql
+as $$
+declare
+  cur jsonb;
+  merged jsonb;
+begin
+  select to_jsonb(c) into cur
+  from public.contacts c
+  where c.id = p_contact_id
+  for update;
+
+  if cur is null then
+    return;
+  end if;
+
+  -- Scalar fields overwrite; merged fields are handled below
+  merged := jsonb_strip_nulls(p_patch)
+    - 'interests' - 'conversation_topics' - 'preferences' - 'important_dates' - 'personality';
+
+  if p_patch ? 'interests' then
+    merged := merged || jsonb_build_object(
+      'interests', public.jsonb_array_union(cur->'interests', p_patch->'interests'));
+  end if;
+
+  if p_patch ? 'conversation_topics' then
+    merged := merged || jsonb_build_object(
+      'conversation_topics', public.jsonb_array_union(cur->'conversation_topics', p_patch->'conversation_topics'));
+  end if;
+
+  if p_patch ? 'preferences' then
+    merged := merged || jsonb_build_object('preferences',
+      (case when jsonb_typeof(cur->'preferences') = 'object' then cur->'preferences' else '{}'::jsonb end)
+      || jsonb_build_object(
+        'likes', public.jsonb_array_union(cur#>'{preferences,likes}', p_patch#>'{preferences,likes}'),
+        'dislikes', public.jsonb_array_union(cur#>'{preferences,dislikes}', p_patch#>'{preferences,dislikes}')
+      ));
+  end if;
+
+  if p_patch ? 'important_dates' then
+    merged := merged || jsonb_build_object('important_dates', (
+      select coalesce(jsonb_agg(value order by ord), '[]'::jsonb)
+      from (
+        select distinct on (value->>'date', value->>'description') value, ord
+        from jsonb_array_elements(
+          (case when jsonb_typeof(cur->'important_dates') = 'array' then cur->'important_dates' else '[]'::jsonb end) ||
+          (case when jsonb_typeof(p_patch->'important_dates') = 'array' then p_patch->'important_dates' else '[]'::jsonb end)
+        ) with ordinality as t(value, ord)
+        order by value->>'date', value->>'description', ord
+      ) d
+    ));
+  end if;
+
+  if coalesce(p_patch->>'personality', '') <> '' then
+    merged := merged || jsonb_build_object('personality',
+      case
+        when coalesce(cur->>'personality', '') = '' then p_patch->>'personality'
+        else (cur->>'personality') || E'\n\n' || (p_patch->>'personality')
+      end);
+  end if;
+
+  -- jsonb_populate_record casts every value to its column type
+  return query
+  update public.contacts c set
+    nickname = r.nickname,
+    birthday = r.birthday,
+    relationship_type = r.relationship_type,
+    family_details = r.family_details,
+    last_connection = r.last_connection,
+    interests = r.interests,
+    conversation_topics = r.conversation_topics,
+    preferences = r.preferences,
+    important_dates = r.important_dates,
+    personality = r.personality
+  from jsonb_populate_record(null::public.contacts, cur || merged) r
+  where c.id = p_contact_id
+  returning c.*;
+end;
+$$;
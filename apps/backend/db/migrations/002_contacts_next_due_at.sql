@@ -0,0 +1,77 @@
+-- Server-side "due for contact" query.
+--
+-- contacts.next_due_at = last_connection + recommended_contact_freq_days, kept
+-- up to date by a trigger whenever either column changes. Contacts without a
+-- recommended frequency fall back to the caller's default (days_threshold), so
+-- they are matched on last_connection instead.
+--
+-- get_due_contacts(p_default_freq_days, p_limit) returns only the contacts that
+-- are due, most overdue first. Both branches are served by partial indexes and
+-- stop after p_limit rows, so a top-K "most overdue" view stays cheap.
+
+alter table public.contacts
+  add column if not exists next_due_at timestamptz;
+
+create or replace function public.contacts_set_next_due_at()
+returns trigger
+language plpgsql
+as $$
+begin
+  if new.last_connection is not null and new.recommended_contact_freq_days is not null then
+    new.next_due_at := new.last_connection + make_interval(days => new.recommended_contact_freq_days);
+  else
+    new.next_due_at := null;
+  end if;
+  return new;
+end;
+$$;
+
+drop trigger if exists contacts_set_next_due_at on public.contacts;
+create trigger contacts_set_next_due_at
+  before insert or update of last_connection, recommended_contact_freq_days
+  on public.contacts
+  for each row
+  execute function public.contacts_set_next_due_at();
+
+-- Backfill existing rows
+update public.contacts
+set next_due_at = last_connection + make_interval(days => recommended_contact_freq_days)
+where last_connection is not null and recommended_contact_freq_days is not null;
+
+create index if not exists contacts_next_due_at_idx
+  on public.contacts (next_due_at)
+  where next_due_at is not null;
+
+create index if not exists contacts_last_connection_default_freq_idx
+  on public.contacts (last_connection)
+  where recommended_contact_freq_days is null and last_connection is not null;
+
+create or replace function public.get_due_contacts(p_default_freq_days int default 7, p_limit int default null)
+returns setof public.contacts
+language sql
+stable
+as $$
+  select (d.c).*
+  from (
+    (
+      select c, c.next_due_at as due_at
+      from public.contacts c
+      where c.next_due_at is not null
+        and c.next_due_at <= now()
+      order by c.next_due_at
+      limit p_limit
+    )
+    union all
+    (
+      select c, c.last_connection + make_interval(days => p_default_freq_days) as due_at
+      from public.contacts c
+      where c.recommended_contact_freq_days is null
+        and c.last_connection is not null
+        and c.last_connection <= now() - make_interval(days => p_default_freq_days)
+      order by c.last_connection
+      limit p_limit
+    )
+  ) d
+  order by d.due_at
+  limit p_limit
+$$;
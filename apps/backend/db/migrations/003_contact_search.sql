@@ -0,0 +1,128 @@
+-- Ranked full-text search for contacts.
+--
+-- contact_search holds one search document per contact, kept up to date by a
+-- trigger on contacts (a side table keeps the tsvector out of `select *`):
+--   * document: weighted tsvector over name/nickname (A), interests and
+--     conversation topics (B), family details, contact methods, preferences
+--     and personality (C). GIN indexed.
+--   * names: lower-cased name and nickname, trigram indexed, so substring
+--     matches and small typos in names are still found.
+--
+-- search_contacts(p_query, p_limit, p_after_rank, p_after_id) returns matching
+-- contacts with their relevance, best match first. Every word of the query is
+-- matched as a prefix, so "ali hik" finds "Alice ... hiking" while typing.
+-- Results are paged by (rank, id): pass the last row's rank and id to get the
+-- next page.
+
+create extension if not exists pg_trgm;
+
+create table if not exists public.contact_search (
+  contact_id uuid primary key references public.contacts (id) on delete cascade,
+  document tsvector not null,
+  names text not null
+);
+
+create or replace function public.contact_search_text(v jsonb)
+returns text
+language sql
+immutable
+as $$
+  -- All string values inside a json document, space separated
+  select coalesce(string_agg(t.value, ' '), '')
+  from jsonb_path_query(coalesce(v, 'null'::jsonb), 'strict $.**') as p(value)
+  cross join lateral (select p.value #>> '{}' as value) t
+  where jsonb_typeof(p.value) = 'string'
+$$;
+
+create or replace function public.contact_search_upsert(c public.contacts)
+returns void
+language sql
+as $$
+  insert into public.contact_search (contact_id, document, names)
+  values (
+    c.id,
+    setweight(to_tsvector('simple', coalesce(c.name, '') || ' ' || coalesce(c.nickname, '')), 'A') ||
+    setweight(to_tsvector('simple',
+      public.contact_search_text(to_jsonb(c.interests)) || ' ' ||
+      public.contact_search_text(to_jsonb(c.conversation_topics))), 'B') ||
+    setweight(to_tsvector('simple',
+      coalesce(c.family_details, '') || ' ' ||
+      public.contact_search_text(to_jsonb(c.contact_methods)) || ' ' ||
+      public.contact_search_text(to_jsonb(c.preferences)) || ' ' ||
+      coalesce(c.personality, '')), 'C'),
+    lower(coalesce(c.name, '') || ' ' || coalesce(c.nickname, ''))
+  )
+  on conflict (contact_id) do update
+    set document = excluded.document,
+        names = excluded.names
+$$;
+
+create or replace function public.contact_search_refresh()
+returns trigger
+language plpgsql
+as $$
+begin
+  perform public.contact_search_upsert(new);
+  return new;
+end;
+$$;
+
+drop trigger if exists contacts_search_refresh on public.contacts;
+create trigger contacts_search_refresh
+  after insert or update of name, nickname, interests, conversation_topics,
+    family_details, contact_methods, preferences, personality
+  on public.contacts
+  for each row
+  execute function public.contact_search_refresh();
+
+-- Backfill existing rows
+select public.contact_search_upsert(c) from public.contacts c;
+
+create index if not exists contact_search_document_idx
+  on public.contact_search using gin (document);
+
+create index if not exists contact_search_names_trgm_idx
+  on public.contact_search using gin (names gin_trgm_ops);
+
+-- Lets the name filter of the contact listing (ilike '%...%') use an index
+create index if not exists contacts_name_trgm_idx
+  on public.contacts using gin (name gin_trgm_ops);
+
+create or replace function public.search_contacts(
+  p_query text,
+  p_limit int default 10,
+  p_after_rank real default null,
+  p_after_id uuid default null
+)
+returns table (contact jsonb, rank real)
+language sql
+stable
+as $$
+  with q as (
+    select
+      lower(trim(p_query)) as text,
+      -- Literal substring pattern for the names
+      '%' || replace(replace(replace(lower(trim(p_query)), '\', '\\'), '%', '\%'), '_', '\_') || '%' as pattern,
+      -- Every word as a prefix term: 'ali hik' -> 'ali':* & 'hik':*
+      (
+        select to_tsquery('simple', string_agg(quote_literal(w) || ':*', ' & '))
+        from unnest(tsvector_to_array(to_tsvector('simple', p_query))) as w
+      ) as tsq
+  ),
+  hits as (
+    select
+      s.contact_id,
+      (coalesce(ts_rank_cd(s.document, q.tsq), 0) + word_similarity(q.text, s.names))::real as rank
+    from public.contact_search s, q
+    where q.text <> ''
+      and (s.document @@ q.tsq or s.names like q.pattern or q.text <% s.names)
+  )
+  select to_jsonb(c), h.rank
+  from hits h
+  join public.contacts c on c.id = h.contact_id
+  where p_after_rank is null
+     or h.rank < p_after_rank
+     or (h.rank = p_after_rank and h.contact_id > p_after_id)
+  order by h.rank desc, h.contact_id
+  limit p_limit
+$$;
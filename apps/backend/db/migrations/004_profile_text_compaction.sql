@@ -0,0 +1,136 @@
+-- Bounded personality text.
+--
+-- Extraction used to append every new personality note to the stored text,
+-- so the field (and every prompt that includes it) grew without limit and
+-- often repeated itself. profile_text_append(p_current, p_addition,
+-- p_max_chars) merges the texts sentence by sentence instead:
+--   * sentences end at . ! ? followed by whitespace, or at a blank line
+--   * a sentence that is already present (ignoring case and punctuation) is
+--     not added again
+--   * only the newest sentences that fit into p_max_chars are kept, joined
+--     by spaces
+-- Mirrored in Python by db/profileText.py (SQLite store, direct updates).
+--
+-- merge_contact_profile gains p_text_max_chars (PROFILE_TEXT_MAX_CHARS in the
+-- backend) and uses profile_text_append for personality; the other merge
+-- rules are those of 001_merge_contact_profile.sql. Existing personality
+-- values are compacted once at the end.
+--
+-- Run once in the Supabase SQL editor (or with psql) before deploying.
+
+create or replace function public.profile_text_append(p_current text, p_addition text, p_max_chars integer)
+returns text
+language sql
+immutable
+as $$
+  with sentences as (
+    select btrim(s) as s, ord,
+           btrim(regexp_replace(lower(s), '[^[:alnum:]]+', ' ', 'g')) as key
+    from regexp_split_to_table(
+      coalesce(p_current, '') || E'\n\n' || coalesce(p_addition, ''),
+      E'(?<=[.!?])\\s+|\\n\\s*\\n'
+    ) with ordinality as t(s, ord)
+  ),
+  unique_sentences as (
+    select distinct on (key) s, ord
+    from sentences
+    where key <> ''
+    order by key, ord
+  ),
+  sized as (
+    -- Length of the text made of this sentence and all newer ones
+    select s, ord, sum(length(s) + 1) over (order by ord desc) - 1 as length
+    from unique_sentences
+  )
+  select coalesce(
+    (select string_agg(s, ' ' order by ord) from sized where length <= p_max_chars),
+    -- A single sentence longer than the limit
+    (select left(s, p_max_chars) from sized order by ord desc limit 1)
+  )
+$$;
+
+-- The new parameter changes the signature, so replace the old function
+drop function if exists public.merge_contact_profile(uuid, jsonb);
+
+create or replace function public.merge_contact_profile(p_contact_id uuid, p_patch jsonb,
+                                                        p_text_max_chars integer default 2000)
+returns setof public.contacts
+language plpgsql
+as $$
+declare
+  cur jsonb;
+  merged jsonb;
+begin
+  select to_jsonb(c) into cur
+  from public.contacts c
+  where c.id = p_contact_id
+  for update;
+
+  if cur is null then
+    return;
+  end if;
+
+  -- Scalar fields overwrite; merged fields are handled below
+  merged := jsonb_strip_nulls(p_patch)
+    - 'interests' - 'conversation_topics' - 'preferences' - 'important_dates' - 'personality';
+
+  if p_patch ? 'interests' then
+    merged := merged || jsonb_build_object(
+      'interests', public.jsonb_array_union(cur->'interests', p_patch->'interests'));
+  end if;
+
+  if p_patch ? 'conversation_topics' then
+    merged := merged || jsonb_build_object(
+      'conversation_topics', public.jsonb_array_union(cur->'conversation_topics', p_patch->'conversation_topics'));
+  end if;
+
+  if p_patch ? 'preferences' then
+    merged := merged || jsonb_build_object('preferences',
+      (case when jsonb_typeof(cur->'preferences') = 'object' then cur->'preferences' else '{}'::jsonb end)
+      || jsonb_build_object(
+        'likes', public.jsonb_array_union(cur#>'{preferences,likes}', p_patch#>'{preferences,likes}'),
+        'dislikes', public.jsonb_array_union(cur#>'{preferences,dislikes}', p_patch#>'{preferences,dislikes}')
+      ));
+  end if;
+
+  if p_patch ? 'important_dates' then
+    merged := merged || jsonb_build_object('important_dates', (
+      select coalesce(jsonb_agg(value order by ord), '[]'::jsonb)
+      from (
+        select distinct on (value->>'date', value->>'description') value, ord
+        from jsonb_array_elements(
+          (case when jsonb_typeof(cur->'important_dates') = 'array' then cur->'important_dates' else '[]'::jsonb end) ||
+          (case when jsonb_typeof(p_patch->'important_dates') = 'array' then p_patch->'important_dates' else '[]'::jsonb end)
+        ) with ordinality as t(value, ord)
+        order by value->>'date', value->>'description', ord
+      ) d
+    ));
+  end if;
+
+  if coalesce(p_patch->>'personality', '') <> '' then
+    merged := merged || jsonb_build_object('personality',
+      public.profile_text_append(cur->>'personality', p_patch->>'personality', p_text_max_chars));
+  end if;
+
+  -- jsonb_populate_record casts every value to its column type
+  return query
+  update public.contacts c set
+    nickname = r.nickname,
+    birthday = r.birthday,
+    relationship_type = r.relationship_type,
+    family_details = r.family_details,
+    last_connection = r.last_connection,
+    interests = r.interests,
+    conversation_topics = r.conversation_topics,
+    preferences = r.preferences,
+    important_dates = r.important_dates,
+    personality = r.personality
+  from jsonb_populate_record(null::public.contacts, cur || merged) r
+  where c.id = p_contact_id
+  returning c.*;
+end;
+$$;
+
+update public.contacts
+set personality = public.profile_text_append(personality, null, 2000)
+where personality is not null;
@@ -0,0 +1,32 @@
+-- Bulk profile merge for contacts.
+--
+-- merge_contact_profiles(p_patches, p_text_max_chars) merges many profile
+-- patches in one call and one transaction. p_patches is a JSON object that
+-- maps contact ids to patches; each patch is applied with
+-- merge_contact_profile (001, personality rules from 004). Contacts are
+-- locked in id order, so concurrent batches cannot deadlock. Keys that are
+-- not UUIDs and ids without a contact are skipped.
+--
+-- Called from the batch extraction endpoint (POST /chat/extract/batch)
+-- through PostgREST RPC; returns the updated contacts.
+-- Run once in the Supabase SQL editor (or with psql) before deploying.
+
+create or replace function public.merge_contact_profiles(p_patches jsonb,
+                                                         p_text_max_chars integer default 2000)
+returns setof public.contacts
+language plpgsql
+as $$
+declare
+  entry record;
+begin
+  for entry in
+    select key::uuid as contact_id, value as patch
+    from jsonb_each(case when jsonb_typeof(p_patches) = 'object' then p_patches else '{}'::jsonb end)
+    where key ~* '^[0-9a-f]{8}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{12}$'
+    order by key::uuid
+  loop
+    return query
+    select * from public.merge_contact_profile(entry.contact_id, entry.patch, p_text_max_chars);
+  end loop;
+end;
+$$;
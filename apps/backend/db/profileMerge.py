@@ -0,0 +1,72 @@
+"""
+Merge rules for extracted profile data.
+
+merge_profile computes the fields to write when a profile patch is merged
+into a stored contact, following public.merge_contact_profile in
+db/migrations/001_merge_contact_profile.sql: scalar fields are overwritten,
+lists are unioned and personality is appended as in
+004_profile_text_compaction.sql (see db/profileText.py). Used by the SQLite
+store and by batch extraction to combine patches before a bulk write.
+"""
+import json
+from typing import Any, Dict, List
+
+from db.profileText import PROFILE_TEXT_MAX_CHARS, append_profile_text
+
+# Fields merge_contact_profile may overwrite (the same set as migration 001)
+PROFILE_FIELDS = ("nickname", "birthday", "relationship_type", "family_details", "last_connection")
+
+
+def _union(current: Any, new: Any) -> List[Any]:
+    """Union of two lists, keeping the first occurrence of each item in order"""
+    merged, seen = [], set()
+    for item in (current if isinstance(current, list) else []) + (new if isinstance(new, list) else []):
+        key = json.dumps(item, sort_keys=True)
+        if key not in seen:
+            seen.add(key)
+            merged.append(item)
+    return merged
+
+
+def merge_profile(current: Dict, patch: Dict, text_max_chars: int = PROFILE_TEXT_MAX_CHARS) -> Dict:
+    """
+    Compute the fields to write when merging a profile patch into a contact
+    (the rules of db/migrations/001_merge_contact_profile.sql, with personality
+    merged as in 004_profile_text_compaction.sql).
+
+    Args:
+        current: The stored contact
+        patch: Extracted profile data
+        text_max_chars: Maximum length of the merged personality text
+
+    Returns:
+        Dictionary of fields to update
+    """
+    merged = {k: v for k, v in patch.items() if k in PROFILE_FIELDS and v is not None}
+
+    for field in ("interests", "conversation_topics"):
+        if field in patch:
+            merged[field] = _union(current.get(field), patch[field])
+
+    if "preferences" in patch:
+        stored = current.get("preferences") if isinstance(current.get("preferences"), dict) else {}
+        new = patch["preferences"] if isinstance(patch["preferences"], dict) else {}
+        merged["preferences"] = {
+            **stored,
+            "likes": _union(stored.get("likes"), new.get("likes")),
+            "dislikes": _union(stored.get("dislikes"), new.get("dislikes")),
+        }
+
+    if "important_dates" in patch:
+        dates, seen = [], set()
+        for item in _union(current.get("important_dates"), patch["important_dates"]):
+            key = (item.get("date"), item.get("description")) if isinstance(item, dict) else (None, None)
+            if key not in seen:
+                seen.add(key)
+                dates.append(item)
+        merged["important_dates"] = dates
+
+    if patch.get("personality"):
+        merged["personality"] = append_profile_text(current.get("personality"), patch["personality"], text_max_chars)
+
+    return merged
@@ -0,0 +1,80 @@
+"""
+Bounded free-text profile fields (personality).
+
+New text is merged into the stored value sentence by sentence: repeated
+sentences are kept once and only the newest sentences that fit into
+PROFILE_TEXT_MAX_CHARS are kept. These are the rules of
+public.profile_text_append in db/migrations/004_profile_text_compaction.sql,
+used by the SQLite store and by ContactService for direct updates.
+"""
+import os
+import re
+from typing import List, Optional
+
+PROFILE_TEXT_MAX_CHARS = int(os.getenv("PROFILE_TEXT_MAX_CHARS", "2000"))
+
+# Sentence boundaries: . ! ? followed by whitespace, or a blank line
+_SENTENCE_BREAK = re.compile(r"(?<=[.!?])\s+|\n\s*\n")
+_NON_WORD = re.compile(r"[\W_]+")
+
+
+def split_sentences(text: Optional[str]) -> List[str]:
+    """Split text into trimmed, non-empty sentences"""
+    if not text:
+        return []
+    return [s.strip() for s in _SENTENCE_BREAK.split(text) if s.strip()]
+
+
+def sentence_key(sentence: str) -> str:
+    """Comparison key for a sentence: lowercase words without punctuation"""
+    return _NON_WORD.sub(" ", sentence.lower()).strip()
+
+
+def append_profile_text(current: Optional[str], addition: Optional[str],
+                        max_chars: int = PROFILE_TEXT_MAX_CHARS) -> Optional[str]:
+    """
+    Merge new text into a stored profile text.
+
+    Args:
+        current: The stored text
+        addition: Text to append
+        max_chars: Maximum length of the result
+
+    Returns:
+        The de-duplicated sentences, newest kept first when over max_chars,
+        joined by spaces; None if there is no text
+    """
+    sentences, seen = [], set()
+    for sentence in split_sentences(current) + split_sentences(addition):
+        key = sentence_key(sentence)
+        if key and key not in seen:
+            seen.add(key)
+            sentences.append(sentence)
+
+    if not sentences:
+        return None
+
+    kept, length = [], -1
+    for sentence in reversed(sentences):
+        length += len(sentence) + 1
+        if length > max_chars:
+            break
+        kept.append(sentence)
+
+    if not kept:
+        # A single sentence longer than the limit
+        return sentences[-1][:max_chars]
+    return " ".join(reversed(kept))
+
+
+def clamp_profile_text(text: Optional[str], max_chars: int = PROFILE_TEXT_MAX_CHARS) -> Optional[str]:
+    """Bound a stored text that predates compaction, leaving short texts untouched"""
+    if not text or len(text) <= max_chars:
+        return text
+    # Only the newest sentences can be kept, so skip the rest of a very long text
+    tail = text[-2 * max_chars:]
+    if len(tail) < len(text):
+        sentences = split_sentences(tail)
+        # The first sentence was most likely cut off
+        tail = " ".join(sentences[1:] if len(sentences) > 1 else sentences)
+    return append_profile_text(tail, None, max_chars)
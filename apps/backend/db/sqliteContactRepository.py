@@ -0,0 +1,451 @@
+"""
+Embedded SQLite contact repository.
+
+Keeps contacts in a local SQLite file, for single-node deployments and for
+running and benchmarking the API without network access. It mirrors the
+Supabase schema and the server-side functions from db/migrations:
+- list, dict and JSON fields (interests, preferences, important_dates, ...)
+  are stored as JSON text columns
+- next_due_at is maintained on every write and indexed, like migration 002
+- a weighted FTS5 index replaces the tsvector search of migration 003; its
+  rows share the rowid of their contact, so a write re-indexes one row
+- merge_contact_profile applies the same merge rules as migration 001 inside
+  a single write transaction
+
+The database runs in WAL mode, so readers never wait for a writer. All SQL is
+parameterized with a fixed set of statements that sqlite3 keeps prepared in
+its statement cache.
+"""
+import asyncio
+import json
+import re
+import sqlite3
+import threading
+import uuid
+from contextlib import contextmanager
+from datetime import datetime, timedelta, timezone
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+from db.contactRepository import ContactRepository
+from db.profileMerge import merge_profile
+
+JSON_FIELDS = ("contact_methods", "conversation_topics", "important_dates",
+               "reminders", "interests", "preferences")
+TIMESTAMP_FIELDS = ("last_connection",)
+WRITABLE_FIELDS = ("name", "nickname", "birthday", "contact_methods",
+                   "last_connection", "avg_days_btw_contacts", "recommended_contact_freq_days",
+                   "relationship_type", "relationship_strength",
+                   "conversation_topics", "important_dates", "reminders",
+                   "interests", "family_details", "preferences", "personality")
+
+SCHEMA = """
+create table if not exists contacts (
+  id text primary key,
+  name text not null,
+  nickname text,
+  birthday text,
+  contact_methods text check (contact_methods is null or json_valid(contact_methods)),
+  last_connection text,
+  avg_days_btw_contacts real,
+  recommended_contact_freq_days integer,
+  relationship_type text,
+  relationship_strength integer,
+  conversation_topics text check (conversation_topics is null or json_valid(conversation_topics)),
+  important_dates text check (important_dates is null or json_valid(important_dates)),
+  reminders text check (reminders is null or json_valid(reminders)),
+  interests text check (interests is null or json_valid(interests)),
+  family_details text,
+  preferences text check (preferences is null or json_valid(preferences)),
+  personality text,
+  next_due_at text,
+  created_at text not null,
+  updated_at text not null
+);
+
+create index if not exists contacts_name_id_idx on contacts (name, id);
+
+create index if not exists contacts_next_due_at_idx
+  on contacts (next_due_at)
+  where next_due_at is not null;
+
+create index if not exists contacts_last_connection_default_freq_idx
+  on contacts (last_connection)
+  where recommended_contact_freq_days is null and last_connection is not null;
+
+-- rowid = contacts.rowid; contact_id checks that the two still line up
+create virtual table if not exists contact_search using fts5(
+  contact_id unindexed,
+  names,
+  tags,
+  details,
+  tokenize = 'unicode61 remove_diacritics 2',
+  prefix = '2 3'
+);
+"""
+
+# bm25 column weights: contact_id, names, tags (interests, topics), details
+SEARCH_SQL = """
+select c.*, h.rank as search_rank
+from (
+  select rowid, contact_id, -bm25(contact_search, 0.0, 10.0, 4.0, 1.0) as rank
+  from contact_search
+  where contact_search match ?
+) h
+join contacts c on c.rowid = h.rowid and c.id = h.contact_id
+where ? is null or h.rank < ? or (h.rank = ? and c.id > ?)
+order by h.rank desc, c.id
+limit ?
+"""
+
+
+def _now() -> datetime:
+    return datetime.now(timezone.utc)
+
+
+def _format_timestamp(value: datetime) -> str:
+    """Fixed-width UTC timestamp, so stored timestamps compare correctly as text"""
+    if value.tzinfo is None:
+        value = value.replace(tzinfo=timezone.utc)
+    return value.astimezone(timezone.utc).strftime("%Y-%m-%dT%H:%M:%S.%f+00:00")
+
+
+def _parse_timestamp(value: Any) -> Optional[datetime]:
+    """Parse a datetime or ISO 8601 string; naive values are taken as UTC"""
+    if value is None or value == "":
+        return None
+    if isinstance(value, datetime):
+        parsed = value
+    else:
+        parsed = datetime.fromisoformat(str(value).replace("Z", "+00:00"))
+    if parsed.tzinfo is None:
+        parsed = parsed.replace(tzinfo=timezone.utc)
+    return parsed
+
+
+def _strings(value: Any) -> Iterator[str]:
+    """All strings inside a JSON value"""
+    if isinstance(value, str):
+        yield value
+    elif isinstance(value, dict):
+        for item in value.values():
+            yield from _strings(item)
+    elif isinstance(value, list):
+        for item in value:
+            yield from _strings(item)
+
+
+class SqliteContactRepository(ContactRepository):
+    """
+    Contact storage in an embedded SQLite database.
+
+    One connection is shared by the process and guarded by a lock. The
+    async methods run the queries in a worker thread, so bulk imports,
+    searches and long due lists don't block the event loop while they hold
+    the lock.
+    """
+
+    def __init__(self, path: str = "lazor.db"):
+        self.path = path
+        self._lock = threading.RLock()
+        self._conn = sqlite3.connect(
+            path,
+            check_same_thread=False,
+            isolation_level=None,  # transactions are managed explicitly
+            cached_statements=256,
+        )
+        self._conn.row_factory = sqlite3.Row
+        self._conn.execute("pragma journal_mode = wal")
+        self._conn.execute("pragma synchronous = normal")
+        self._conn.execute("pragma busy_timeout = 5000")
+        self._conn.executescript(SCHEMA)
+        self._check_search_index()
+
+    def close(self) -> None:
+        """Close the database connection"""
+        with self._lock:
+            self._conn.close()
+
+    @contextmanager
+    def _transaction(self) -> Iterator[sqlite3.Connection]:
+        """Run statements in one write transaction (committed, or rolled back on error)"""
+        with self._lock:
+            self._conn.execute("begin immediate")
+            try:
+                yield self._conn
+            except BaseException:
+                self._conn.execute("rollback")
+                raise
+            self._conn.execute("commit")
+
+    def _query(self, sql: str, params: Tuple = ()) -> List[sqlite3.Row]:
+        with self._lock:
+            return self._conn.execute(sql, params).fetchall()
+
+    @staticmethod
+    def _to_dict(row: sqlite3.Row) -> Dict:
+        """Convert a contacts row to the dictionary shape returned by Supabase"""
+        contact = dict(row)
+        for field in JSON_FIELDS:
+            if contact.get(field) is not None:
+                contact[field] = json.loads(contact[field])
+        return contact
+
+    @staticmethod
+    def _to_db(field: str, value: Any) -> Any:
+        """Convert a field value to its stored representation"""
+        if field not in WRITABLE_FIELDS:
+            raise ValueError(f"Unknown contact field: {field}")
+        if value is None:
+            return None
+        if field in JSON_FIELDS:
+            return json.dumps(value)
+        if field in TIMESTAMP_FIELDS:
+            return _format_timestamp(_parse_timestamp(value))
+        return value
+
+    @staticmethod
+    def _next_due_at(contact: Dict) -> Optional[str]:
+        """last_connection + recommended_contact_freq_days (the trigger of migration 002)"""
+        last_connection = _parse_timestamp(contact.get("last_connection"))
+        freq_days = contact.get("recommended_contact_freq_days")
+        if last_connection is None or freq_days is None:
+            return None
+        return _format_timestamp(last_connection + timedelta(days=freq_days))
+
+    def _check_search_index(self) -> None:
+        """
+        Rebuild the search index if its rows don't match the contacts' rowids:
+        databases indexed before rows were keyed by rowid, or rowids renumbered
+        by a VACUUM (contacts has a text primary key, so its rowids aren't fixed).
+        """
+        with self._lock:
+            contacts = self._conn.execute("select count(*) from contacts").fetchone()[0]
+            indexed = self._conn.execute(
+                "select count(*) from contact_search s join contacts c on c.rowid = s.rowid and c.id = s.contact_id"
+            ).fetchone()[0]
+            total = self._conn.execute("select count(*) from contact_search").fetchone()[0]
+        if contacts == indexed == total:
+            return
+        print(f"Rebuilding the contact search index ({contacts} contacts)")
+        with self._transaction() as conn:
+            conn.execute("delete from contact_search")
+            for row in conn.execute("select rowid as search_rowid, * from contacts").fetchall():
+                contact = self._to_dict(row)
+                self._write_search(conn, contact.pop("search_rowid"), contact, new=True)
+
+    @staticmethod
+    def _rowid(conn: sqlite3.Connection, contact_id: str) -> Optional[int]:
+        row = conn.execute("select rowid from contacts where id = ?", (str(contact_id),)).fetchone()
+        return row[0] if row else None
+
+    @staticmethod
+    def _write_search(conn: sqlite3.Connection, rowid: int, contact: Dict, new: bool = False) -> None:
+        """Refresh the search document of a contact (new: it has none yet)"""
+        names = " ".join(filter(None, (contact.get("name"), contact.get("nickname"))))
+        tags = " ".join(_strings([contact.get("interests"), contact.get("conversation_topics")]))
+        details = " ".join(_strings([contact.get("family_details"), contact.get("contact_methods"),
+                                     contact.get("preferences"), contact.get("personality")]))
+        if not new:
+            conn.execute("delete from contact_search where rowid = ?", (rowid,))
+        conn.execute(
+            "insert into contact_search (rowid, contact_id, names, tags, details) values (?, ?, ?, ?, ?)",
+            (rowid, contact["id"], names, tags, details)
+        )
+
+    def _get(self, conn: sqlite3.Connection, contact_id: str) -> Optional[Dict]:
+        row = conn.execute("select * from contacts where id = ?", (str(contact_id),)).fetchone()
+        return self._to_dict(row) if row else None
+
+    def _write(self, conn: sqlite3.Connection, contact_id: str, data: Dict) -> Optional[Dict]:
+        """Update fields of a contact, keeping next_due_at and the search index current"""
+        current = self._get(conn, contact_id)
+        if current is None:
+            return None
+
+        values = {field: self._to_db(field, value) for field, value in data.items()}
+        values["next_due_at"] = self._next_due_at({**current, **data})
+        values["updated_at"] = _format_timestamp(_now())
+
+        assignments = ", ".join(f"{field} = ?" for field in values)
+        conn.execute(f"update contacts set {assignments} where id = ?",
+                     (*values.values(), str(contact_id)))
+        contact = self._get(conn, contact_id)
+        self._write_search(conn, self._rowid(conn, contact_id), contact)
+        return contact
+
+    def list_contacts(self, search=None, relationship_type=None, relationship_strength=None,
+                      min_strength=None, limit=50, after=None) -> List[Dict]:
+        clauses, params = [], []
+
+        if search:
+            escaped = search.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+            clauses.append("name like ? escape '\\'")
+            params.append(f"%{escaped}%")
+
+        if relationship_type:
+            clauses.append("relationship_type = ?")
+            params.append(relationship_type)
+
+        if relationship_strength is not None:
+            clauses.append("relationship_strength = ?")
+            params.append(relationship_strength)
+
+        if min_strength is not None:
+            clauses.append("relationship_strength >= ?")
+            params.append(min_strength)
+
+        # Keyset pagination: rows strictly after the last (name, id) of the previous page
+        if after:
+            clauses.append("(name > ? or (name = ? and id > ?))")
+            params.extend([after[0], after[0], after[1]])
+
+        where = f"where {' and '.join(clauses)}" if clauses else ""
+        rows = self._query(f"select * from contacts {where} order by name, id limit ?",
+                           (*params, limit))
+        return [self._to_dict(row) for row in rows]
+
+    async def alist_contacts(self, search=None, relationship_type=None, relationship_strength=None,
+                             min_strength=None, limit=50, after=None) -> List[Dict]:
+        return await asyncio.to_thread(self.list_contacts, search, relationship_type, relationship_strength,
+                                       min_strength, limit, after)
+
+    def get_contact(self, contact_id: str) -> Optional[Dict]:
+        with self._lock:
+            return self._get(self._conn, contact_id)
+
+    async def aget_contact(self, contact_id: str) -> Optional[Dict]:
+        return await asyncio.to_thread(self.get_contact, contact_id)
+
+    def _insert(self, conn: sqlite3.Connection, payload: Dict, now: str) -> Dict:
+        """Insert a contact and index it for search"""
+        values = {field: self._to_db(field, value) for field, value in payload.items()}
+        values.update({
+            "id": str(uuid.uuid4()),
+            "next_due_at": self._next_due_at(payload),
+            "created_at": now,
+            "updated_at": now,
+        })
+
+        columns = ", ".join(values)
+        placeholders = ", ".join("?" for _ in values)
+        rowid = conn.execute(f"insert into contacts ({columns}) values ({placeholders})",
+                             tuple(values.values())).lastrowid
+        contact = self._get(conn, values["id"])
+        self._write_search(conn, rowid, contact, new=True)
+        return contact
+
+    def create_contact(self, payload: Dict) -> Dict:
+        with self._transaction() as conn:
+            return self._insert(conn, payload, _format_timestamp(_now()))
+
+    async def acreate_contact(self, payload: Dict) -> Dict:
+        return await asyncio.to_thread(self.create_contact, payload)
+
+    def create_contacts(self, payloads: List[Dict]) -> List[Dict]:
+        now = _format_timestamp(_now())
+        with self._transaction() as conn:
+            return [self._insert(conn, payload, now) for payload in payloads]
+
+    async def acreate_contacts(self, payloads: List[Dict]) -> List[Dict]:
+        return await asyncio.to_thread(self.create_contacts, payloads)
+
+    def update_contact(self, contact_id: str, data: Dict) -> Optional[Dict]:
+        with self._transaction() as conn:
+            return self._write(conn, contact_id, data)
+
+    async def aupdate_contact(self, contact_id: str, data: Dict) -> Optional[Dict]:
+        return await asyncio.to_thread(self.update_contact, contact_id, data)
+
+    def update_contact_if_unchanged(self, contact_id: str, data: Dict, updated_at: str) -> Optional[Dict]:
+        with self._transaction() as conn:
+            current = self._get(conn, contact_id)
+            if current is None or current["updated_at"] != updated_at:
+                return None
+            return self._write(conn, contact_id, data)
+
+    async def aupdate_contact_if_unchanged(self, contact_id: str, data: Dict, updated_at: str) -> Optional[Dict]:
+        return await asyncio.to_thread(self.update_contact_if_unchanged, contact_id, data, updated_at)
+
+    def merge_contact_profile(self, contact_id: str, patch: Dict) -> Optional[Dict]:
+        with self._transaction() as conn:
+            current = self._get(conn, contact_id)
+            if current is None:
+                return None
+            return self._write(conn, contact_id, merge_profile(current, patch))
+
+    async def amerge_contact_profile(self, contact_id: str, patch: Dict) -> Optional[Dict]:
+        return await asyncio.to_thread(self.merge_contact_profile, contact_id, patch)
+
+    def merge_contact_profiles(self, patches: Dict[str, Dict]) -> Dict[str, Optional[Dict]]:
+        results = {}
+        with self._transaction() as conn:
+            for contact_id, patch in patches.items():
+                current = self._get(conn, contact_id)
+                results[contact_id] = (self._write(conn, contact_id, merge_profile(current, patch))
+                                       if current is not None else None)
+        return results
+
+    async def amerge_contact_profiles(self, patches: Dict[str, Dict]) -> Dict[str, Optional[Dict]]:
+        return await asyncio.to_thread(self.merge_contact_profiles, patches)
+
+    def delete_contact(self, contact_id: str) -> bool:
+        with self._transaction() as conn:
+            rowid = self._rowid(conn, contact_id)
+            if rowid is None:
+                return False
+            conn.execute("delete from contact_search where rowid = ?", (rowid,))
+            conn.execute("delete from contacts where rowid = ?", (rowid,))
+        return True
+
+    async def adelete_contact(self, contact_id: str) -> bool:
+        return await asyncio.to_thread(self.delete_contact, contact_id)
+
+    def get_due_contacts(self, default_freq_days: int = 7, limit: Optional[int] = None) -> List[Dict]:
+        now = _now()
+        sql_limit = -1 if limit is None else limit
+
+        # Same two indexed branches as get_due_contacts in migration 002
+        with_freq = self._query(
+            "select * from contacts where next_due_at is not null and next_due_at <= ? "
+            "order by next_due_at limit ?",
+            (_format_timestamp(now), sql_limit)
+        )
+        default_freq = self._query(
+            "select * from contacts where recommended_contact_freq_days is null "
+            "and last_connection is not null and last_connection <= ? "
+            "order by last_connection limit ?",
+            (_format_timestamp(now - timedelta(days=default_freq_days)), sql_limit)
+        )
+
+        due = [(row["next_due_at"], row) for row in with_freq]
+        due += [(_format_timestamp(_parse_timestamp(row["last_connection"]) + timedelta(days=default_freq_days)), row)
+                for row in default_freq]
+        due.sort(key=lambda item: item[0])
+        if limit is not None:
+            due = due[:limit]
+        return [self._to_dict(row) for _, row in due]
+
+    async def aget_due_contacts(self, default_freq_days: int = 7, limit: Optional[int] = None) -> List[Dict]:
+        return await asyncio.to_thread(self.get_due_contacts, default_freq_days, limit)
+
+    def search_contacts(self, query: str, limit: int = 10,
+                        after: Optional[Tuple[float, str]] = None) -> List[Dict[str, Any]]:
+        # Every word as a quoted prefix term: 'ali hik' -> "ali"* "hik"*
+        words = re.findall(r"\w+", query.lower())
+        if not words:
+            return []
+        match = " ".join(f'"{word}"*' for word in words)
+
+        after_rank, after_id = after if after else (None, None)
+        rows = self._query(SEARCH_SQL, (match, after_rank, after_rank, after_rank, after_id, limit))
+
+        hits = []
+        for row in rows:
+            contact = self._to_dict(row)
+            rank = contact.pop("search_rank")
+            hits.append({"contact": contact, "rank": rank})
+        return hits
+
+    async def asearch_contacts(self, query: str, limit: int = 10,
+                               after: Optional[Tuple[float, str]] = None) -> List[Dict[str, Any]]:
+        return await asyncio.to_thread(self.search_contacts, query, limit, after)
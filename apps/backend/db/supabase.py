@@ -1,9 +1,41 @@
 import os
-from supabase import create_client, Client
+import asyncio
+import threading
+from typing import Optional
+from supabase import create_client, acreate_client, Client, AClient
 from dotenv import load_dotenv
 
 load_dotenv()
 
 supabase_url: str = os.getenv("SUPABASE_URL")
 supabase_key: str = os.getenv("SUPABASE_KEY")
-supabase: Client = create_client(supabase_url, supabase_key)
\ No newline at end of file
+
+# Clients are created on first use, so the app can run on another contact
+# store (see db/contactRepository.py) without Supabase credentials.
+_supabase: Optional[Client] = None
+_supabase_lock = threading.Lock()
+
+# Async client shared by the whole process. Its PostgREST session is a single
+# httpx.AsyncClient with HTTP/2 enabled, so requests reuse pooled connections.
+_async_supabase: Optional[AClient] = None
+_async_supabase_lock = asyncio.Lock()
+
+
+def get_supabase() -> Client:
+    """Get the process-wide Supabase client, creating it on first use."""
+    global _supabase
+    if _supabase is None:
+        with _supabase_lock:
+            if _supabase is None:
+                _supabase = create_client(supabase_url, supabase_key)
+    return _supabase
+
+
+async def get_async_supabase() -> AClient:
+    """Get the process-wide async Supabase client, creating it on first use."""
+    global _async_supabase
+    if _async_supabase is None:
+        async with _async_supabase_lock:
+            if _async_supabase is None:
+                _async_supabase = await acreate_client(supabase_url, supabase_key)
+    return _async_supabase
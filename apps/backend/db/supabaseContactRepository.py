@@ -0,0 +1,198 @@
+"""
+Supabase/PostgREST contact repository.
+
+Server-side work runs in the Postgres functions from db/migrations:
+merge_contact_profile (001, personality rules from 004), get_due_contacts (002),
+search_contacts (003) and merge_contact_profiles (005).
+"""
+from typing import Any, Dict, List, Optional, Tuple
+
+from db.supabase import get_supabase, get_async_supabase
+from db.contactRepository import ContactRepository
+from db.profileText import PROFILE_TEXT_MAX_CHARS
+
+
+def _quote(value: str) -> str:
+    """Quote a value for use inside a PostgREST logic filter"""
+    return '"' + value.replace("\\", "\\\\").replace('"', '\\"') + '"'
+
+
+class SupabaseContactRepository(ContactRepository):
+    """Contact storage in the Supabase contacts table"""
+
+    @staticmethod
+    def _list_query(client,
+                    search: Optional[str] = None,
+                    relationship_type: Optional[str] = None,
+                    relationship_strength: Optional[int] = None,
+                    min_strength: Optional[int] = None,
+                    limit: int = 50,
+                    after: Optional[Tuple[str, str]] = None):
+        """Build the contacts query used by list_contacts (works with the sync and async clients)"""
+        query = client.table("contacts").select("*")
+
+        if search:
+            query = query.ilike("name", f"%{search}%")
+
+        if relationship_type:
+            query = query.eq("relationship_type", relationship_type)
+
+        if relationship_strength is not None:
+            query = query.eq("relationship_strength", relationship_strength)
+
+        # Add min_strength filtering if provided
+        if min_strength is not None:
+            query = query.gte("relationship_strength", min_strength)
+
+        # Keyset pagination: rows strictly after the last (name, id) of the previous page
+        if after:
+            name, contact_id = _quote(after[0]), _quote(after[1])
+            query = query.or_(f"name.gt.{name},and(name.eq.{name},id.gt.{contact_id})")
+        return query.order("name").order("id").limit(limit)
+
+    def list_contacts(self, search=None, relationship_type=None, relationship_strength=None,
+                      min_strength=None, limit=50, after=None) -> List[Dict]:
+        query = self._list_query(get_supabase(), search, relationship_type,
+                                 relationship_strength, min_strength, limit, after)
+        return query.execute().data
+
+    async def alist_contacts(self, search=None, relationship_type=None, relationship_strength=None,
+                             min_strength=None, limit=50, after=None) -> List[Dict]:
+        client = await get_async_supabase()
+        query = self._list_query(client, search, relationship_type,
+                                 relationship_strength, min_strength, limit, after)
+        return (await query.execute()).data
+
+    def get_contact(self, contact_id: str) -> Optional[Dict]:
+        response = get_supabase().table("contacts").select("*").eq("id", contact_id).execute()
+        return response.data[0] if response.data else None
+
+    async def aget_contact(self, contact_id: str) -> Optional[Dict]:
+        client = await get_async_supabase()
+        response = await client.table("contacts").select("*").eq("id", contact_id).execute()
+        return response.data[0] if response.data else None
+
+    def create_contact(self, payload: Dict) -> Dict:
+        response = get_supabase().table("contacts").insert(payload).execute()
+        return response.data[0]
+
+    async def acreate_contact(self, payload: Dict) -> Dict:
+        client = await get_async_supabase()
+        response = await client.table("contacts").insert(payload).execute()
+        return response.data[0]
+
+    def create_contacts(self, payloads: List[Dict]) -> List[Dict]:
+        if not payloads:
+            return []
+        # Columns a row leaves out get their defaults, not null
+        response = get_supabase().table("contacts").insert(payloads, default_to_null=False).execute()
+        return response.data
+
+    async def acreate_contacts(self, payloads: List[Dict]) -> List[Dict]:
+        if not payloads:
+            return []
+        client = await get_async_supabase()
+        response = await client.table("contacts").insert(payloads, default_to_null=False).execute()
+        return response.data
+
+    def update_contact(self, contact_id: str, data: Dict) -> Optional[Dict]:
+        response = get_supabase().table("contacts").update(data).eq("id", contact_id).execute()
+        return response.data[0] if response.data else None
+
+    async def aupdate_contact(self, contact_id: str, data: Dict) -> Optional[Dict]:
+        client = await get_async_supabase()
+        response = await client.table("contacts").update(data).eq("id", contact_id).execute()
+        return response.data[0] if response.data else None
+
+    def update_contact_if_unchanged(self, contact_id: str, data: Dict, updated_at: str) -> Optional[Dict]:
+        response = (get_supabase().table("contacts").update(data)
+                    .eq("id", contact_id).eq("updated_at", updated_at).execute())
+        return response.data[0] if response.data else None
+
+    async def aupdate_contact_if_unchanged(self, contact_id: str, data: Dict, updated_at: str) -> Optional[Dict]:
+        client = await get_async_supabase()
+        response = await (client.table("contacts").update(data)
+                          .eq("id", contact_id).eq("updated_at", updated_at).execute())
+        return response.data[0] if response.data else None
+
+    def merge_contact_profile(self, contact_id: str, patch: Dict) -> Optional[Dict]:
+        response = get_supabase().rpc(
+            "merge_contact_profile",
+            {"p_contact_id": contact_id, "p_patch": patch, "p_text_max_chars": PROFILE_TEXT_MAX_CHARS}
+        ).execute()
+        return response.data[0] if response.data else None
+
+    async def amerge_contact_profile(self, contact_id: str, patch: Dict) -> Optional[Dict]:
+        client = await get_async_supabase()
+        response = await client.rpc(
+            "merge_contact_profile",
+            {"p_contact_id": contact_id, "p_patch": patch, "p_text_max_chars": PROFILE_TEXT_MAX_CHARS}
+        ).execute()
+        return response.data[0] if response.data else None
+
+    @staticmethod
+    def _by_id(patches: Dict[str, Dict], rows: List[Dict]) -> Dict[str, Optional[Dict]]:
+        by_id = {str(row["id"]): row for row in rows or []}
+        return {contact_id: by_id.get(str(contact_id).lower()) for contact_id in patches}
+
+    def merge_contact_profiles(self, patches: Dict[str, Dict]) -> Dict[str, Optional[Dict]]:
+        response = get_supabase().rpc(
+            "merge_contact_profiles",
+            {"p_patches": patches, "p_text_max_chars": PROFILE_TEXT_MAX_CHARS}
+        ).execute()
+        return self._by_id(patches, response.data)
+
+    async def amerge_contact_profiles(self, patches: Dict[str, Dict]) -> Dict[str, Optional[Dict]]:
+        client = await get_async_supabase()
+        response = await client.rpc(
+            "merge_contact_profiles",
+            {"p_patches": patches, "p_text_max_chars": PROFILE_TEXT_MAX_CHARS}
+        ).execute()
+        return self._by_id(patches, response.data)
+
+    def delete_contact(self, contact_id: str) -> bool:
+        response = get_supabase().table("contacts").delete().eq("id", contact_id).execute()
+        return bool(response.data)
+
+    async def adelete_contact(self, contact_id: str) -> bool:
+        client = await get_async_supabase()
+        response = await client.table("contacts").delete().eq("id", contact_id).execute()
+        return bool(response.data)
+
+    @staticmethod
+    def _due_query(client, default_freq_days: int, limit: Optional[int]):
+        """Build the get_due_contacts RPC call (db/migrations/002_contacts_next_due_at.sql)"""
+        return client.rpc(
+            "get_due_contacts",
+            {"p_default_freq_days": default_freq_days, "p_limit": limit}
+        )
+
+    def get_due_contacts(self, default_freq_days: int = 7, limit: Optional[int] = None) -> List[Dict]:
+        return self._due_query(get_supabase(), default_freq_days, limit).execute().data
+
+    async def aget_due_contacts(self, default_freq_days: int = 7, limit: Optional[int] = None) -> List[Dict]:
+        client = await get_async_supabase()
+        return (await self._due_query(client, default_freq_days, limit).execute()).data
+
+    @staticmethod
+    def _search_query(client, query: str, limit: int, after: Optional[Tuple[float, str]]):
+        """Build the search_contacts RPC call (db/migrations/003_contact_search.sql)"""
+        after_rank, after_id = after if after else (None, None)
+        return client.rpc(
+            "search_contacts",
+            {
+                "p_query": query,
+                "p_limit": limit,
+                "p_after_rank": after_rank,
+                "p_after_id": after_id,
+            }
+        )
+
+    def search_contacts(self, query: str, limit: int = 10,
+                        after: Optional[Tuple[float, str]] = None) -> List[Dict[str, Any]]:
+        return self._search_query(get_supabase(), query, limit, after).execute().data
+
+    async def asearch_contacts(self, query: str, limit: int = 10,
+                               after: Optional[Tuple[float, str]] = None) -> List[Dict[str, Any]]:
+        client = await get_async_supabase()
+        return (await self._search_query(client, query, limit, after).execute()).data
@@ -0,0 +1,3 @@
+"""
+Load-test harness for the backend (see loadtest/run.py).
+"""
@@ -0,0 +1,285 @@
+"""
+Fake Gemini API server for load tests.
+
+Implements the generateContent and streamGenerateContent endpoints used by
+GeminiClient, with configurable latency and token rate, plus the
+cachedContents endpoints for context caching, and counts the calls it
+receives. Point the backend at it with GEMINI_BASE_URL.
+
+Settings (environment variables):
+    FAKE_GEMINI_LATENCY_MS: time to first token (default 300)
+    FAKE_GEMINI_TOKENS_PER_SECOND: generation speed after the first token (default 100)
+    FAKE_GEMINI_REPLY_TOKENS: length of a plain text reply in tokens (default 60)
+    FAKE_GEMINI_CACHE_MIN_TOKENS: smallest cacheable content, as the real API
+        enforces per model (default 0)
+    FAKE_GEMINI_ERROR_RATE: fraction of generate calls answered with 503 after
+        the usual latency (default 0); POST /__errors?rate=... changes it at
+        runtime, e.g. to simulate an outage
+
+Run with: uvicorn loadtest.fake_gemini:app --port 8100
+"""
+import asyncio
+import json
+import os
+import random
+import time
+import uuid
+from typing import Any, AsyncIterator, Dict, List, Optional
+
+from fastapi import FastAPI, HTTPException, Request
+from fastapi.responses import JSONResponse, StreamingResponse
+
+LATENCY_MS = float(os.getenv("FAKE_GEMINI_LATENCY_MS", "300"))
+TOKENS_PER_SECOND = float(os.getenv("FAKE_GEMINI_TOKENS_PER_SECOND", "100"))
+REPLY_TOKENS = int(os.getenv("FAKE_GEMINI_REPLY_TOKENS", "60"))
+CACHE_MIN_TOKENS = int(os.getenv("FAKE_GEMINI_CACHE_MIN_TOKENS", "0"))
+faults = {"error_rate": float(os.getenv("FAKE_GEMINI_ERROR_RATE", "0"))}
+
+# Rough token estimate for prompt text
+CHARS_PER_TOKEN = 4
+
+# Tokens per streamed chunk
+STREAM_CHUNK_TOKENS = 8
+
+EXTRACTION = {
+    "interests": ["hiking", "jazz"],
+    "preferences": {"likes": ["hiking"], "dislikes": []},
+    "conversation_topics": ["new job"],
+    "personality": "Sounds excited about the new job.",
+    "last_connection": "today",
+}
+
+app = FastAPI(title="Fake Gemini API")
+
+stats: Dict[str, Any] = {}
+# cachedContents by name: {"contents", "expires_at", "chars"}
+cached_contents: Dict[str, Dict[str, Any]] = {}
+
+
+def _reset_stats() -> None:
+    stats.update({
+        "calls": 0,
+        "generate": 0,
+        "stream": 0,
+        "structured": 0,
+        "extraction": 0,
+        "in_flight": 0,
+        "max_in_flight": 0,
+        "prompt_chars": 0,
+        "cached_calls": 0,
+        "cached_prompt_chars": 0,
+        "cache_creates": 0,
+        "cache_updates": 0,
+        "cache_deletes": 0,
+        "errors": 0,
+    })
+
+
+_reset_stats()
+
+
+def _reply_tokens() -> List[str]:
+    return [f"word{i} " for i in range(REPLY_TOKENS)]
+
+
+def _text(contents: List[Dict[str, Any]]) -> str:
+    return "".join(part.get("text", "") for content in contents for part in content.get("parts", []))
+
+
+def _error(code: int, status: str, message: str) -> JSONResponse:
+    """An error in the Google API format"""
+    return JSONResponse(status_code=code, content={"error": {"code": code, "message": message, "status": status}})
+
+
+def _cached_content(name: Optional[str]) -> Optional[Dict[str, Any]]:
+    entry = cached_contents.get(name) if name else None
+    if entry and entry["expires_at"] <= time.time():
+        del cached_contents[name]
+        return None
+    return entry
+
+
+def _response_text(body: Dict[str, Any], cached_prefix: str = "") -> str:
+    """Pick a response shaped like what the backend asked for"""
+    config = body.get("generationConfig") or {}
+    sent = _text(body.get("contents", []))
+    stats["prompt_chars"] += len(sent)
+    prompt = cached_prefix + sent
+
+    if config.get("responseMimeType") == "application/json":
+        # Combined reply + extraction call (COMBINED_RESPONSE_SCHEMA)
+        stats["structured"] += 1
+        return json.dumps({"reply": "".join(_reply_tokens()).strip(), "profile": EXTRACTION})
+    if "Message: '" in prompt[-2000:]:
+        # Profile extraction prompt
+        stats["extraction"] += 1
+        return "```json\n" + json.dumps(EXTRACTION) + "\n```"
+    return "".join(_reply_tokens()).strip()
+
+
+def _candidate(text: str, usage: Optional[Dict[str, int]] = None) -> Dict[str, Any]:
+    response = {
+        "candidates": [{
+            "content": {"parts": [{"text": text}], "role": "model"},
+            "finishReason": "STOP",
+            "index": 0,
+        }],
+        "modelVersion": "fake",
+    }
+    if usage:
+        response["usageMetadata"] = usage
+    return response
+
+
+def _usage(body: Dict[str, Any], cached: Optional[Dict[str, Any]]) -> Dict[str, int]:
+    cached_tokens = cached["chars"] // CHARS_PER_TOKEN if cached else 0
+    usage = {"promptTokenCount": len(_text(body.get("contents", []))) // CHARS_PER_TOKEN + cached_tokens}
+    if cached_tokens:
+        usage["cachedContentTokenCount"] = cached_tokens
+    return usage
+
+
+def _generation_seconds(text: str) -> float:
+    """Time to generate the text after the first token"""
+    tokens = max(len(text.split()), 1)
+    return tokens / TOKENS_PER_SECOND if TOKENS_PER_SECOND > 0 else 0.0
+
+
+class _InFlight:
+    def __enter__(self):
+        stats["calls"] += 1
+        stats["in_flight"] += 1
+        stats["max_in_flight"] = max(stats["max_in_flight"], stats["in_flight"])
+
+    def __exit__(self, *exc):
+        stats["in_flight"] -= 1
+
+
+@app.post("/{version}/models/{model_action}")
+async def models_action(version: str, model_action: str, request: Request):
+    """generateContent and streamGenerateContent (alt=sse)"""
+    _, _, action = model_action.partition(":")
+    body = await request.json()
+    if action not in ("generateContent", "streamGenerateContent"):
+        raise HTTPException(status_code=404, detail=f"Unsupported action: {action}")
+
+    cached = None
+    if body.get("cachedContent"):
+        cached = _cached_content(body["cachedContent"])
+        if cached is None:
+            return _error(403, "PERMISSION_DENIED", "CachedContent not found (or permission denied)")
+        stats["cached_calls"] += 1
+        stats["cached_prompt_chars"] += cached["chars"]
+    cached_prefix = _text(cached["contents"]) if cached else ""
+
+    if random.random() < faults["error_rate"]:
+        with _InFlight():
+            stats["errors"] += 1
+            await asyncio.sleep(LATENCY_MS / 1000)
+            return _error(503, "UNAVAILABLE", "The model is overloaded. Please try again later.")
+
+    if action == "generateContent":
+        with _InFlight():
+            stats["generate"] += 1
+            text = _response_text(body, cached_prefix)
+            await asyncio.sleep(LATENCY_MS / 1000 + _generation_seconds(text))
+            return _candidate(text, _usage(body, cached))
+
+    stats["stream"] += 1
+    return StreamingResponse(_stream(body, cached_prefix), media_type="text/event-stream")
+
+
+async def _stream(body: Dict[str, Any], cached_prefix: str = "") -> AsyncIterator[str]:
+    with _InFlight():
+        text = _response_text(body, cached_prefix)
+        words = [w + " " for w in text.split()]
+        await asyncio.sleep(LATENCY_MS / 1000)
+        for start in range(0, len(words), STREAM_CHUNK_TOKENS):
+            chunk = words[start:start + STREAM_CHUNK_TOKENS]
+            if start and TOKENS_PER_SECOND > 0:
+                await asyncio.sleep(len(chunk) / TOKENS_PER_SECOND)
+            yield f"data: {json.dumps(_candidate(''.join(chunk)))}\r\n\r\n"
+
+
+def _ttl_seconds(body: Dict[str, Any]) -> float:
+    return float(str(body.get("ttl", "3600s")).rstrip("s"))
+
+
+def _cache_resource(name: str, entry: Dict[str, Any]) -> Dict[str, Any]:
+    expire_time = time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime(entry["expires_at"]))
+    return {
+        "name": name,
+        "model": entry["model"],
+        "displayName": entry.get("display_name", ""),
+        "expireTime": expire_time,
+        "usageMetadata": {"totalTokenCount": entry["chars"] // CHARS_PER_TOKEN},
+    }
+
+
+@app.post("/{version}/cachedContents")
+async def create_cached_content(version: str, request: Request):
+    body = await request.json()
+    contents = body.get("contents") or []
+    chars = len(_text(contents))
+    if chars // CHARS_PER_TOKEN < CACHE_MIN_TOKENS:
+        return _error(400, "INVALID_ARGUMENT",
+                      f"Cached content is too small. total_token_count={chars // CHARS_PER_TOKEN}, "
+                      f"min_total_token_count={CACHE_MIN_TOKENS}")
+
+    name = f"cachedContents/{uuid.uuid4().hex[:12]}"
+    cached_contents[name] = {
+        "model": body.get("model", ""),
+        "display_name": body.get("displayName", ""),
+        "contents": contents,
+        "chars": chars,
+        "expires_at": time.time() + _ttl_seconds(body),
+    }
+    stats["cache_creates"] += 1
+    return _cache_resource(name, cached_contents[name])
+
+
+@app.get("/{version}/cachedContents/{cache_id}")
+async def get_cached_content(version: str, cache_id: str):
+    name = f"cachedContents/{cache_id}"
+    entry = _cached_content(name)
+    if entry is None:
+        return _error(403, "PERMISSION_DENIED", "CachedContent not found (or permission denied)")
+    return _cache_resource(name, entry)
+
+
+@app.patch("/{version}/cachedContents/{cache_id}")
+async def update_cached_content(version: str, cache_id: str, request: Request):
+    name = f"cachedContents/{cache_id}"
+    entry = _cached_content(name)
+    if entry is None:
+        return _error(403, "PERMISSION_DENIED", "CachedContent not found (or permission denied)")
+    entry["expires_at"] = time.time() + _ttl_seconds(await request.json())
+    stats["cache_updates"] += 1
+    return _cache_resource(name, entry)
+
+
+@app.delete("/{version}/cachedContents/{cache_id}")
+async def delete_cached_content(version: str, cache_id: str):
+    cached_contents.pop(f"cachedContents/{cache_id}", None)
+    stats["cache_deletes"] += 1
+    return {}
+
+
+@app.get("/__stats")
+async def get_stats():
+    """Call counters since the last reset"""
+    return {**stats, "time": time.time()}
+
+
+@app.post("/__errors")
+async def set_error_rate(rate: float):
+    """Answer this fraction of generate calls with 503 from now on"""
+    faults["error_rate"] = rate
+    return faults
+
+
+@app.post("/__reset")
+async def reset_stats():
+    """Reset the counters (cached contents are kept, like the real API's)"""
+    _reset_stats()
+    return {"ok": True}
@@ -0,0 +1,194 @@
+"""
+Local PostgREST stand-in for the contacts table, for load tests.
+
+Serves the subset of the PostgREST API that SupabaseContactRepository uses
+(table reads, inserts, updates, deletes and the RPCs from db/migrations),
+backed by SqliteContactRepository, and counts the calls it receives. Point
+the backend at it with SUPABASE_URL.
+
+Settings (environment variables):
+    FAKE_POSTGREST_LATENCY_MS: extra latency per request, e.g. network round trip (default 2)
+    FAKE_POSTGREST_CONTACTS: number of contacts seeded at startup (default 500)
+    FAKE_POSTGREST_DB: SQLite database path (default in memory)
+
+Run with: uvicorn loadtest.fake_postgrest:app --port 8200
+"""
+import asyncio
+import os
+import random
+import re
+import time
+from collections import Counter
+from contextlib import asynccontextmanager
+from datetime import datetime, timedelta, timezone
+from typing import Any, Dict, List, Optional, Tuple
+
+from fastapi import FastAPI, HTTPException, Request
+
+from db.sqliteContactRepository import SqliteContactRepository
+
+LATENCY_MS = float(os.getenv("FAKE_POSTGREST_LATENCY_MS", "2"))
+SEED_CONTACTS = int(os.getenv("FAKE_POSTGREST_CONTACTS", "500"))
+DB_PATH = os.getenv("FAKE_POSTGREST_DB", ":memory:")
+
+INTERESTS = ["hiking", "jazz", "chess", "cooking", "football", "photography", "travel",
+             "gardening", "cycling", "painting", "reading", "yoga", "movies", "coffee"]
+NAMES = ["Alice", "Bruno", "Carla", "Diego", "Elena", "Farid", "Greta", "Hugo", "Ines", "Jonas"]
+
+# or=(name.gt."X",and(name.eq."X",id.gt."Y")) as built for keyset pagination
+_QUOTED = r'"((?:[^"\\]|\\.)*)"'
+_KEYSET_RE = re.compile(rf'^\(name\.gt\.{_QUOTED},and\(name\.eq\.{_QUOTED},id\.gt\.{_QUOTED}\)\)$')
+
+repository = SqliteContactRepository(DB_PATH)
+stats: Counter = Counter()
+
+
+def seed_contacts(repo: SqliteContactRepository, count: int, seed: int = 7) -> None:
+    """Create count contacts with a realistic mix of profiles and contact dates"""
+    rng = random.Random(seed)
+    now = datetime.now(timezone.utc)
+    for i in range(count):
+        repo.create_contact({
+            "name": f"{rng.choice(NAMES)} {i:05d}",
+            "relationship_type": rng.choice(["friend", "family", "colleague"]),
+            "relationship_strength": rng.randint(1, 5),
+            "interests": rng.sample(INTERESTS, rng.randint(0, 6)),
+            "conversation_topics": rng.sample(INTERESTS, rng.randint(0, 3)),
+            "preferences": {"likes": rng.sample(INTERESTS, rng.randint(0, 3)), "dislikes": []},
+            "personality": "Friendly and curious." if rng.random() < 0.5 else None,
+            "last_connection": (now - timedelta(days=rng.randint(0, 60))).isoformat(),
+            "recommended_contact_freq_days": rng.choice([None, 7, 14, 30]),
+        })
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    if not repository.list_contacts(limit=1):
+        seed_contacts(repository, SEED_CONTACTS)
+    yield
+
+
+app = FastAPI(title="Fake PostgREST", lifespan=lifespan)
+
+
+def _unquote(value: str) -> str:
+    return re.sub(r'\\(.)', r'\1', value)
+
+
+def _eq(params, field: str) -> Optional[str]:
+    value = params.get(field)
+    if value is None:
+        return None
+    if not value.startswith("eq."):
+        raise HTTPException(status_code=400, detail=f"Unsupported filter on {field}: {value}")
+    return value[3:]
+
+
+def _contact_id(params) -> str:
+    contact_id = _eq(params, "id")
+    if contact_id is None:
+        raise HTTPException(status_code=400, detail="Only id=eq.<id> filters are supported")
+    return contact_id
+
+
+async def _count(name: str) -> None:
+    stats["calls"] += 1
+    stats[name] += 1
+    if LATENCY_MS:
+        await asyncio.sleep(LATENCY_MS / 1000)
+
+
+@app.get("/rest/v1/contacts")
+async def select_contacts(request: Request) -> List[Dict]:
+    await _count("select")
+    params = request.query_params
+
+    if "id" in params:
+        contact = repository.get_contact(_contact_id(params))
+        return [contact] if contact else []
+
+    search = None
+    if "name" in params:
+        if not params["name"].startswith("ilike."):
+            raise HTTPException(status_code=400, detail="Only name=ilike.<pattern> is supported")
+        search = params["name"][len("ilike."):].strip("%*")
+
+    strength, min_strength = None, None
+    if "relationship_strength" in params:
+        op, _, value = params["relationship_strength"].partition(".")
+        if op == "eq":
+            strength = int(value)
+        elif op == "gte":
+            min_strength = int(value)
+
+    after: Optional[Tuple[str, str]] = None
+    if "or" in params:
+        match = _KEYSET_RE.match(params["or"])
+        if not match:
+            raise HTTPException(status_code=400, detail=f"Unsupported or filter: {params['or']}")
+        after = (_unquote(match.group(1)), _unquote(match.group(3)))
+
+    return repository.list_contacts(
+        search=search,
+        relationship_type=_eq(params, "relationship_type"),
+        relationship_strength=strength,
+        min_strength=min_strength,
+        limit=int(params.get("limit", 1000)),
+        after=after,
+    )
+
+
+@app.post("/rest/v1/contacts", status_code=201)
+async def insert_contacts(request: Request) -> List[Dict]:
+    await _count("insert")
+    body = await request.json()
+    rows = body if isinstance(body, list) else [body]
+    return [repository.create_contact(row) for row in rows]
+
+
+@app.patch("/rest/v1/contacts")
+async def update_contacts(request: Request) -> List[Dict]:
+    await _count("update")
+    contact = repository.update_contact(_contact_id(request.query_params), await request.json())
+    return [contact] if contact else []
+
+
+@app.delete("/rest/v1/contacts")
+async def delete_contacts(request: Request) -> List[Dict]:
+    await _count("delete")
+    contact_id = _contact_id(request.query_params)
+    contact = repository.get_contact(contact_id)
+    if contact and repository.delete_contact(contact_id):
+        return [contact]
+    return []
+
+
+@app.post("/rest/v1/rpc/{function}")
+async def rpc(function: str, request: Request) -> Any:
+    await _count(f"rpc:{function}")
+    args = await request.json()
+
+    if function == "get_due_contacts":
+        return repository.get_due_contacts(args.get("p_default_freq_days", 7), args.get("p_limit"))
+    if function == "merge_contact_profile":
+        contact = repository.merge_contact_profile(args["p_contact_id"], args["p_patch"])
+        return [contact] if contact else []
+    if function == "search_contacts":
+        after = None
+        if args.get("p_after_rank") is not None:
+            after = (args["p_after_rank"], args["p_after_id"])
+        return repository.search_contacts(args["p_query"], args.get("p_limit", 10), after)
+
+    raise HTTPException(status_code=404, detail=f"Unknown function: {function}")
+
+
+@app.get("/__stats")
+async def get_stats():
+    """Call counters since the last reset"""
+    return {**stats, "time": time.time()}
+
+
+@app.post("/__reset")
+async def reset_stats():
+    stats.clear()
+    return {"ok": True}
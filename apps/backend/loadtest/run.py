@@ -0,0 +1,326 @@
+"""
+End-to-end load test for the backend.
+
+Starts the fake Gemini server, the PostgREST stand-in and the real app
+(main:app under uvicorn, pointed at the fakes), drives a weighted mix of
+requests against it and reports throughput, latency percentiles and the
+number of upstream calls per request. A /ping probe runs alongside the load;
+its latency rising with load means something is blocking the event loop.
+
+Usage (from apps/backend):
+    python -m loadtest.run --duration 30 --concurrency 50
+    python -m loadtest.run --mix send=1 --gemini-latency-ms 800 --workers 4
+    python -m loadtest.run --json results.json
+
+Nothing leaves the machine: no API quota is used and no shared database is
+touched.
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import socket
+import subprocess
+import sys
+import time
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+import httpx
+
+BACKEND_DIR = Path(__file__).resolve().parent.parent
+
+# Dummy JWT-shaped key accepted by the Supabase client
+FAKE_SUPABASE_KEY = "eyJhbGciOiJIUzI1NiJ9.eyJyb2xlIjoiYW5vbiJ9.c2ln"
+
+DEFAULT_MIX = "send=40,greeting=20,contacts=30,due=10"
+MESSAGES = [
+    "We went hiking last weekend and she loved it.",
+    "He just started a new job and is a bit stressed.",
+    "She mentioned her sister is visiting in June.",
+    "We talked about jazz and old movies for hours.",
+]
+
+PING_INTERVAL_SECONDS = 0.1
+
+
+def _free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def _start_server(app: str, port: int, env: Dict[str, str], workers: int = 1,
+                  verbose: bool = False) -> subprocess.Popen:
+    """Start a uvicorn server for app on 127.0.0.1:port (stdout is discarded unless verbose)"""
+    return subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", app, "--host", "127.0.0.1", "--port", str(port),
+         "--workers", str(workers), "--log-level", "warning", "--no-access-log"],
+        cwd=BACKEND_DIR,
+        env={**os.environ, **env},
+        stdout=None if verbose else subprocess.DEVNULL,
+    )
+
+
+async def _wait_ready(client: httpx.AsyncClient, url: str, timeout: float = 30.0) -> None:
+    deadline = time.monotonic() + timeout
+    while True:
+        try:
+            if (await client.get(url)).status_code < 500:
+                return
+        except httpx.TransportError:
+            pass
+        if time.monotonic() > deadline:
+            raise RuntimeError(f"Server at {url} did not start within {timeout}s")
+        await asyncio.sleep(0.2)
+
+
+def _parse_mix(mix: str) -> Dict[str, float]:
+    weights = {}
+    for item in mix.split(","):
+        name, _, weight = item.partition("=")
+        if name not in ("send", "greeting", "contacts", "due"):
+            raise ValueError(f"Unknown request type in mix: {name}")
+        weights[name] = float(weight or 1)
+    return weights
+
+
+def _percentile(values: List[float], pct: float) -> float:
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, max(0, int(round(pct / 100 * len(ordered))) - 1))
+    return ordered[index]
+
+
+class LoadGenerator:
+    """Closed-loop load: each virtual user sends its next request when the previous one finishes."""
+
+    def __init__(self, base_url: str, contact_ids: List[str], mix: Dict[str, float],
+                 concurrency: int, duration: float, seed: int = 1):
+        self.base_url = base_url
+        self.contact_ids = contact_ids
+        self.kinds = list(mix)
+        self.weights = [mix[k] for k in self.kinds]
+        self.concurrency = concurrency
+        self.duration = duration
+        self.rng = random.Random(seed)
+        self.latencies: Dict[str, List[float]] = {k: [] for k in self.kinds}
+        self.errors: Dict[str, int] = {k: 0 for k in self.kinds}
+        # Requests answered with 429 by the rate limiter or the admission queue
+        self.shed: Dict[str, int] = {k: 0 for k in self.kinds}
+        self.ping_latencies: List[float] = []
+
+    def _request(self, kind: str) -> Tuple[str, str, Optional[Dict[str, Any]]]:
+        contact_id = self.rng.choice(self.contact_ids)
+        if kind == "send":
+            return "POST", f"/chat/{contact_id}/send", {"message": self.rng.choice(MESSAGES)}
+        if kind == "greeting":
+            return "GET", f"/chat/{contact_id}/greeting", None
+        if kind == "contacts":
+            return "GET", "/contacts", None
+        return "GET", "/contacts/due-for-contact", None
+
+    async def _user(self, client: httpx.AsyncClient, deadline: float, user: int) -> None:
+        headers = {"X-User-Id": f"loadtest-{user}"}
+        while time.monotonic() < deadline:
+            kind = self.rng.choices(self.kinds, self.weights)[0]
+            method, path, body = self._request(kind)
+            start = time.perf_counter()
+            status = None
+            try:
+                response = await client.request(method, path, json=body, headers=headers)
+                status = response.status_code
+            except httpx.HTTPError:
+                pass
+            self.latencies[kind].append(time.perf_counter() - start)
+            if status == 429:
+                self.shed[kind] += 1
+            elif status is None or status >= 400:
+                self.errors[kind] += 1
+
+    async def _probe(self, client: httpx.AsyncClient, deadline: float) -> None:
+        while time.monotonic() < deadline:
+            start = time.perf_counter()
+            try:
+                await client.get("/ping")
+                self.ping_latencies.append(time.perf_counter() - start)
+            except httpx.HTTPError:
+                pass
+            await asyncio.sleep(PING_INTERVAL_SECONDS)
+
+    async def run(self) -> float:
+        """Run the load; returns the elapsed time in seconds"""
+        limits = httpx.Limits(max_connections=self.concurrency + 1, max_keepalive_connections=self.concurrency + 1)
+        async with httpx.AsyncClient(base_url=self.base_url, limits=limits, timeout=120) as client, \
+                httpx.AsyncClient(base_url=self.base_url, timeout=120) as probe_client:
+            start = time.monotonic()
+            deadline = start + self.duration
+            await asyncio.gather(
+                self._probe(probe_client, deadline),
+                *(self._user(client, deadline, user) for user in range(self.concurrency)),
+            )
+            return time.monotonic() - start
+
+
+def _report(generator: LoadGenerator, elapsed: float,
+            gemini_stats: Dict[str, Any], postgrest_stats: Dict[str, Any]) -> Dict[str, Any]:
+    """Print the results and return them as a dictionary"""
+    ms = lambda seconds: round(seconds * 1000, 1)
+    total = sum(len(v) for v in generator.latencies.values())
+    chat_requests = len(generator.latencies.get("send", [])) + len(generator.latencies.get("greeting", []))
+
+    report: Dict[str, Any] = {
+        "elapsed_seconds": round(elapsed, 2),
+        "requests": total,
+        "throughput_rps": round(total / elapsed, 1) if elapsed else 0.0,
+        "endpoints": {},
+        "ping_probe_ms": {
+            "p50": ms(_percentile(generator.ping_latencies, 50)),
+            "p99": ms(_percentile(generator.ping_latencies, 99)),
+            "max": ms(max(generator.ping_latencies, default=0.0)),
+        },
+        "upstream": {
+            "gemini_calls": gemini_stats.get("calls", 0),
+            "gemini_calls_per_request": round(gemini_stats.get("calls", 0) / total, 2) if total else 0.0,
+            "gemini_calls_per_chat_request": round(gemini_stats.get("calls", 0) / chat_requests, 2) if chat_requests else 0.0,
+            "gemini_max_in_flight": gemini_stats.get("max_in_flight", 0),
+            "gemini_cached_calls": gemini_stats.get("cached_calls", 0),
+            "gemini_prompt_chars_per_call": round(gemini_stats.get("prompt_chars", 0) / gemini_stats["calls"])
+            if gemini_stats.get("calls") else 0,
+            "postgrest_calls": postgrest_stats.get("calls", 0),
+            "postgrest_calls_per_request": round(postgrest_stats.get("calls", 0) / total, 2) if total else 0.0,
+            "postgrest_by_route": {k: v for k, v in postgrest_stats.items() if k not in ("calls", "time")},
+        },
+    }
+
+    print(f"\n{'endpoint':10} {'requests':>9} {'errors':>7} {'shed':>6} {'rps':>8} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9} {'max ms':>9}")
+    for kind, values in generator.latencies.items():
+        row = {
+            "requests": len(values),
+            "errors": generator.errors[kind],
+            "shed": generator.shed[kind],
+            "rps": round(len(values) / elapsed, 1) if elapsed else 0.0,
+            "p50_ms": ms(_percentile(values, 50)),
+            "p95_ms": ms(_percentile(values, 95)),
+            "p99_ms": ms(_percentile(values, 99)),
+            "max_ms": ms(max(values, default=0.0)),
+        }
+        report["endpoints"][kind] = row
+        print(f"{kind:10} {row['requests']:9d} {row['errors']:7d} {row['shed']:6d} {row['rps']:8.1f} {row['p50_ms']:9.1f} "
+              f"{row['p95_ms']:9.1f} {row['p99_ms']:9.1f} {row['max_ms']:9.1f}")
+
+    upstream = report["upstream"]
+    print(f"\nTotal: {total} requests in {elapsed:.1f}s ({report['throughput_rps']} req/s)")
+    print(f"/ping probe: p50 {report['ping_probe_ms']['p50']} ms, p99 {report['ping_probe_ms']['p99']} ms, "
+          f"max {report['ping_probe_ms']['max']} ms (high values mean the event loop is blocked)")
+    print(f"Gemini: {upstream['gemini_calls']} calls, {upstream['gemini_calls_per_chat_request']} per chat request, "
+          f"max {upstream['gemini_max_in_flight']} in flight, {upstream['gemini_cached_calls']} with cached prefix, "
+          f"{upstream['gemini_prompt_chars_per_call']} prompt chars sent per call")
+    print(f"PostgREST: {upstream['postgrest_calls']} calls, {upstream['postgrest_calls_per_request']} per request "
+          f"{upstream['postgrest_by_route']}")
+    return report
+
+
+async def run_load_test(args: argparse.Namespace) -> Dict[str, Any]:
+    gemini_port, postgrest_port, app_port = _free_port(), _free_port(), _free_port()
+    gemini_url = f"http://127.0.0.1:{gemini_port}"
+    postgrest_url = f"http://127.0.0.1:{postgrest_port}"
+    app_url = f"http://127.0.0.1:{app_port}"
+
+    servers = [
+        _start_server("loadtest.fake_gemini:app", gemini_port, {
+            "FAKE_GEMINI_LATENCY_MS": str(args.gemini_latency_ms),
+            "FAKE_GEMINI_TOKENS_PER_SECOND": str(args.gemini_tokens_per_second),
+            "FAKE_GEMINI_REPLY_TOKENS": str(args.reply_tokens),
+            "FAKE_GEMINI_CACHE_MIN_TOKENS": str(args.cache_min_tokens),
+            "FAKE_GEMINI_ERROR_RATE": str(args.gemini_error_rate),
+        }),
+        _start_server("loadtest.fake_postgrest:app", postgrest_port, {
+            "FAKE_POSTGREST_LATENCY_MS": str(args.db_latency_ms),
+            "FAKE_POSTGREST_CONTACTS": str(args.contacts),
+        }),
+    ]
+    app_env = {
+        "SUPABASE_URL": postgrest_url,
+        "SUPABASE_KEY": FAKE_SUPABASE_KEY,
+        "CONTACT_STORE": "supabase",
+        "GEMINI_API_KEY": "fake-key",
+        "GEMINI_BASE_URL": gemini_url,
+    }
+    if args.response_mode:
+        app_env["CHAT_RESPONSE_MODE"] = args.response_mode
+    # Closed-loop virtual users would mostly measure the rate limiter
+    app_env["RATE_LIMIT_ENABLED"] = "true" if args.rate_limit else "false"
+    # Every virtual user connects from localhost; tell them apart by X-User-Id
+    app_env["RATE_LIMIT_TRUST_USER_HEADER"] = "true"
+
+    try:
+        async with httpx.AsyncClient(timeout=10) as client:
+            await _wait_ready(client, f"{gemini_url}/__stats")
+            await _wait_ready(client, f"{postgrest_url}/__stats")
+            servers.append(_start_server("main:app", app_port, app_env, workers=args.workers, verbose=args.verbose))
+            await _wait_ready(client, f"{app_url}/ping")
+
+            page = (await client.get(f"{app_url}/contacts", params={"limit": 200})).json()
+            contact_ids = [c["id"] for c in page["contacts"]]
+            if not contact_ids:
+                raise RuntimeError("No contacts to load-test against")
+
+            await client.post(f"{gemini_url}/__reset")
+            await client.post(f"{postgrest_url}/__reset")
+
+            print(f"Running {args.duration}s at concurrency {args.concurrency} "
+                  f"with mix {args.mix} against {args.workers} worker(s)...")
+            generator = LoadGenerator(app_url, contact_ids, _parse_mix(args.mix),
+                                      args.concurrency, args.duration, args.seed)
+            elapsed = await generator.run()
+
+            gemini_stats = (await client.get(f"{gemini_url}/__stats")).json()
+            postgrest_stats = (await client.get(f"{postgrest_url}/__stats")).json()
+    finally:
+        for server in servers:
+            server.terminate()
+        for server in servers:
+            try:
+                server.wait(timeout=10)
+            except subprocess.TimeoutExpired:
+                server.kill()
+
+    return _report(generator, elapsed, gemini_stats, postgrest_stats)
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="End-to-end load test with fake Gemini and PostgREST")
+    parser.add_argument("--duration", type=float, default=30, help="seconds of load (default 30)")
+    parser.add_argument("--concurrency", type=int, default=50, help="concurrent virtual users (default 50)")
+    parser.add_argument("--mix", default=DEFAULT_MIX,
+                        help=f"request weights, any of send/greeting/contacts/due (default {DEFAULT_MIX})")
+    parser.add_argument("--workers", type=int, default=1, help="uvicorn workers for the app (default 1)")
+    parser.add_argument("--contacts", type=int, default=500, help="contacts seeded in the fake database")
+    parser.add_argument("--response-mode", choices=["split", "combined", "deferred"],
+                        help="CHAT_RESPONSE_MODE for the app (default: the app's own setting)")
+    parser.add_argument("--rate-limit", action="store_true",
+                        help="keep the app's per-user/contact/global rate limits on (429s are reported as shed)")
+    parser.add_argument("--gemini-latency-ms", type=float, default=300, help="fake Gemini time to first token")
+    parser.add_argument("--gemini-tokens-per-second", type=float, default=100, help="fake Gemini token rate")
+    parser.add_argument("--reply-tokens", type=int, default=60, help="fake Gemini reply length in tokens")
+    parser.add_argument("--cache-min-tokens", type=int, default=0,
+                        help="smallest prompt prefix the fake Gemini accepts for context caching")
+    parser.add_argument("--gemini-error-rate", type=float, default=0,
+                        help="fraction of fake Gemini calls failing with 503 (exercises retries and the circuit breaker)")
+    parser.add_argument("--db-latency-ms", type=float, default=2, help="extra latency per PostgREST call")
+    parser.add_argument("--seed", type=int, default=1, help="random seed for the request mix")
+    parser.add_argument("--json", type=Path, help="also write the results to this file")
+    parser.add_argument("--verbose", action="store_true", help="show the app's output")
+    args = parser.parse_args(argv)
+
+    report = asyncio.run(run_load_test(args))
+    if args.json:
+        args.json.write_text(json.dumps(report, indent=2) + "\n")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,12 +1,9 @@
-from fastapi import FastAPI
+from fastapi import FastAPI, Request
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import JSONResponse
 
 from routers import contacts, health, chat, feedback  # Import feedback router
-import sys
-sys.path.append("/home/morita/Dev/lazor-connect/apps/backend/routers")
-
-# Expose feedback_store for use in other modules
-from routers.feedback import feedback_store
+from services.admission import ServiceOverloaded
 
 app = FastAPI(
     title="Lazor Connect API",
@@ -22,6 +19,20 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+
+@app.exception_handler(ServiceOverloaded)
+async def service_overloaded(request: Request, exc: ServiceOverloaded):
+    """
+    Requests shed by the rate limiter or the Gemini admission queue get 429, and
+    requests failed fast by the open circuit breaker 503, with Retry-After
+    """
+    return JSONResponse(
+        status_code=exc.status_code,
+        content={"detail": str(exc), "retry_after": exc.retry_after},
+        headers={"Retry-After": str(exc.retry_after)},
+    )
+
+
 app.include_router(health.router)
 app.include_router(contacts.router)
 app.include_router(chat.router)
@@ -19,4 +19,4 @@ from .contact import (
 from .enums import ContactType, RelationshipType
 
 # Chat-related models
-from .chat import ChatRequest, ProfileUpdateRequest
\ No newline at end of file
+from .chat import ChatRequest, ProfileUpdateRequest, BatchExtractionItem, BatchExtractionRequest
\ No newline at end of file
@@ -2,7 +2,7 @@
 Models for chat functionality in Lazor Connect API.
 """
 
-from typing import Dict, Any
+from typing import Dict, Any, List
 from pydantic import BaseModel
 
 
@@ -12,3 +12,12 @@ class ChatRequest(BaseModel):
 
 class ProfileUpdateRequest(BaseModel):
     fields: Dict[str, Any]
+
+
+class BatchExtractionItem(BaseModel):
+    contact_id: str
+    message: str
+
+
+class BatchExtractionRequest(BaseModel):
+    items: List[BatchExtractionItem]
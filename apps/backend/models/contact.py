@@ -71,6 +71,7 @@ class ContactCreate(ContactBase):
 class Contact(ContactBase, TimestampedModel):
     """Model for contact responses, includes system fields"""
     id: UUID
+    next_due_at: Optional[datetime] = None  # Maintained by the database from last_connection
     
     class Config:
         from_attributes = True
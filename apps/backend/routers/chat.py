@@ -3,12 +3,16 @@ Chat router for Lazor Connect API.
 The focus is on helping users build rich contact profiles rather than
 maintaining conversational history.
 """
-from fastapi import APIRouter, HTTPException, Path
-from typing import Dict, Any
+import json
+from fastapi import APIRouter, Depends, Header, HTTPException, Path, Request
+from fastapi.responses import StreamingResponse
+from typing import Dict, Any, AsyncIterator, Optional
 
-from models import ChatRequest
+from models import ChatRequest, BatchExtractionRequest
+from services.admission import Priority, ServiceOverloaded, request_priority
 from services.chatService import ChatService
 from services.contactService import ContactService
+from services.rateLimiter import rate_limiter
 
 router = APIRouter(
     prefix="/chat",
@@ -19,7 +23,75 @@ router = APIRouter(
 contact_service = ContactService()
 chat_service = ChatService(contact_service)
 
-@router.post("/{contact_id}/send", response_model=Dict[str, Any])
+
+def _model_call(priority: Priority):
+    """
+    Dependency for endpoints that call the model: takes a token from the
+    rate limiter (per user, per contact and global) and sets the priority of
+    the request's model calls in the admission queue.
+    """
+    async def dependency(request: Request, x_user_id: Optional[str] = Header(None)):
+        user = rate_limiter.user_key(request.client.host if request.client else None, x_user_id)
+        rate_limiter.check(user, request.path_params.get("contact_id"))
+        request_priority.set(priority)
+    return Depends(dependency)
+
+
+async def _sse(first: Optional[Dict[str, Any]], events: AsyncIterator[Dict[str, Any]]) -> AsyncIterator[str]:
+    """Format service events as Server-Sent Events."""
+    if first is not None:
+        yield f"event: {first['event']}\ndata: {json.dumps(first['data'])}\n\n"
+    async for event in events:
+        yield f"event: {event['event']}\ndata: {json.dumps(event['data'])}\n\n"
+
+
+async def _sse_response(events: AsyncIterator[Dict[str, Any]]) -> StreamingResponse:
+    """
+    Wrap service events in a text/event-stream response.
+    The first event is awaited before responding, so a model call shed before
+    the stream starts is answered with 429 (or 503) rather than an event.
+    """
+    try:
+        first = await events.__anext__()
+    except StopAsyncIteration:
+        first = None
+    return StreamingResponse(
+        _sse(first, events),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+@router.post("/extract/batch", response_model=Dict[str, Any], status_code=202,
+             dependencies=[_model_call(Priority.BACKGROUND)])
+async def extract_batch(request: BatchExtractionRequest):
+    """
+    Extract profile data from many messages, e.g. to backfill profiles from imported notes.
+    Runs in the background: the response carries a job_id, and
+    GET /chat/extract/batch/{job_id} reports progress. Messages are extracted
+    concurrently and the results are merged per contact and written in bulk.
+    """
+    job = chat_service.start_batch_extraction([(item.contact_id, item.message) for item in request.items])
+    if "error" in job:
+        raise HTTPException(status_code=job["status_code"], detail=job["error"])
+    return job
+
+
+@router.get("/extract/batch/{job_id}", response_model=Dict[str, Any])
+async def get_batch_extraction(
+    job_id: str = Path(..., title="The ID of the batch extraction job")
+):
+    """
+    Get the progress of a batch extraction job: status ("running", "done" or
+    "failed"), messages processed out of total and contacts updated so far.
+    """
+    job = chat_service.get_batch_extraction(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Batch extraction job not found")
+    return job
+
+
+@router.post("/{contact_id}/send", response_model=Dict[str, Any], dependencies=[_model_call(Priority.INTERACTIVE)])
 async def send_message(
     contact_id: str = Path(..., title="The ID of the contact to chat with"), 
     request: ChatRequest = None
@@ -34,11 +106,26 @@ async def send_message(
     try:
         response = await chat_service.handle_message(contact_id, request.message)
         return response
+    except ServiceOverloaded:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error processing message: {str(e)}")
 
 
-@router.get("/{contact_id}/greeting", response_model=Dict[str, Any])
+@router.post("/{contact_id}/send/stream", dependencies=[_model_call(Priority.INTERACTIVE)])
+async def send_message_stream(
+    contact_id: str = Path(..., title="The ID of the contact to chat with"),
+    request: ChatRequest = None
+):
+    """
+    Streaming variant of send: the response is a Server-Sent Events stream.
+    Emits "chunk" events with response text as it is generated, a "suggestions"
+    event with the extracted profile data, and a final "done" event.
+    """
+    return await _sse_response(chat_service.stream_message(contact_id, request.message))
+
+
+@router.get("/{contact_id}/greeting", response_model=Dict[str, Any], dependencies=[_model_call(Priority.GREETING)])
 async def get_greeting(
     contact_id: str = Path(..., title="The ID of the contact to get initial greeting for")
 ):
@@ -50,5 +137,33 @@ async def get_greeting(
     try:
         greeting = await chat_service.get_initial_greeting(contact_id)
         return greeting
+    except ServiceOverloaded:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error getting greeting: {str(e)}")
+
+
+@router.get("/{contact_id}/greeting/stream", dependencies=[_model_call(Priority.GREETING)])
+async def get_greeting_stream(
+    contact_id: str = Path(..., title="The ID of the contact to get initial greeting for")
+):
+    """
+    Streaming variant of greeting: the response is a Server-Sent Events stream.
+    Emits "chunk" events with greeting text as it is generated and a final "done" event.
+    """
+    return await _sse_response(chat_service.stream_initial_greeting(contact_id))
+
+
+@router.get("/{contact_id}/suggestions", response_model=Dict[str, Any])
+async def get_suggestions(
+    contact_id: str = Path(..., title="The ID of the contact to get profile suggestions for")
+):
+    """
+    Get profile suggestions extracted in the background from recent messages.
+    Used when chat extraction runs in deferred mode: "status" is "pending" while
+    extraction jobs for this contact are still queued or running.
+    """
+    try:
+        return chat_service.get_profile_suggestions(contact_id)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error getting suggestions: {str(e)}")
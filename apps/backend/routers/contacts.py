@@ -1,12 +1,16 @@
 """
 Contact router for Lazor Connect API.
 """
-from fastapi import APIRouter, HTTPException, Query, Path
+from fastapi import APIRouter, HTTPException, Query, Path, Request
+from fastapi.responses import StreamingResponse
 from typing import List, Optional
 
 from models import Contact, ContactCreate, ContactUpdate
 from models.enums import RelationshipType
-from services.contactService import ContactService
+from services.contactService import CONTACTS_MAX_PAGE_SIZE, CONTACTS_PAGE_SIZE, ContactService
+from services.contactTransfer import (
+    CONTACTS_IMPORT_BATCH_SIZE, MEDIA_TYPES, detect_format, export_contacts, import_contacts
+)
 
 router = APIRouter(
     prefix="/contacts",
@@ -16,38 +20,94 @@ router = APIRouter(
 
 
 @router.post("", response_model=dict)  # Change to dict until we fix the model structure
-def create_contact(contact: ContactCreate):
+async def create_contact(contact: ContactCreate):
     """Create a new contact"""
-    return ContactService.create_contact(contact.model_dump(mode="json"))
+    return await ContactService.acreate_contact(contact.model_dump(mode="json"))
+
+
+@router.post("/import", response_model=dict)
+async def import_contacts_stream(
+    request: Request,
+    format: Optional[str] = Query(None, pattern="^(ndjson|csv)$",
+                                  description="ndjson or csv; defaults to csv for a text/csv body, otherwise ndjson"),
+    batch_size: int = Query(CONTACTS_IMPORT_BATCH_SIZE, ge=1, le=5000, description="Contacts inserted per database call")
+):
+    """
+    Import contacts in bulk from an NDJSON or CSV request body
+    
+    - **ndjson**: one contact object per line, with the fields of `POST /contacts`
+    - **csv**: a header row with field names, then one contact per record; list
+      and object fields hold JSON (interests and conversation_topics may also be
+      separated by semicolons)
+    
+    The body is read and inserted as it streams in, so imports of any size use
+    constant memory. Invalid rows are skipped and reported by line number.
+    
+    Returns the number of rows read, imported and failed, and the row errors.
+    """
+    fmt = format or detect_format(request.headers.get("content-type"))
+    return await import_contacts(request.stream(), fmt=fmt, batch_size=batch_size)
 
 
-@router.get("", response_model=List[dict])
-def list_contacts(
+@router.get("/export")
+async def export_contacts_stream(
+    format: str = Query("ndjson", pattern="^(ndjson|csv)$", description="ndjson or csv")
+):
+    """
+    Export all contacts as NDJSON (one contact object per line) or CSV
+    
+    Contacts are read page by page and streamed, sorted by name; the output can
+    be imported again with `POST /contacts/import`.
+    """
+    return StreamingResponse(
+        export_contacts(format),
+        media_type=MEDIA_TYPES[format],
+        headers={"Content-Disposition": f'attachment; filename="contacts.{format}"'},
+    )
+
+
+def _invalid_cursor(e: ValueError) -> HTTPException:
+    return HTTPException(status_code=400, detail=str(e))
+
+
+@router.get("", response_model=dict)
+async def list_contacts(
     search: Optional[str] = None,
     relationship_type: Optional[str] = None,
     relationship_strength: Optional[int] = Query(None, ge=1, le=5),
-    min_strength: Optional[int] = Query(None, ge=1, le=5)
+    min_strength: Optional[int] = Query(None, ge=1, le=5),
+    limit: int = Query(CONTACTS_PAGE_SIZE, ge=1, le=CONTACTS_MAX_PAGE_SIZE, description="Page size"),
+    cursor: Optional[str] = Query(None, description="next_cursor from the previous page")
 ):
     """
-    List all contacts with optional filtering
+    List contacts with optional filtering, one page at a time
     
     - **search**: Search string to filter contacts (searches in name field)
     - **relationship_type**: Filter by relationship type (friend, family, colleague, etc.)
     - **relationship_strength**: Filter by exact relationship strength (1-5 scale)
     - **min_strength**: Filter for contacts with at least this relationship strength
+    - **limit** / **cursor**: Page size and position; contacts are sorted by name
+    
+    Returns `{"contacts": [...], "next_cursor": ...}`; next_cursor is null on the last page.
     """
-    return ContactService.list_contacts(
-        search=search,
-        relationship_type=relationship_type,
-        relationship_strength=relationship_strength,
-        min_strength=min_strength
-    )
-
-
-@router.get("/search/{query}", response_model=List[dict])
-def search_contacts(
+    try:
+        return await ContactService.alist_contacts(
+            search=search,
+            relationship_type=relationship_type,
+            relationship_strength=relationship_strength,
+            min_strength=min_strength,
+            limit=limit,
+            cursor=cursor
+        )
+    except ValueError as e:
+        raise _invalid_cursor(e)
+
+
+@router.get("/search/{query}", response_model=dict)
+async def search_contacts(
     query: str = Path(..., title="The search query"),
-    limit: int = Query(10, ge=1, le=100)
+    limit: int = Query(10, ge=1, le=100),
+    cursor: Optional[str] = Query(None, description="next_cursor from the previous page")
 ):
     """
     Search for contacts with a specific query string
@@ -58,14 +118,23 @@ def search_contacts(
     - Contact methods 
     - Conversation topics
     - Interests
-    - Family details
+    - Family details, preferences and personality
+    
+    Results are ordered by relevance and every word matches as a prefix,
+    so partial input works for type-ahead.
+    
+    Returns a page like the contact listing.
     """
-    return ContactService.search_contacts(query=query, limit=limit)
+    try:
+        return await ContactService.asearch_contacts(query=query, limit=limit, cursor=cursor)
+    except ValueError as e:
+        raise _invalid_cursor(e)
 
 
 @router.get("/due-for-contact", response_model=List[dict])
-def get_due_for_contact(
-    days_threshold: int = Query(7, description="Number of days since last contact to consider due")
+async def get_due_for_contact(
+    days_threshold: int = Query(7, description="Number of days since last contact to consider due"),
+    limit: Optional[int] = Query(None, ge=1, le=500, description="Maximum number of contacts to return")
 ):
     """
     Get contacts that are due for reaching out based on recommended contact frequency
@@ -73,31 +142,42 @@ def get_due_for_contact(
     Returns contacts where:
     1. Current date - last_connection > recommended_contact_freq_days
     2. If recommended_contact_freq_days is not set, uses days_threshold parameter
+    
+    Contacts are ordered most overdue first.
     """
-    return ContactService.get_due_for_contact(days_threshold=days_threshold)
+    return await ContactService.aget_due_for_contact(days_threshold=days_threshold, limit=limit)
 
 
-@router.get("/by-relationship/{relationship_type}", response_model=List[dict])
-def get_by_relationship(
+@router.get("/by-relationship/{relationship_type}", response_model=dict)
+async def get_by_relationship(
     relationship_type: str = Path(..., description="Type of relationship to filter by"),
-    min_strength: Optional[int] = Query(None, ge=1, le=5, description="Minimum relationship strength")
+    min_strength: Optional[int] = Query(None, ge=1, le=5, description="Minimum relationship strength"),
+    limit: int = Query(CONTACTS_PAGE_SIZE, ge=1, le=CONTACTS_MAX_PAGE_SIZE, description="Page size"),
+    cursor: Optional[str] = Query(None, description="next_cursor from the previous page")
 ):
     """
     Get contacts filtered by relationship type and optional minimum strength
     
     - **relationship_type**: Type of relationship (friend, family, colleague, etc.)
     - **min_strength**: Optional minimum relationship strength (1-5)
+    
+    Returns a page like the contact listing.
     """
-    return ContactService.list_contacts(
-        relationship_type=relationship_type,
-        min_strength=min_strength
-    )
+    try:
+        return await ContactService.alist_contacts(
+            relationship_type=relationship_type,
+            min_strength=min_strength,
+            limit=limit,
+            cursor=cursor
+        )
+    except ValueError as e:
+        raise _invalid_cursor(e)
 
 
 @router.get("/{contact_id}", response_model=dict)
-def get_contact(contact_id: str = Path(..., title="The ID of the contact to get")):
+async def get_contact(contact_id: str = Path(..., title="The ID of the contact to get")):
     """Get a specific contact by ID (UUID string)"""
-    contact = ContactService.get_contact(contact_id)
+    contact = await ContactService.aget_contact(contact_id)
     
     if contact is None:
         raise HTTPException(status_code=404, detail="Contact not found")
@@ -106,7 +186,7 @@ def get_contact(contact_id: str = Path(..., title="The ID of the contact to get"
 
 
 @router.put("/{contact_id}", response_model=dict)
-def update_contact(
+async def update_contact(
     contact: ContactUpdate,
     contact_id: str = Path(..., title="The ID of the contact to update")
 ):
@@ -115,7 +195,7 @@ def update_contact(
     update_data = contact.model_dump(exclude_unset=True)
     
     # Update the contact
-    updated_contact = ContactService.update_contact(contact_id, update_data)
+    updated_contact = await ContactService.aupdate_contact(contact_id, update_data)
     
     if updated_contact is None:
         raise HTTPException(status_code=404, detail="Contact not found")
@@ -124,9 +204,9 @@ def update_contact(
 
 
 @router.delete("/{contact_id}", response_model=dict)
-def delete_contact(contact_id: str = Path(..., title="The ID of the contact to delete")):
+async def delete_contact(contact_id: str = Path(..., title="The ID of the contact to delete")):
     """Delete a contact"""
-    success = ContactService.delete_contact(contact_id)
+    success = await ContactService.adelete_contact(contact_id)
     
     if not success:
         raise HTTPException(status_code=404, detail="Contact not found")
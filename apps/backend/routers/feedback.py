@@ -1,20 +1,18 @@
 """
-Feedback router for Lazor Connect API (in-memory mock).
+Feedback router for Lazor Connect API.
+Feedback is kept in a durable log (services/feedbackStore.py).
 """
-from fastapi import APIRouter, Body, Depends
-from typing import List, Dict
-from datetime import datetime
+from fastapi import APIRouter, Body, Query
+from typing import Dict
 from services.chatService import ChatService
 from services.contactService import ContactService
+from services.feedbackStore import FEEDBACK_RECENT_MAX, FEEDBACK_TOP_MAX, feedback_store
 
 router = APIRouter(
     prefix="/feedback",
     tags=["feedback"]
 )
 
-# In-memory feedback store (resets on server restart)
-feedback_store: List[Dict] = []
-
 chat_service = ChatService(ContactService())
 
 @router.post("")
@@ -22,18 +20,14 @@ def submit_feedback(
     feedback: Dict = Body(..., example={"type": "like", "message": "Great suggestion!", "contact_id": "123"})
 ):
     """Submit feedback (like/dislike, message, etc.)"""
-    feedback_entry = {
-        **feedback,
-        "timestamp": datetime.now().isoformat()
-    }
-    feedback_store.append(feedback_entry)
+    feedback_entry = feedback_store.add(feedback)
     return {"status": "ok", "received": feedback_entry}
 
 @router.get("")
-def get_feedback():
-    """Get all feedback (for testing/demo)"""
-    return feedback_store
+def get_feedback(limit: int = Query(FEEDBACK_RECENT_MAX, ge=1, le=FEEDBACK_RECENT_MAX)):
+    """Get the most recent feedback, newest first (for testing/demo)"""
+    return feedback_store.recent(limit)
 
 @router.get("/summary")
-def feedback_summary():
-    return chat_service.get_feedback_summary()
+def feedback_summary(top_n: int = Query(5, ge=1, le=FEEDBACK_TOP_MAX)):
+    return chat_service.get_feedback_summary(top_n)
@@ -1,4 +0,0 @@
-# Shared feedback store for Lazor Connect API
-# This is a simple in-memory list. In production, use a database.
-
-feedback_store = []
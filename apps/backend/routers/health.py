@@ -4,6 +4,19 @@ Health check router for Lazor Connect API.
 from fastapi import APIRouter
 from datetime import datetime
 
+from services.admission import gemini_admission
+from services.batchExtraction import batch_extraction_jobs
+from services.contactService import ContactService
+from services.contextCache import context_cache
+from services.extractionFilter import extraction_filter
+from services.extractionQueue import extraction_queue
+from services.greetingFallback import greeting_fallback
+from services.profileCompaction import profile_compactor
+from services.promptBuilder import contact_context_builder
+from services.rateLimiter import rate_limiter
+from services.resilience import gemini_breaker, gemini_retry
+from services.responseCache import response_cache
+
 router = APIRouter(
     tags=["health"]
 )
@@ -13,3 +26,23 @@ router = APIRouter(
 def ping():
     """Health check endpoint"""
     return {"status": "online", "timestamp": datetime.now().isoformat()}
+
+
+@router.get("/stats")
+def stats():
+    """Runtime statistics for background components"""
+    return {
+        "extraction_queue": extraction_queue.stats(),
+        "batch_extraction": batch_extraction_jobs.stats(),
+        "extraction_filter": extraction_filter.stats(),
+        "contact_cache": ContactService.cache_stats(),
+        "llm_cache": response_cache.stats(),
+        "context_cache": context_cache.stats(),
+        "profile_compaction": profile_compactor.stats(),
+        "prompt_budget": contact_context_builder.stats(),
+        "greeting": greeting_fallback.stats(),
+        "rate_limit": rate_limiter.stats(),
+        "gemini_admission": gemini_admission.stats(),
+        "gemini_breaker": gemini_breaker.stats(),
+        "gemini_retries": gemini_retry.stats(),
+    }
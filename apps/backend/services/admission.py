@@ -0,0 +1,206 @@
+"""
+Admission control for Gemini calls.
+
+At most GEMINI_MAX_CONCURRENCY calls run at once. Callers beyond that wait
+in a priority queue: interactive chat turns first, then greetings, then
+background work (batch and deferred extraction, profile summaries). The
+priority of a call comes from the request_priority context variable, set by
+the routers and background workers and inherited by the tasks they start.
+
+The queue sheds load instead of letting latency grow without bound:
+- at most GEMINI_QUEUE_MAX interactive and greeting calls wait; when the
+  queue is full a new call takes the place of a lower-priority waiter, or
+  is rejected if there is none
+- a waiter gives up after GEMINI_QUEUE_TIMEOUT_SECONDS
+Rejected calls raise AdmissionRejected, which the API answers with 429 and
+a Retry-After estimate. Background calls are never shed: their producers
+are bounded already, and they only run when nothing more urgent waits.
+"""
+import asyncio
+import heapq
+import itertools
+import math
+import os
+import time
+from contextlib import asynccontextmanager
+from contextvars import ContextVar
+from enum import IntEnum
+from typing import Any, AsyncIterator, Dict, List, Optional, Tuple
+
+GEMINI_MAX_CONCURRENCY = int(os.getenv("GEMINI_MAX_CONCURRENCY", "100"))
+GEMINI_QUEUE_MAX = int(os.getenv("GEMINI_QUEUE_MAX", "200"))
+GEMINI_QUEUE_TIMEOUT_SECONDS = float(os.getenv("GEMINI_QUEUE_TIMEOUT_SECONDS", "10"))
+
+
+class Priority(IntEnum):
+    """Priority of a Gemini call (lower runs first)"""
+    INTERACTIVE = 0
+    GREETING = 1
+    BACKGROUND = 2
+
+
+request_priority: ContextVar[Priority] = ContextVar("request_priority", default=Priority.INTERACTIVE)
+
+
+class ServiceOverloaded(Exception):
+    """The request was shed because of load; answered with status_code and Retry-After."""
+
+    status_code = 429
+
+    def __init__(self, message: str, retry_after: float):
+        super().__init__(message)
+        self.retry_after = max(1, math.ceil(retry_after))
+
+
+class AdmissionRejected(ServiceOverloaded):
+    """The Gemini call queue is full or the wait took too long."""
+
+
+class AdmissionQueue:
+    """Bounded priority queue in front of the Gemini API."""
+
+    def __init__(self,
+                 max_concurrency: int = GEMINI_MAX_CONCURRENCY,
+                 max_waiting: int = GEMINI_QUEUE_MAX,
+                 wait_timeout: float = GEMINI_QUEUE_TIMEOUT_SECONDS):
+        self.max_concurrency = max_concurrency
+        self.max_waiting = max_waiting
+        self.wait_timeout = wait_timeout
+        self._active = 0
+        # (priority, sequence, future); entries whose future is done are stale
+        self._waiters: List[Tuple[int, int, asyncio.Future]] = []
+        self._sequence = itertools.count()
+        # Live waiters, and those of them that may be shed (interactive and greeting)
+        self._waiting = 0
+        self._sheddable = 0
+        # Moving average of how long a call holds its slot
+        self._avg_call_seconds = 1.0
+
+        # Counters for observability
+        self._admitted = {p.name.lower(): 0 for p in Priority}
+        self._shed = {p.name.lower(): 0 for p in Priority}
+        self._timed_out = 0
+        self._total_wait_seconds = 0.0
+        self._max_wait_seconds = 0.0
+
+    def retry_after(self) -> float:
+        """Seconds until a new call would likely be admitted"""
+        backlog = self._waiting + 1
+        return self._avg_call_seconds * backlog / max(1, self.max_concurrency)
+
+    def _reject(self, priority: Priority, reason: str) -> AdmissionRejected:
+        self._shed[priority.name.lower()] += 1
+        return AdmissionRejected(f"Too many requests to the AI model ({reason}), try again later",
+                                 self.retry_after())
+
+    def _forget(self, priority: int) -> None:
+        """Stop counting a waiter that was admitted, shed or gave up."""
+        self._waiting -= 1
+        if priority != Priority.BACKGROUND:
+            self._sheddable -= 1
+
+    def _make_room(self, priority: Priority) -> None:
+        """Free a place in a full queue for a new call by shedding a lower-priority waiter."""
+        live = [entry for entry in self._waiters if not entry[2].done() and entry[0] != Priority.BACKGROUND]
+        # The lowest-priority, most recent waiter goes first
+        victim = max(live, key=lambda entry: (entry[0], entry[1]), default=None)
+        if victim is None or victim[0] <= priority:
+            raise self._reject(priority, "queue full")
+        victim[2].set_exception(self._reject(Priority(victim[0]), "replaced by a more urgent request"))
+        self._forget(victim[0])
+
+    async def acquire(self, priority: Optional[Priority] = None) -> None:
+        """
+        Wait for a slot to call the API.
+
+        Args:
+            priority: Priority of the call, defaults to the request_priority context variable
+
+        Raises:
+            AdmissionRejected: If the call was shed
+        """
+        priority = request_priority.get() if priority is None else priority
+        # Calls only wait while every slot is taken, so a free slot means nobody is waiting
+        if self._active < self.max_concurrency:
+            self._active += 1
+            self._admitted[priority.name.lower()] += 1
+            return
+
+        sheddable = priority != Priority.BACKGROUND
+        if sheddable and self._sheddable >= self.max_waiting:
+            self._make_room(priority)
+
+        future = asyncio.get_running_loop().create_future()
+        heapq.heappush(self._waiters, (priority, next(self._sequence), future))
+        self._waiting += 1
+        if sheddable:
+            self._sheddable += 1
+        started = time.monotonic()
+        try:
+            await asyncio.wait_for(asyncio.shield(future), timeout=self.wait_timeout if sheddable else None)
+        except asyncio.TimeoutError:
+            # Unless it was admitted just as the wait ran out
+            if not (future.done() and not future.cancelled() and future.exception() is None):
+                future.cancel()
+                self._forget(priority)
+                self._timed_out += 1
+                raise self._reject(priority, "waited too long")
+        except asyncio.CancelledError:
+            if future.done() and not future.cancelled() and future.exception() is None:
+                # Admitted, but the caller went away: pass the slot on
+                self.release()
+            elif not future.done():
+                future.cancel()
+                self._forget(priority)
+            raise
+
+        waited = time.monotonic() - started
+        self._total_wait_seconds += waited
+        self._max_wait_seconds = max(self._max_wait_seconds, waited)
+        self._admitted[priority.name.lower()] += 1
+
+    def release(self, held_seconds: Optional[float] = None) -> None:
+        """Give back a slot, handing it to the most urgent waiter."""
+        if held_seconds is not None:
+            self._avg_call_seconds += (held_seconds - self._avg_call_seconds) * 0.1
+        while self._waiters:
+            priority, _, future = heapq.heappop(self._waiters)
+            if future.done():
+                continue
+            self._forget(priority)
+            future.set_result(None)
+            return
+        self._active -= 1
+
+    @asynccontextmanager
+    async def slot(self, priority: Optional[Priority] = None) -> AsyncIterator[None]:
+        """Hold a slot for the duration of a call"""
+        await self.acquire(priority)
+        started = time.monotonic()
+        try:
+            yield
+        finally:
+            self.release(time.monotonic() - started)
+
+    def stats(self) -> Dict[str, Any]:
+        """Slots in use, queue depth and shed calls by priority"""
+        waiting = {p.name.lower(): 0 for p in Priority}
+        for priority, _, future in self._waiters:
+            if not future.done():
+                waiting[Priority(priority).name.lower()] += 1
+        admitted = sum(self._admitted.values())
+        return {
+            "max_concurrency": self.max_concurrency,
+            "max_waiting": self.max_waiting,
+            "active": self._active,
+            "waiting": waiting,
+            "admitted": self._admitted,
+            "shed": self._shed,
+            "timed_out": self._timed_out,
+            "avg_wait_ms": round(self._total_wait_seconds * 1000 / admitted, 1) if admitted else 0.0,
+            "max_wait_ms": round(self._max_wait_seconds * 1000, 1),
+            "avg_call_ms": round(self._avg_call_seconds * 1000, 1),
+        }
+
+
+gemini_admission = AdmissionQueue()
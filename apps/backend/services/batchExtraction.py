@@ -0,0 +1,218 @@
+"""
+Batch profile extraction for backfills.
+
+POST /chat/extract/batch takes many (contact_id, message) pairs, e.g. from
+imported notes or message logs, and runs them as a background job:
+- extraction runs on BATCH_EXTRACTION_CONCURRENCY worker tasks, so many model
+  calls are in flight at once instead of one message at a time
+- the profile patches are combined per contact with the merge rules of
+  migration 001 as they come in
+- every BATCH_EXTRACTION_WRITE_EVERY messages (and at the end) the combined
+  patches are written with one bulk merge (migration 005), so a contact with
+  many messages is written once per write instead of once per message
+- while the model is over its quota or its circuit breaker is open, workers
+  wait for the Retry-After time and try the message again instead of failing it
+
+Progress of the latest jobs is kept in memory for GET /chat/extract/batch/{job_id}.
+"""
+import os
+import time
+import asyncio
+from collections import OrderedDict
+from datetime import datetime
+from typing import Any, Awaitable, Callable, Dict, Iterator, List, Optional, Set, Tuple
+from uuid import uuid4
+
+from db.profileMerge import merge_profile
+
+from .admission import Priority, ServiceOverloaded, request_priority
+from .contactService import ContactService
+
+BATCH_EXTRACTION_CONCURRENCY = int(os.getenv("BATCH_EXTRACTION_CONCURRENCY", "16"))
+BATCH_EXTRACTION_WRITE_EVERY = int(os.getenv("BATCH_EXTRACTION_WRITE_EVERY", "500"))
+BATCH_EXTRACTION_MAX_ITEMS = int(os.getenv("BATCH_EXTRACTION_MAX_ITEMS", "20000"))
+BATCH_EXTRACTION_MAX_JOBS = int(os.getenv("BATCH_EXTRACTION_MAX_JOBS", "100"))
+
+# Extracts the profile patch for one message ({} if there is nothing to merge)
+PatchExtractor = Callable[[str], Awaitable[Dict[str, Any]]]
+
+
+class BatchExtractionJobs:
+    """Runs batch extraction jobs and keeps the progress of the latest ones."""
+
+    def __init__(self,
+                 concurrency: int = BATCH_EXTRACTION_CONCURRENCY,
+                 write_every: int = BATCH_EXTRACTION_WRITE_EVERY,
+                 max_items: int = BATCH_EXTRACTION_MAX_ITEMS,
+                 max_jobs: int = BATCH_EXTRACTION_MAX_JOBS):
+        self.concurrency = concurrency
+        self.write_every = write_every
+        self.max_items = max_items
+        self.max_jobs = max_jobs
+        self._jobs: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+        # Keep references to the running job tasks
+        self._tasks: Set[asyncio.Task] = set()
+        self._started: Dict[str, float] = {}
+
+        # Counters for observability
+        self._messages = 0
+        self._writes = 0
+
+    def submit(self, items: List[Tuple[str, str]], extract: PatchExtractor) -> Dict[str, Any]:
+        """
+        Start a batch extraction job.
+
+        Args:
+            items: (contact_id, message) pairs, in the order they should be applied
+            extract: Coroutine function returning the profile patch for a message
+
+        Returns:
+            The job's progress, including its job id
+
+        Raises:
+            ValueError: If there are more than max_items pairs
+        """
+        if len(items) > self.max_items:
+            raise ValueError(f"A batch can hold at most {self.max_items} messages, got {len(items)}")
+
+        job_id = uuid4().hex
+        job = {
+            "job_id": job_id,
+            "status": "running",
+            "total": len(items),
+            "processed": 0,
+            "with_profile_data": 0,
+            "failed": 0,
+            "throttled": 0,
+            "contacts_updated": 0,
+            "contacts_not_found": 0,
+            "writes": 0,
+            "created_at": datetime.now().isoformat(),
+            "finished_at": None,
+            "elapsed_ms": 0.0,
+        }
+        self._jobs[job_id] = job
+        self._started[job_id] = time.monotonic()
+        while len(self._jobs) > self.max_jobs:
+            oldest_id, oldest = next(iter(self._jobs.items()))
+            if oldest["status"] == "running":
+                break
+            self._jobs.pop(oldest_id)
+
+        task = asyncio.create_task(self._run(job, items, extract))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+        return self.get_job(job_id)
+
+    async def _run(self, job: Dict[str, Any], items: List[Tuple[str, str]], extract: PatchExtractor) -> None:
+        # Model calls of the job (and its worker tasks) yield to interactive requests
+        request_priority.set(Priority.BACKGROUND)
+        # Patches combined per contact since the last write
+        combined: Dict[str, Dict[str, Any]] = {}
+        unwritten = 0
+        updated: Set[str] = set()
+        not_found: Set[str] = set()
+        write_lock = asyncio.Lock()
+        next_item: Iterator[Tuple[str, str]] = iter(items)
+
+        async def write() -> None:
+            nonlocal combined, unwritten
+            # Swap the buffer before awaiting so workers keep combining into a fresh one
+            patches, combined, unwritten = combined, {}, 0
+            if not patches:
+                return
+            async with write_lock:
+                contacts = await ContactService.amerge_contact_profiles(patches)
+            job["writes"] += 1
+            self._writes += 1
+            for contact_id in patches:
+                if contacts.get(contact_id):
+                    updated.add(contact_id)
+                else:
+                    not_found.add(contact_id)
+            job["contacts_updated"] = len(updated)
+            job["contacts_not_found"] = len(not_found - updated)
+
+        async def worker() -> None:
+            nonlocal unwritten
+            for contact_id, message in next_item:
+                while True:
+                    try:
+                        patch = await extract(message) if message else {}
+                        break
+                    except ServiceOverloaded as e:
+                        # The model is unavailable for now: wait it out rather than fail the message
+                        job["throttled"] += 1
+                        await asyncio.sleep(e.retry_after)
+                    except asyncio.CancelledError:
+                        raise
+                    except Exception as e:
+                        print(f"Batch extraction {job['job_id']} failed for contact {contact_id}: {e}")
+                        job["failed"] += 1
+                        patch = {}
+                        break
+
+                if patch:
+                    job["with_profile_data"] += 1
+                    combined[contact_id] = {**combined.get(contact_id, {}),
+                                            **merge_profile(combined.get(contact_id, {}), patch)}
+                    unwritten += 1
+                job["processed"] += 1
+                self._messages += 1
+
+                if unwritten >= self.write_every:
+                    await write()
+
+        workers = [asyncio.create_task(worker()) for _ in range(max(1, min(self.concurrency, len(items))))]
+        try:
+            await asyncio.gather(*workers)
+            await write()
+            job["status"] = "done"
+        except asyncio.CancelledError:
+            job["status"] = "cancelled"
+            raise
+        except Exception as e:
+            # A failed bulk write stops the job; patches already written stay
+            print(f"Batch extraction {job['job_id']} failed: {e}")
+            job["status"] = "failed"
+            job["error"] = str(e)
+        finally:
+            for task in workers:
+                task.cancel()
+            job["finished_at"] = datetime.now().isoformat()
+            job["elapsed_ms"] = round((time.monotonic() - self._started.pop(job["job_id"])) * 1000, 1)
+
+    def get_job(self, job_id: str) -> Optional[Dict[str, Any]]:
+        """
+        Get the progress of a job.
+
+        Args:
+            job_id: The id returned when the job was submitted
+
+        Returns:
+            The job's counters and status, or None if the job is unknown or was evicted
+        """
+        job = self._jobs.get(job_id)
+        if job is None:
+            return None
+        progress = dict(job)
+        if job_id in self._started:
+            progress["elapsed_ms"] = round((time.monotonic() - self._started[job_id]) * 1000, 1)
+        progress["progress"] = round(job["processed"] / job["total"], 3) if job["total"] else 1.0
+        progress["messages_per_second"] = (round(job["processed"] * 1000 / progress["elapsed_ms"], 1)
+                                           if progress["elapsed_ms"] else 0.0)
+        return progress
+
+    def stats(self) -> Dict[str, Any]:
+        """Running jobs and totals"""
+        return {
+            "concurrency": self.concurrency,
+            "write_every": self.write_every,
+            "running_jobs": len(self._started),
+            "jobs_kept": len(self._jobs),
+            "messages_processed": self._messages,
+            "bulk_writes": self._writes,
+        }
+
+
+batch_extraction_jobs = BatchExtractionJobs()
@@ -1,14 +1,34 @@
-from typing import Dict, Any
+from typing import Dict, Any, AsyncIterator, Awaitable, List, Set, Tuple, Optional
+import os
 import random
+import asyncio
 
 from .utils import normalize_extracted_data  
+from .admission import ServiceOverloaded
 from .contactService import ContactService 
 from .geminiClient import GeminiClient
+from .extractionQueue import extraction_queue
+from .batchExtraction import batch_extraction_jobs
+from .feedbackStore import feedback_store
+from .extractionFilter import extraction_filter, has_profile_data
+from .greetingFallback import greeting_fallback
+from .profileCompaction import profile_compactor
+
+# How long a finished reply may wait for the concurrent profile extraction
+# (0: the reply is returned right away and a running extraction finishes in the background)
+EXTRACTION_GRACE_SECONDS = float(os.getenv("EXTRACTION_GRACE_SECONDS", "0"))
+
+# "split": separate reply and extraction calls; "combined": one structured call for both;
+# "deferred": reply only, extraction runs later on the background extraction queue
+CHAT_RESPONSE_MODE = os.getenv("CHAT_RESPONSE_MODE", "split")
 
 class ChatService:
-    def __init__(self, contact_service: ContactService):
+    def __init__(self, contact_service: ContactService, response_mode: Optional[str] = None):
         self.contact_service = contact_service
         self.client = GeminiClient()
+        self.response_mode = response_mode or CHAT_RESPONSE_MODE
+        # Keep references to extraction tasks that outlive their request
+        self._background_tasks: Set[asyncio.Task] = set()
     
     async def _log_interaction(self, contact_id: str, user_message: str, bot_response: str):
         """
@@ -32,97 +52,291 @@ class ChatService:
             print(f"Error in _log_interaction: {e}")
             # Don't let logging errors affect the main flow
 
-    async def handle_message(self, contact_id: str, user_message: str) -> Dict[str, Any]:
+    async def _generate_reply(self, contact: Dict, user_message: str, with_status: bool = False):
         """
-        Handles an incoming message from a user for a specific contact.
-        Provides short, conversational responses to help build the contact profile.
-        Occasionally asks for open-ended feedback and stores the user's reply as feedback.
+        Generates the conversational reply for a user message.
+        Errors are turned into a friendly fallback reply, except ServiceOverloaded,
+        which is answered with 429 (or 503 while the circuit is open).
+        With with_status, returns a (reply, succeeded) tuple.
         """
-        contact = self.contact_service.get_contact(contact_id)
-        if not contact:
-            return {"error": "Contact not found", "status_code": 404}
-
-        # Use GeminiClient to handle the conversation
         try:
-            bot_response_text = await self.client.handle_conversation(contact, user_message)
-            # Occasionally ask for feedback (e.g., 1 in 5 chance)
-            if random.randint(1, 5) == 1:
-                bot_response_text += "\n\nBy the way, how am I doing? Feel free to share any feedback or suggestions."
+            bot_response_text, ok = await self.client.handle_conversation(contact, user_message, with_status=True)
+            if ok:
+                bot_response_text = self._maybe_ask_for_feedback(bot_response_text)
+        except (asyncio.CancelledError, ServiceOverloaded):
+            raise
         except Exception as e:
             print(f"Error in handle_conversation: {e}")
-            bot_response_text = "I'm sorry, I encountered an error processing your message. Please try again later."
+            bot_response_text, ok = "I'm sorry, I encountered an error processing your message. Please try again later.", False
+        return (bot_response_text, ok) if with_status else bot_response_text
+
+    def _maybe_ask_for_feedback(self, bot_response_text: str) -> str:
+        """Occasionally ask for feedback (e.g., 1 in 5 chance)"""
+        if random.randint(1, 5) == 1:
+            bot_response_text += "\n\nBy the way, how am I doing? Feel free to share any feedback or suggestions."
+        return bot_response_text
+
+    async def _extract_if_worthwhile(self, contact_id: str, user_message: str) -> Dict[str, Any]:
+        """
+        Extracts and applies profile data unless the local pre-filter finds the message
+        can't hold any (see services/extractionFilter.py).
+        """
+        if not self.client.is_available() or not user_message:
+            return {}
+        extract, audit = extraction_filter.check(user_message)
+        if not extract:
+            return {}
+        return await self._extract_and_apply_profile_data(contact_id, user_message, audit)
+
+    async def _extract_and_apply_profile_data(self, contact_id: str, user_message: str,
+                                              audit: bool = False) -> Dict[str, Any]:
+        """
+        Extracts profile data from a user message and writes it back to the contact.
+        Never raises: errors are logged and an empty dict is returned.
+        The outcome trains the extraction pre-filter; audit is the value its check returned.
+        """
+        if not self.client.is_available() or not user_message:
+            return {}
+
+        try:
+            # Get raw extracted data from GeminiClient
+            extracted_data, ok = await self.client.extract_profile_data(user_message, with_status=True)
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            print(f"Error extracting or processing profile data: {e}")
+            return {}
+
+        if ok:
+            extraction_filter.record(user_message, has_profile_data(extracted_data), audit)
+        return await self._apply_profile_data(contact_id, extracted_data)
+
+    async def _apply_profile_data(self, contact_id: str, extracted_data: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Normalizes extracted profile data and writes it back to the contact.
+        Never raises: errors are logged and an empty dict is returned.
+        """
+        try:
+            # Normalize the data using the external utility function
+            extracted_data = normalize_extracted_data(extracted_data)
+            # Update contact if we have data
+            if contact_id and extracted_data:
+                await self._update_contact_with_extracted_data(contact_id, extracted_data)
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            print(f"Error extracting or processing profile data: {e}")
+            # Continue without extracted data
+            return {}
+
+        return extracted_data
+
+    async def _generate_split(self, contact_id: str, contact: Dict, user_message: str,
+                              audit: Optional[bool] = None) -> Tuple[str, Dict[str, Any]]:
+        """
+        Generates the reply and extracts profile data with two concurrent model calls.
+        audit is the extraction pre-filter's decision if the caller already checked the message.
+        """
+        reply_task = asyncio.create_task(self._generate_reply(contact, user_message))
+        if audit is None:
+            extraction = self._extract_if_worthwhile(contact_id, user_message)
+        else:
+            extraction = self._extract_and_apply_profile_data(contact_id, user_message, audit)
+        extraction_task = asyncio.create_task(extraction)
+
+        try:
+            bot_response_text = await reply_task
+            if not extraction_task.done() and EXTRACTION_GRACE_SECONDS > 0:
+                await asyncio.wait({extraction_task}, timeout=EXTRACTION_GRACE_SECONDS)
+        except (asyncio.CancelledError, ServiceOverloaded):
+            # The request was cancelled (e.g. client disconnected) or shed: stop both branches
+            reply_task.cancel()
+            extraction_task.cancel()
+            raise
+
+        if extraction_task.done():
+            extracted_data = extraction_task.result()
+        else:
+            # The profile is still updated; the response just carries no suggestions
+            self._finish_in_background(extraction_task, f"Profile extraction for contact {contact_id}")
+            extracted_data = {}
+
+        return bot_response_text, extracted_data
+
+    async def _generate_combined(self, contact_id: str, contact: Dict, user_message: str) -> Tuple[str, Dict[str, Any]]:
+        """
+        Generates the reply and extracts profile data with a single structured model call.
+        Messages the extraction pre-filter rules out get a plain reply instead.
+        """
+        extract, audit = extraction_filter.check(user_message) if user_message else (False, False)
+        if not extract:
+            return await self._generate_reply(contact, user_message), {}
+
+        try:
+            combined = await self.client.handle_conversation_with_extraction(contact, user_message)
+        except ServiceOverloaded:
+            raise
+        except ValueError as e:
+            print(f"Unusable combined response ({e}); using separate reply and extraction calls")
+            return await self._generate_split(contact_id, contact, user_message, audit)
+        except Exception as e:
+            print(f"Error in handle_conversation_with_extraction: {e}")
+            return "I'm sorry, I encountered an error processing your message. Please try again later.", {}
+
+        bot_response_text = self._maybe_ask_for_feedback(combined["reply"])
+        if combined.get("structured"):
+            extraction_filter.record(user_message, has_profile_data(combined["profile"]), audit)
+
+        extracted_data = {}
+        if combined["profile"]:
+            extracted_data = await self._apply_profile_data(contact_id, combined["profile"])
+
+        return bot_response_text, extracted_data
+
+    async def _generate_deferred(self, contact_id: str, contact: Dict, user_message: str) -> Tuple[str, Optional[str]]:
+        """
+        Generates the reply and queues profile extraction as a background job.
+        The job is only queued once the reply succeeded: a shed or failed turn is
+        retried by the client, and its message would otherwise be merged twice.
+        
+        Returns:
+            The reply and the extraction job id (None if nothing was queued)
+        """
+        bot_response_text, ok = await self._generate_reply(contact, user_message, with_status=True)
 
-        # Detect if the user's message is a feedback reply (open-ended, not like/dislike)
+        job_id = None
+        if ok and self.client.is_available() and user_message:
+            extract, audit = extraction_filter.check(user_message)
+            if extract:
+                job_id = extraction_queue.submit(
+                    contact_id,
+                    lambda: self._extract_and_apply_profile_data(contact_id, user_message, audit)
+                )
+        return bot_response_text, job_id
+
+    def _finish_in_background(self, task: asyncio.Task, description: str) -> None:
+        """Keep a task running after its request has been answered, logging its failure"""
+        def done(task: asyncio.Task) -> None:
+            self._background_tasks.discard(task)
+            if not task.cancelled() and task.exception() is not None:
+                print(f"{description} failed in background: {task.exception()}")
+
+        self._background_tasks.add(task)
+        task.add_done_callback(done)
+
+    def _record_feedback_reply(self, contact_id: str, user_message: str) -> None:
+        """
+        Detect if the user's message is a feedback reply (open-ended, not like/dislike)
+        and store it as feedback.
+        """
         feedback_triggers = ["feedback", "suggestion", "improve", "doing", "better", "worse", "bad", "good"]
         if any(kw in user_message.lower() for kw in feedback_triggers):
-            feedback_store.append({
+            feedback_store.add({
                 "type": "open_feedback",
                 "message": user_message,
                 "contact_id": contact_id,
-                "timestamp": __import__('datetime').datetime.now().isoformat()
             })
 
-        # Log the interaction instead of storing conversation history
-        await self._log_interaction(contact_id, user_message, bot_response_text)
+    async def handle_message(self, contact_id: str, user_message: str) -> Dict[str, Any]:
+        """
+        Handles an incoming message from a user for a specific contact.
+        Provides short, conversational responses to help build the contact profile.
+        Occasionally asks for open-ended feedback and stores the user's reply as feedback.
         
-        # Extract any potential profile data directly
-        extracted_data = {}
-        if self.client.is_available() and user_message:
-            try:
-                # Get raw extracted data from GeminiClient
-                extracted_data = await self.client.extract_profile_data(user_message)
-                # Normalize the data using the external utility function
-                extracted_data = normalize_extracted_data(extracted_data)
-                # Update contact if we have data
-                if contact_id and extracted_data:
-                    await self._update_contact_with_extracted_data(contact_id, extracted_data)
-            except Exception as e:
-                print(f"Error extracting or processing profile data: {e}")
-                # Continue without extracted data
-                extracted_data = {}
+        The reply and the profile extraction are two independent model calls, so
+        they run concurrently. The reply is returned as soon as it is ready (or after
+        at most EXTRACTION_GRACE_SECONDS more, if set); an extraction still running
+        then finishes in the background and the response carries no profile suggestions.
+        
+        In "combined" response mode a single structured request returns both.
+        In "deferred" mode only the reply is awaited; the extraction results are
+        available later from get_profile_suggestions.
+        """
+        contact = await self.contact_service.aget_contact(contact_id)
+        if not contact:
+            return {"error": "Contact not found", "status_code": 404}
 
-        # --- Update last_connection if AI extracted it ---
-        if extracted_data and 'last_connection' in extracted_data and extracted_data['last_connection']:
-            from datetime import datetime, timezone, timedelta
-            try:
-                last_conn = extracted_data['last_connection']
-                # Handle common relative dates
-                if isinstance(last_conn, str):
-                    lowered = last_conn.strip().lower()
-                    if lowered == 'yesterday':
-                        dt = datetime.now(timezone.utc) - timedelta(days=1)
-                        last_conn = dt.replace(hour=12, minute=0, second=0, microsecond=0).isoformat()
-                    elif lowered == 'today':
-                        dt = datetime.now(timezone.utc)
-                        last_conn = dt.replace(hour=12, minute=0, second=0, microsecond=0).isoformat()
-                    else:
-                        try:
-                            dt = datetime.fromisoformat(last_conn)
-                            last_conn = dt.astimezone(timezone.utc).isoformat()
-                        except Exception:
-                            print(f"Could not parse last_connection string as ISO datetime: {last_conn}")
-                            last_conn = None
-                elif hasattr(last_conn, 'isoformat'):
-                    last_conn = last_conn.astimezone(timezone.utc).isoformat()
-                if last_conn:
-                    self.contact_service.update_contact(contact_id, {"last_connection": last_conn})
-            except Exception as e:
-                print(f"Failed to update last_connection for contact {contact_id} from AI extraction: {e}")
-        # --- End update ---
+        extraction_job_id = None
+        if self.response_mode == "combined":
+            bot_response_text, extracted_data = await self._generate_combined(contact_id, contact, user_message)
+        elif self.response_mode == "deferred":
+            bot_response_text, extraction_job_id = await self._generate_deferred(contact_id, contact, user_message)
+            extracted_data = {}
+        else:
+            bot_response_text, extracted_data = await self._generate_split(contact_id, contact, user_message)
 
-        return {
+        self._record_feedback_reply(contact_id, user_message)
+
+        # Log the interaction instead of storing conversation history
+        await self._log_interaction(contact_id, user_message, bot_response_text)
+
+        response = {
             "contact_id": contact_id,
             "user_message": user_message,
             "bot_response": bot_response_text,
             "contact_details": contact, # Return contact details for context if needed by frontend
             "profile_suggestions": extracted_data # Any structured data we extracted
         }
+        if extraction_job_id:
+            # Poll GET /chat/{contact_id}/suggestions for the deferred extraction
+            response["extraction_job_id"] = extraction_job_id
+        return response
+
+    def get_profile_suggestions(self, contact_id: str) -> Dict[str, Any]:
+        """
+        Returns the status and latest results of background profile extraction for a contact.
+        """
+        return extraction_queue.get_suggestions(contact_id)
+
+    async def _extract_profile_patch(self, user_message: str) -> Dict[str, Any]:
+        """
+        Extracts the merge patch for one message without writing it (used by batch extraction).
+        Messages the extraction pre-filter rules out are not sent to the model.
+        """
+        extract, audit = extraction_filter.check(user_message)
+        if not extract:
+            return {}
+        extracted_data, ok = await self.client.extract_profile_data(user_message, with_status=True)
+        if ok:
+            extraction_filter.record(user_message, has_profile_data(extracted_data), audit)
+        extracted_data = normalize_extracted_data(extracted_data)
+        return self._build_profile_patch(extracted_data) if extracted_data else {}
+
+    def start_batch_extraction(self, items: List[Tuple[str, str]]) -> Dict[str, Any]:
+        """
+        Starts a background job that extracts profile data from many messages and
+        merges it into the contacts with bulk writes.
+
+        Args:
+            items: (contact_id, message) pairs, applied in order
+
+        Returns:
+            The job's progress, or an error dictionary with a status code
+        """
+        if not self.client.is_available():
+            return {"error": "Profile extraction is not available", "status_code": 503}
+        try:
+            return batch_extraction_jobs.submit(items, self._extract_profile_patch)
+        except ValueError as e:
+            return {"error": str(e), "status_code": 413}
+
+    def get_batch_extraction(self, job_id: str) -> Optional[Dict[str, Any]]:
+        """
+        Returns the progress of a batch extraction job, or None if it is unknown.
+        """
+        return batch_extraction_jobs.get_job(job_id)
 
     async def get_initial_greeting(self, contact_id: str) -> Dict[str, Any]:
         """
         Provides an initial greeting focused on building the contact's profile.
+        
+        With a greeting deadline (GREETING_DEADLINE_SECONDS), a model that hasn't
+        answered in time, or whose call was shed, is replaced by a greeting rendered
+        from templates; the model call finishes in the background and its greeting
+        is cached for the next open. A failed model call always gets the template
+        greeting. "source" tells which one was returned.
         """
-        contact = self.contact_service.get_contact(contact_id)
+        contact = await self.contact_service.aget_contact(contact_id)
         if not contact:
             return {"error": "Contact not found", "status_code": 404}
         
@@ -130,18 +344,203 @@ class ChatService:
         profile_completeness = self._calculate_profile_completeness(contact)
         
         # Use GeminiClient for greeting generation
+        greeting_task = asyncio.create_task(
+            self.client.get_initial_greeting(contact, profile_completeness, with_status=True))
         try:
-            greeting_text = await self.client.get_initial_greeting(contact, profile_completeness)
-        except Exception as e:
-            print(f"Error getting initial greeting: {e}")
-            greeting_text = "Hello! I'm here to help you keep in touch with your contacts."
+            done, _ = await asyncio.wait({greeting_task}, timeout=greeting_fallback.deadline_seconds or None)
+        except asyncio.CancelledError:
+            # The client went away: the greeting is still cached for the next open
+            self._finish_in_background(greeting_task, f"Greeting for contact {contact_id}")
+            raise
+        
+        fallback_reason = None
+        if greeting_task not in done:
+            self._finish_in_background(greeting_task, f"Greeting for contact {contact_id}")
+            fallback_reason = "deadline"
+        else:
+            try:
+                greeting_text, ok = greeting_task.result()
+                if not ok:
+                    # The model call failed and greeting_text is an error message
+                    fallback_reason = "error"
+            except ServiceOverloaded:
+                if not greeting_fallback.enabled:
+                    raise
+                fallback_reason = "overloaded"
+            except Exception as e:
+                print(f"Error getting initial greeting: {e}")
+                fallback_reason = "error"
+        
+        if fallback_reason:
+            greeting_text = greeting_fallback.render(contact, profile_completeness, fallback_reason)
+        else:
+            greeting_fallback.record_model()
         
         return {
             "contact_id": contact_id,
             "greeting": greeting_text,
+            "source": "template" if fallback_reason else "model",
             "contact_details": contact
         }
         
+    async def stream_message(self, contact_id: str, user_message: str) -> AsyncIterator[Dict[str, Any]]:
+        """
+        Streaming variant of handle_message.
+        
+        Yields events as dictionaries with "event" and "data" keys:
+        - "chunk": a piece of the bot response as soon as the model produces it
+        - "suggestions": the extracted profile data, once extraction has completed
+        - "done": the full bot response
+        - "error": if the contact does not exist, or the model call was shed after
+          the stream started (status_code 429 or 503, with retry_after)
+        
+        Extraction runs concurrently with the streamed reply, so the suggestions
+        event usually follows the last chunk immediately.
+        
+        Raises:
+            ServiceOverloaded: If the model call was shed before the first chunk
+        """
+        contact = await self.contact_service.aget_contact(contact_id)
+        if not contact:
+            yield {"event": "error", "data": {"error": "Contact not found", "status_code": 404}}
+            return
+
+        extraction_task = asyncio.create_task(self._extract_if_worthwhile(contact_id, user_message))
+        try:
+            chunks = []
+            try:
+                async for chunk in self.client.stream_conversation(contact, user_message):
+                    chunks.append(chunk)
+                    yield {"event": "chunk", "data": {"text": chunk}}
+            except ServiceOverloaded as e:
+                if not chunks:
+                    raise
+                yield self._overloaded_event(e)
+                return
+            except Exception as e:
+                print(f"Error in stream_conversation: {e}")
+                chunk = "I'm sorry, I encountered an error processing your message. Please try again later."
+                chunks.append(chunk)
+                yield {"event": "chunk", "data": {"text": chunk}}
+
+            full_response = "".join(chunks)
+            feedback_prompt = self._maybe_ask_for_feedback("")
+            if feedback_prompt:
+                full_response += feedback_prompt
+                yield {"event": "chunk", "data": {"text": feedback_prompt}}
+
+            self._record_feedback_reply(contact_id, user_message)
+            await self._log_interaction(contact_id, user_message, full_response)
+
+            extracted_data = await extraction_task
+            yield {"event": "suggestions", "data": {"profile_suggestions": extracted_data}}
+            yield {"event": "done", "data": {"contact_id": contact_id, "bot_response": full_response}}
+        finally:
+            # The client may disconnect mid-stream
+            extraction_task.cancel()
+
+    async def stream_initial_greeting(self, contact_id: str) -> AsyncIterator[Dict[str, Any]]:
+        """
+        Streaming variant of get_initial_greeting.
+        Yields "chunk" events followed by a "done" event with the full greeting,
+        or a single "error" event if the contact does not exist.
+        
+        With a greeting deadline, the deadline applies to the first chunk: if it
+        misses it, the template greeting is sent as the only chunk.
+        
+        Raises:
+            ServiceOverloaded: If the model call was shed before the first chunk
+                (only without a greeting deadline)
+        """
+        contact = await self.contact_service.aget_contact(contact_id)
+        if not contact:
+            yield {"event": "error", "data": {"error": "Contact not found", "status_code": 404}}
+            return
+
+        profile_completeness = self._calculate_profile_completeness(contact)
+
+        stream = self.client.stream_initial_greeting(contact, profile_completeness)
+        chunks = []
+        fallback_reason = None
+        failed = False
+        try:
+            if greeting_fallback.enabled:
+                first = await self._first_chunk_within_deadline(stream, f"Greeting for contact {contact_id}")
+                if first is None:
+                    fallback_reason = "deadline"
+                else:
+                    chunks.append(first)
+                    yield {"event": "chunk", "data": {"text": first}}
+            if not fallback_reason:
+                async for chunk in stream:
+                    chunks.append(chunk)
+                    yield {"event": "chunk", "data": {"text": chunk}}
+        except StopAsyncIteration:
+            # The stream ended without any chunk
+            pass
+        except ServiceOverloaded as e:
+            if chunks:
+                yield self._overloaded_event(e)
+                return
+            if not greeting_fallback.enabled:
+                raise
+            fallback_reason = "overloaded"
+        except Exception as e:
+            print(f"Error streaming initial greeting: {e}")
+            if chunks:
+                # Cut off mid-greeting: what was sent stays, but it isn't a model greeting
+                failed = True
+            else:
+                fallback_reason = "error"
+
+        if fallback_reason:
+            chunk = greeting_fallback.render(contact, profile_completeness, fallback_reason)
+            chunks.append(chunk)
+            yield {"event": "chunk", "data": {"text": chunk}}
+        elif not failed:
+            greeting_fallback.record_model()
+
+        yield {"event": "done", "data": {"contact_id": contact_id, "greeting": "".join(chunks),
+                                         "source": "template" if fallback_reason else "model"}}
+
+    async def _first_chunk_within_deadline(self, stream: AsyncIterator[str], description: str) -> Optional[str]:
+        """
+        Wait for the first chunk of a stream for at most the greeting deadline.
+        
+        Returns:
+            The chunk, or None if the deadline passed; the stream then finishes in the
+            background, so a completed greeting is still cached
+        
+        Raises:
+            StopAsyncIteration: If the stream is empty
+        """
+        first = asyncio.ensure_future(stream.__anext__())
+        try:
+            done, _ = await asyncio.wait({first}, timeout=greeting_fallback.deadline_seconds)
+        except asyncio.CancelledError:
+            self._finish_in_background(asyncio.create_task(self._drain(first, stream)), description)
+            raise
+        if first in done:
+            return first.result()
+        self._finish_in_background(asyncio.create_task(self._drain(first, stream)), description)
+        return None
+
+    @staticmethod
+    async def _drain(first: Awaitable[str], stream: AsyncIterator[str]) -> None:
+        """Consume the rest of a stream nobody reads anymore, so that it completes"""
+        try:
+            await first
+        except StopAsyncIteration:
+            return
+        async for _ in stream:
+            pass
+
+    @staticmethod
+    def _overloaded_event(error: ServiceOverloaded) -> Dict[str, Any]:
+        """Error event for a stream whose model call was shed after it started"""
+        return {"event": "error", "data": {"error": str(error), "status_code": error.status_code,
+                                           "retry_after": error.retry_after}}
+
     def _calculate_profile_completeness(self, contact: Dict) -> int:
         """
         Calculate how complete a contact's profile is based on filled fields.
@@ -171,158 +570,103 @@ class ChatService:
         completeness = int((filled_fields / len(important_fields)) * 100)
         return min(100, completeness)  # Cap at 100%
     
+    def _parse_last_connection(self, last_conn: Any) -> Optional[str]:
+        """
+        Converts an extracted last_connection value to an ISO datetime string in UTC.
+        Handles 'today', 'yesterday' and ISO dates; returns None if it can't be parsed.
+        """
+        from datetime import datetime, timezone, timedelta
+        # Handle common relative dates
+        if isinstance(last_conn, str):
+            lowered = last_conn.strip().lower()
+            if lowered == 'yesterday':
+                dt = datetime.now(timezone.utc) - timedelta(days=1)
+                return dt.replace(hour=12, minute=0, second=0, microsecond=0).isoformat()
+            if lowered == 'today':
+                dt = datetime.now(timezone.utc)
+                return dt.replace(hour=12, minute=0, second=0, microsecond=0).isoformat()
+            try:
+                dt = datetime.fromisoformat(last_conn)
+                return dt.astimezone(timezone.utc).isoformat()
+            except Exception:
+                print(f"Could not parse last_connection string as ISO datetime: {last_conn}")
+                return None
+        if hasattr(last_conn, 'isoformat'):
+            return last_conn.astimezone(timezone.utc).isoformat()
+        return None
+
+    def _build_profile_patch(self, extracted_data: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Builds the merge patch for merge_contact_profile from normalized extracted data.
+        
+        List fields in the patch are unioned with the stored values, important dates are
+        de-duplicated by date and description, and personality is appended without
+        repeated sentences; the other fields overwrite the stored values.
+        """
+        patch = {}
+        
+        for field in ['nickname', 'birthday', 'relationship_type', 'family_details', 'personality']:
+            if extracted_data.get(field):
+                patch[field] = extracted_data[field]
+        
+        # For adding family_details field as a JSON string if needed
+        if isinstance(patch.get('family_details'), dict):
+            import json
+            patch['family_details'] = json.dumps(patch['family_details'])
+        
+        preferences = extracted_data.get('preferences') or {}
+        likes = preferences.get('likes') or []
+        dislikes = preferences.get('dislikes') or []
+        
+        # Likes are added to interests as well for consistency
+        interests = list(dict.fromkeys((extracted_data.get('interests') or []) + likes))
+        if interests:
+            patch['interests'] = interests
+        if likes or dislikes:
+            patch['preferences'] = {'likes': likes, 'dislikes': dislikes}
+        
+        for field in ['important_dates', 'conversation_topics']:
+            if extracted_data.get(field):
+                patch[field] = extracted_data[field]
+        
+        if extracted_data.get('last_connection'):
+            last_conn = self._parse_last_connection(extracted_data['last_connection'])
+            if last_conn:
+                patch['last_connection'] = last_conn
+        
+        return patch
+
     async def _update_contact_with_extracted_data(self, contact_id: str, extracted_data: Dict[str, Any]) -> None:
         """
         Updates the contact record with data extracted from messages
         
+        The merge (list unions, date de-duplication, personality append) runs in the
+        database as a single atomic call, so there is no read-modify-write window.
+        
         Args:
             contact_id: The ID of the contact to update
             extracted_data: Dictionary containing extracted fields like birthday, interests, etc.
         """
         if not extracted_data:
             return
-            
-        # Get the current contact data
-        contact = self.contact_service.get_contact(contact_id)
-        if not contact:
-            print(f"Cannot update contact {contact_id}: not found")
+        
+        update_payload = self._build_profile_patch(extracted_data)
+        if not update_payload:
             return
-            
-        # Create an update payload
-        update_payload = {}
-        
-        # Process nickname
-        if 'nickname' in extracted_data and extracted_data['nickname']:
-            update_payload['nickname'] = extracted_data['nickname']
-            print(f"Updating nickname to {extracted_data['nickname']}")
-        
-        # Process birthday
-        if 'birthday' in extracted_data and extracted_data['birthday']:
-            update_payload['birthday'] = extracted_data['birthday']
-            print(f"Updating birthday to {extracted_data['birthday']}")
-            
-        # Process interests - merge with existing interests if any
-        if 'interests' in extracted_data and extracted_data['interests']:
-            current_interests = contact.get('interests', []) or []
-            # Convert to set to remove duplicates and back to list
-            merged_interests = list(set(current_interests + extracted_data['interests']))
-            update_payload['interests'] = merged_interests
-            print(f"Updating interests to {merged_interests}")
-            
-        # Also check if we have preferences.likes that should be added to interests
-        if 'preferences' in extracted_data and extracted_data['preferences']:
-            if 'likes' in extracted_data['preferences'] and extracted_data['preferences']['likes']:
-                # Add likes to interests as well for consistency
-                likes_to_add = extracted_data['preferences']['likes']
-                current_interests = update_payload.get('interests', contact.get('interests', []) or [])
-                # Convert to set to remove duplicates and back to list
-                merged_interests = list(set(current_interests + likes_to_add))
-                update_payload['interests'] = merged_interests
-                print(f"Added preferences.likes to interests: {merged_interests}")
-            
-        # Process important dates - add new ones
-        if 'important_dates' in extracted_data and extracted_data['important_dates']:
-            current_dates = contact.get('important_dates', []) or []
-            # Check for duplicates by comparing date and description
-            new_dates = []
-            for new_date in extracted_data['important_dates']:
-                if not any(d.get('date') == new_date.get('date') and 
-                          d.get('description') == new_date.get('description') 
-                          for d in current_dates):
-                    new_dates.append(new_date)
-            
-            if new_dates:
-                update_payload['important_dates'] = current_dates + new_dates
-                print(f"Adding new important dates: {new_dates}")
-                
-        # Process relationship type
-        if 'relationship_type' in extracted_data and extracted_data['relationship_type']:
-            update_payload['relationship_type'] = extracted_data['relationship_type']
-            print(f"Updating relationship type to {extracted_data['relationship_type']}")
-            
-        # Process preferences (likes and dislikes)
-        if 'preferences' in extracted_data and extracted_data['preferences']:
-            current_preferences = contact.get('preferences', {}) or {}
-            if not current_preferences:
-                current_preferences = {'likes': [], 'dislikes': []}
-                
-            # Update likes
-            if 'likes' in extracted_data['preferences'] and extracted_data['preferences']['likes']:
-                current_likes = current_preferences.get('likes', []) or []
-                merged_likes = list(set(current_likes + extracted_data['preferences']['likes']))
-                current_preferences['likes'] = merged_likes
-                
-            # Update dislikes
-            if 'dislikes' in extracted_data['preferences'] and extracted_data['preferences']['dislikes']:
-                current_dislikes = current_preferences.get('dislikes', []) or []
-                merged_dislikes = list(set(current_dislikes + extracted_data['preferences']['dislikes']))
-                current_preferences['dislikes'] = merged_dislikes
-                
-            update_payload['preferences'] = current_preferences
-            print(f"Updating preferences to {current_preferences}")
-            
-        # Process family details
-        if 'family_details' in extracted_data and extracted_data['family_details']:
-            update_payload['family_details'] = extracted_data['family_details']
-            print(f"Updating family details")
-            
-        # Process personality information
-        if 'personality' in extracted_data and extracted_data['personality']:
-            # If there's existing personality data, append new information
-            if contact.get('personality'):
-                update_payload['personality'] = f"{contact.get('personality')}\n\n{extracted_data['personality']}"
+        
+        print(f"Merging extracted data into contact {contact_id}: {update_payload}")
+        
+        try:
+            result = await self.contact_service.amerge_contact_profile(contact_id, update_payload)
+            if result:
+                print(f"Successfully updated contact {contact_id}")
+                # Condense the personality notes in the background once they grow long
+                profile_compactor.schedule(result)
             else:
-                update_payload['personality'] = extracted_data['personality']
-            print(f"Updating personality information")
-        
-        # Update the contact if we have data to update
-        if update_payload:
-            # Make sure we have valid JSON for all fields and no timestamp fields
-            if 'created_at' in update_payload:
-                del update_payload['created_at']
-            if 'updated_at' in update_payload:
-                del update_payload['updated_at']
-            
-            # For adding family_details field as a JSON string if needed
-            import json
-            if 'family_details' in update_payload and isinstance(update_payload['family_details'], dict):
-                update_payload['family_details'] = json.dumps(update_payload['family_details'])
-            
-            print(f"Updating contact {contact_id} with new data: {update_payload}")
-            print(f"Original extracted data was: {extracted_data}")
-            
-            # Extra debug for interests and preferences
-            if 'interests' in update_payload:
-                print(f"INTERESTS UPDATE: {update_payload['interests']}")
-            if 'preferences' in update_payload:
-                print(f"PREFERENCES UPDATE: {update_payload['preferences']}")
-                
-            try:
-                # Try the update with our improved ContactService that handles errors better
-                result = self.contact_service.update_contact(contact_id, update_payload)
-                if result:
-                    print(f"Successfully updated contact {contact_id}")
-                    # Show updated contact data
-                    updated_contact = self.contact_service.get_contact(contact_id)
-                    print(f"Updated contact interests: {updated_contact.get('interests')}")
-                    print(f"Updated contact preferences: {updated_contact.get('preferences')}")
-                else:
-                    print(f"Contact update returned no result. It may not have been updated.")
-            except Exception as e:
-                print(f"Error updating contact: {e}")
-                # Continue gracefully despite errors - don't block the chat functionality
-                import traceback
-                traceback.print_exc()
-                # If this is a PostgreSQL error about updated_at
-                if "'updated_at'" in str(e) or "new" in str(e):
-                    print("This appears to be a database trigger issue. Trying direct SQL update instead...")
-                    # For debugging only - in production you would want a better solution
-                    try:
-                        # Try one more time with a different approach - direct SQL query could be considered
-                        # But for now, just log the error
-                        print("Couldn't update through the API. Contact may need manual updating.")
-                    except Exception as inner_e:
-                        print(f"Alternative update method also failed: {inner_e}")
+                print(f"Cannot update contact {contact_id}: not found")
+        except Exception as e:
+            # Continue gracefully despite errors - don't block the chat functionality
+            print(f"Error updating contact: {e}")
     
     def _sanitize_contact_data(self, data: Dict) -> Dict:
         """
@@ -355,42 +699,7 @@ class ChatService:
     def get_feedback_summary(self, top_n: int = 5) -> dict:
         """
         Summarizes feedback trends for model improvement analysis.
-        Returns total count, per-contact count, recent feedback, and common keywords.
-        """
-        from collections import Counter
-        import re
-        
-        # Defensive: feedback_store may be empty
-        if not feedback_store:
-            return {
-                "total_feedback": 0,
-                "feedback_per_contact": {},
-                "recent_feedback": [],
-                "common_words": []
-            }
-        
-        # Total feedback
-        total_feedback = len(feedback_store)
-        
-        # Feedback per contact
-        feedback_per_contact = {}
-        for fb in feedback_store:
-            cid = fb.get("contact_id", "unknown")
-            feedback_per_contact[cid] = feedback_per_contact.get(cid, 0) + 1
-        
-        # Most recent feedback
-        recent_feedback = sorted(feedback_store, key=lambda x: x.get("timestamp", ""), reverse=True)[:top_n]
-        
-        # Common words (very basic, not NLP)
-        all_text = " ".join(fb.get("message", "") for fb in feedback_store)
-        words = re.findall(r"\b\w{4,}\b", all_text.lower())  # 4+ letter words
-        stopwords = set(["this", "that", "with", "have", "from", "your", "just", "like", "about", "would", "could", "should", "doing", "good", "bad", "very", "more", "less", "than", "what", "when", "where", "which", "their", "them", "they", "been", "some", "much", "well", "even", "only", "also", "into", "over", "such", "most", "many", "other", "because", "after", "before", "while", "still", "make", "made", "want", "need", "know", "time", "help", "thanks", "thank"])
-        filtered_words = [w for w in words if w not in stopwords]
-        common_words = Counter(filtered_words).most_common(top_n)
-        
-        return {
-            "total_feedback": total_feedback,
-            "feedback_per_contact": feedback_per_contact,
-            "recent_feedback": recent_feedback,
-            "common_words": common_words
-        }
+        Returns the total count, the contacts with the most feedback, recent feedback
+        and common keywords; the store keeps these up to date as feedback arrives.
+        """
+        return feedback_store.summary(top_n)
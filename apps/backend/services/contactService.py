@@ -2,48 +2,211 @@
 Contact service for Lazor Connect API.
 This service handles all business logic related to contacts and manages data storage.
 """
-from typing import List, Optional, Dict
+import os
+import copy
+import json
+import base64
+import threading
+from typing import Any, List, Optional, Dict, Tuple
+from uuid import UUID
+
+from cachetools import TTLCache
 
 from models import Contact, ContactCreate
-from db import supabase
+from db import get_contact_repository
+from db.profileText import append_profile_text
+
+CONTACT_CACHE_MAXSIZE = int(os.getenv("CONTACT_CACHE_MAXSIZE", "1000"))
+CONTACT_CACHE_TTL_SECONDS = float(os.getenv("CONTACT_CACHE_TTL_SECONDS", "60"))
+
+# Default and largest page size for contact listings
+CONTACTS_MAX_PAGE_SIZE = int(os.getenv("CONTACTS_MAX_PAGE_SIZE", "200"))
+CONTACTS_PAGE_SIZE = min(int(os.getenv("CONTACTS_PAGE_SIZE", "50")), CONTACTS_MAX_PAGE_SIZE)
+
+
+class _CountingTTLCache(TTLCache):
+    """TTLCache that counts size-based evictions and TTL expirations."""
+
+    def __init__(self, maxsize: int, ttl: float):
+        super().__init__(maxsize=maxsize, ttl=ttl)
+        self.evictions = 0
+        self.expirations = 0
+
+    def popitem(self):
+        key, value = super().popitem()
+        self.evictions += 1
+        return key, value
+
+    def expire(self, time=None):
+        expired = super().expire(time)
+        self.expirations += len(expired)
+        return expired
+
+
+class ContactCache:
+    """
+    In-process, size-bounded LRU cache with TTL for contact rows.
+    
+    Reads go through the cache and writes made by this process invalidate or
+    refresh it. Writes from other processes become visible after the TTL expires.
+    """
+
+    def __init__(self, maxsize: int = CONTACT_CACHE_MAXSIZE, ttl: float = CONTACT_CACHE_TTL_SECONDS):
+        self._cache = _CountingTTLCache(maxsize=maxsize, ttl=ttl)
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, contact_id: str) -> Optional[Dict]:
+        """Get a copy of a cached contact, or None on a miss"""
+        with self._lock:
+            contact = self._cache.get(contact_id)
+            if contact is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+        # Callers may modify the returned dict, so never hand out the cached one
+        return copy.deepcopy(contact)
+
+    def put(self, contact: Dict) -> None:
+        """Store a copy of a contact row"""
+        if not contact or "id" not in contact:
+            return
+        contact = copy.deepcopy(contact)
+        with self._lock:
+            self._cache[str(contact["id"])] = contact
+
+    def invalidate(self, contact_id: str) -> None:
+        """Drop a contact from the cache"""
+        with self._lock:
+            self._cache.pop(str(contact_id), None)
+
+    def clear(self) -> None:
+        """Drop all cached contacts"""
+        with self._lock:
+            self._cache.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        """Cache size and hit/miss/eviction counters"""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "size": len(self._cache),
+                "maxsize": self._cache.maxsize,
+                "ttl_seconds": self._cache.ttl,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / lookups, 3) if lookups else 0.0,
+                "evictions": self._cache.evictions,
+                "expirations": self._cache.expirations,
+            }
+
+
+contact_cache = ContactCache()
 
 
 class ContactService:
     """Service for managing contacts"""
     
+    @staticmethod
+    def _encode_key(key: List[Any]) -> str:
+        """Encode a sort key as an opaque, url-safe cursor"""
+        return base64.urlsafe_b64encode(json.dumps(key).encode("utf-8")).decode("ascii").rstrip("=")
+    
+    @staticmethod
+    def _decode_key(cursor: str) -> List[Any]:
+        """Decode a cursor made by _encode_key; raises ValueError if it is invalid"""
+        try:
+            padded = cursor + "=" * (-len(cursor) % 4)
+            key = json.loads(base64.urlsafe_b64decode(padded.encode("ascii")))
+        except Exception:
+            raise ValueError("Invalid cursor")
+        if not isinstance(key, list) or len(key) != 2:
+            raise ValueError("Invalid cursor")
+        return key
+    
+    @staticmethod
+    def encode_cursor(contact: Dict) -> str:
+        """Encode the sort key of the last contact on a page as an opaque cursor"""
+        return ContactService._encode_key([contact.get("name"), str(contact["id"])])
+    
+    @staticmethod
+    def decode_cursor(cursor: str) -> Tuple[str, str]:
+        """Decode a cursor into its (name, id) sort key; raises ValueError if it is invalid"""
+        name, contact_id = ContactService._decode_key(cursor)
+        return str(name), str(contact_id)
+    
+    @staticmethod
+    def _page(rows: List[Dict], limit: int) -> Dict[str, Any]:
+        """Build a page response from up to limit + 1 rows (the extra row means another page exists)"""
+        contacts = rows[:limit]
+        next_cursor = ContactService.encode_cursor(contacts[-1]) if len(rows) > limit else None
+        return {"contacts": contacts, "next_cursor": next_cursor}
+    
     @staticmethod
     def list_contacts(search: Optional[str] = None, 
                       relationship_type: Optional[str] = None,
                       relationship_strength: Optional[int] = None,
-                      min_strength: Optional[int] = None) -> List[Dict]:
-        """Get all contacts from the database with optional filtering"""
-        query = supabase.table("contacts").select("*")
+                      min_strength: Optional[int] = None,
+                      limit: int = CONTACTS_PAGE_SIZE,
+                      cursor: Optional[str] = None) -> Dict[str, Any]:
+        """
+        Get a page of contacts from the database with optional filtering
         
-        if search:
-            query = query.ilike("name", f"%{search}%")
-            
-        if relationship_type:
-            query = query.eq("relationship_type", relationship_type)
-            
-        if relationship_strength is not None:
-            query = query.eq("relationship_strength", relationship_strength)
-            
-        # Add min_strength filtering if provided
-        if min_strength is not None:
-            query = query.gte("relationship_strength", min_strength)
-            
-        response = query.execute()
-        return response.data
+        Contacts are sorted by (name, id). Returns {"contacts": [...], "next_cursor": ...};
+        pass next_cursor back to get the following page (None on the last page).
+        """
+        after = ContactService.decode_cursor(cursor) if cursor else None
+        # One extra row tells whether another page exists
+        rows = get_contact_repository().list_contacts(search, relationship_type, relationship_strength,
+                                                      min_strength, limit + 1, after)
+        return ContactService._page(rows, limit)
+    
+    @staticmethod
+    async def alist_contacts(search: Optional[str] = None, 
+                             relationship_type: Optional[str] = None,
+                             relationship_strength: Optional[int] = None,
+                             min_strength: Optional[int] = None,
+                             limit: int = CONTACTS_PAGE_SIZE,
+                             cursor: Optional[str] = None) -> Dict[str, Any]:
+        """Async version of list_contacts"""
+        after = ContactService.decode_cursor(cursor) if cursor else None
+        rows = await get_contact_repository().alist_contacts(search, relationship_type, relationship_strength,
+                                                             min_strength, limit + 1, after)
+        return ContactService._page(rows, limit)
     
     @staticmethod
     def get_contact(contact_id: str) -> Optional[Dict]:
-        """Get a single contact by ID (UUID string)"""
-        response = supabase.table("contacts").select("*").eq("id", contact_id).execute()
-        return response.data[0] if response.data else None
+        """Get a single contact by ID (UUID string), served from the contact cache when possible"""
+        cached = contact_cache.get(contact_id)
+        if cached is not None:
+            return cached
+        
+        contact = get_contact_repository().get_contact(contact_id)
+        if contact:
+            contact_cache.put(contact)
+        return contact
     
     @staticmethod
-    def create_contact(contact: Dict) -> Dict:
-        """Create a new contact in the database"""
+    async def aget_contact(contact_id: str) -> Optional[Dict]:
+        """Async version of get_contact"""
+        cached = contact_cache.get(contact_id)
+        if cached is not None:
+            return cached
+        
+        contact = await get_contact_repository().aget_contact(contact_id)
+        if contact:
+            contact_cache.put(contact)
+        return contact
+    
+    @staticmethod
+    def cache_stats() -> Dict[str, Any]:
+        """Get hit/miss/eviction counters of the contact cache"""
+        return contact_cache.stats()
+    
+    @staticmethod
+    def _create_payload(contact: Dict) -> Dict:
+        """Build the insert payload for a new contact"""
         # Ensure only the name field is required
         payload = {
             "name": contact["name"],
@@ -58,13 +221,127 @@ class ContactService:
                      "recommended_contact_freq_days"]:
             if field in contact and contact[field] is not None:
                 payload[field] = contact[field]
+        
+        if payload.get("personality"):
+            payload["personality"] = append_profile_text(payload["personality"], None)
+        
+        return payload
+    
+    @staticmethod
+    def create_contact(contact: Dict) -> Dict:
+        """Create a new contact in the database"""
+        payload = ContactService._create_payload(contact)
+        contact = get_contact_repository().create_contact(payload)
+        contact_cache.put(contact)
+        return contact
+    
+    @staticmethod
+    async def acreate_contact(contact: Dict) -> Dict:
+        """Async version of create_contact"""
+        payload = ContactService._create_payload(contact)
+        contact = await get_contact_repository().acreate_contact(payload)
+        contact_cache.put(contact)
+        return contact
+    
+    @staticmethod
+    def create_contacts(contacts: List[Dict]) -> List[Dict]:
+        """
+        Create many contacts with one database call
+        
+        Used by bulk import; the new contacts are not added to the contact cache,
+        so an import doesn't evict the contacts that are in use.
+        """
+        if not contacts:
+            return []
+        return get_contact_repository().create_contacts([ContactService._create_payload(c) for c in contacts])
+    
+    @staticmethod
+    async def acreate_contacts(contacts: List[Dict]) -> List[Dict]:
+        """Async version of create_contacts"""
+        if not contacts:
+            return []
+        return await get_contact_repository().acreate_contacts([ContactService._create_payload(c) for c in contacts])
+    
+    @staticmethod
+    def _prepare_update(contact_data: Dict) -> Dict:
+        """Clean and validate update data"""
+        # Remove any fields that shouldn't be directly updated
+        # (next_due_at is maintained by a database trigger)
+        clean_data = {k: v for k, v in contact_data.items() 
+                     if k not in ['id', 'created_at', 'updated_at', 'next_due_at']}
+        
+        # Special handling for interests to ensure it's properly formatted as an array
+        if 'interests' in clean_data:
+            # If it's None, initialize as empty list
+            if clean_data['interests'] is None:
+                clean_data['interests'] = []
+            # If it's a string (single interest), convert to list
+            elif isinstance(clean_data['interests'], str):
+                clean_data['interests'] = [clean_data['interests']]
+            # Ensure all items are strings
+            clean_data['interests'] = [str(item) for item in clean_data['interests'] if item]
+            print(f"Formatted interests for update: {clean_data['interests']}")
+        
+        # Special handling for preferences to ensure proper structure
+        if 'preferences' in clean_data:
+            # Ensure preferences is a dictionary
+            if not isinstance(clean_data['preferences'], dict):
+                # Try to convert from string if it's a string
+                if isinstance(clean_data['preferences'], str):
+                    try:
+                        import json
+                        clean_data['preferences'] = json.loads(clean_data['preferences'])
+                    except:
+                        clean_data['preferences'] = {}
+                else:
+                    clean_data['preferences'] = {}
+            
+            # Ensure likes and dislikes are lists
+            if 'likes' not in clean_data['preferences']:
+                clean_data['preferences']['likes'] = []
+            if 'dislikes' not in clean_data['preferences']:
+                clean_data['preferences']['dislikes'] = []
+            
+            print(f"Formatted preferences for update: {clean_data['preferences']}")
+            
+        # Special handling for personality field: an update replaces the text (extracted
+        # notes are appended by merge_contact_profile), de-duplicated and capped
+        if clean_data.get('personality'):
+            clean_data['personality'] = append_profile_text(clean_data['personality'], None)
+            print(f"Formatted personality for update: {clean_data['personality']}")
+        
+        # Special handling for date fields to ensure proper format
+        import re
+        from datetime import datetime
+        current_year = datetime.now().year
+        
+        # Validate birthday field
+        if 'birthday' in clean_data and clean_data['birthday']:
+            birthday_match = re.match(r'(\d{4})-(\d{2})-(\d{2})', clean_data['birthday'])
+            if birthday_match:
+                year, month, day = birthday_match.groups()
+                if year == '0000' or int(year) < 1900 or int(year) > current_year:
+                    # Replace with current year or default to None if date is invalid
+                    try:
+                        clean_data['birthday'] = f"{current_year}-{month}-{day}"
+                        print(f"Fixed invalid birthday year in update: {year} -> {current_year}")
+                    except:
+                        print(f"Invalid birthday format: {clean_data['birthday']} - removing field")
+                        del clean_data['birthday']
+            else:
+                # If the format doesn't match YYYY-MM-DD, remove it
+                print(f"Invalid birthday format: {clean_data['birthday']} - removing field")
+                del clean_data['birthday']
                 
-        response = supabase.table("contacts").insert(payload).execute()
-        return response.data[0]
+        # DO NOT add updated_at timestamp - the contact store maintains it
+        # The error suggests updated_at column is handled by the database
+        
+        return clean_data
     
     @staticmethod
     def update_contact(contact_id: str, contact_data: Dict) -> Optional[Dict]:
         """Update a contact in the database"""
+        clean_data = contact_data
         try:
             # First get the current data to verify contact exists
             current = ContactService.get_contact(contact_id)
@@ -72,149 +349,218 @@ class ContactService:
                 print(f"Contact {contact_id} not found for update")
                 return None
             
-            # Remove any fields that shouldn't be directly updated
-            clean_data = {k: v for k, v in contact_data.items() 
-                         if k not in ['id', 'created_at', 'updated_at']}
+            clean_data = ContactService._prepare_update(contact_data)
             
-            # Special handling for interests to ensure it's properly formatted as an array
-            if 'interests' in clean_data:
-                # If it's None, initialize as empty list
-                if clean_data['interests'] is None:
-                    clean_data['interests'] = []
-                # If it's a string (single interest), convert to list
-                elif isinstance(clean_data['interests'], str):
-                    clean_data['interests'] = [clean_data['interests']]
-                # Ensure all items are strings
-                clean_data['interests'] = [str(item) for item in clean_data['interests'] if item]
-                print(f"Formatted interests for update: {clean_data['interests']}")
+            print(f"Sending update for contact {contact_id} with data: {clean_data}")
+            contact_cache.invalidate(contact_id)
+            updated = get_contact_repository().update_contact(contact_id, clean_data)
             
-            # Special handling for preferences to ensure proper structure
-            if 'preferences' in clean_data:
-                # Ensure preferences is a dictionary
-                if not isinstance(clean_data['preferences'], dict):
-                    # Try to convert from string if it's a string
-                    if isinstance(clean_data['preferences'], str):
-                        try:
-                            import json
-                            clean_data['preferences'] = json.loads(clean_data['preferences'])
-                        except:
-                            clean_data['preferences'] = {}
-                    else:
-                        clean_data['preferences'] = {}
-                
-                # Ensure likes and dislikes are lists
-                if 'likes' not in clean_data['preferences']:
-                    clean_data['preferences']['likes'] = []
-                if 'dislikes' not in clean_data['preferences']:
-                    clean_data['preferences']['dislikes'] = []
-                
-                print(f"Formatted preferences for update: {clean_data['preferences']}")
-                
-            # Special handling for personality field
-            if 'personality' in clean_data:
-                # If the current contact already has personality data, append the new information
-                if current and 'personality' in current and current['personality']:
-                    # If we're adding new information, append it to existing with a separator
-                    if clean_data['personality']:
-                        clean_data['personality'] = f"{current['personality']}\n\n{clean_data['personality']}"
-                print(f"Formatted personality for update: {clean_data['personality']}")
+            if not updated:
+                print("Update returned no data")
+                # Get the current state of the contact to return
+                return ContactService.get_contact(contact_id)
             
-            # Special handling for date fields to ensure proper format
-            import re
-            from datetime import datetime
-            current_year = datetime.now().year
+            print(f"Contact updated successfully with data: {clean_data}")
+            # Write-through: the updated row is the freshest copy of the contact
+            contact_cache.put(updated)
+            return updated
             
-            # Validate birthday field
-            if 'birthday' in clean_data and clean_data['birthday']:
-                birthday_match = re.match(r'(\d{4})-(\d{2})-(\d{2})', clean_data['birthday'])
-                if birthday_match:
-                    year, month, day = birthday_match.groups()
-                    if year == '0000' or int(year) < 1900 or int(year) > current_year:
-                        # Replace with current year or default to None if date is invalid
-                        try:
-                            clean_data['birthday'] = f"{current_year}-{month}-{day}"
-                            print(f"Fixed invalid birthday year in update: {year} -> {current_year}")
-                        except:
-                            print(f"Invalid birthday format: {clean_data['birthday']} - removing field")
-                            del clean_data['birthday']
-                else:
-                    # If the format doesn't match YYYY-MM-DD, remove it
-                    print(f"Invalid birthday format: {clean_data['birthday']} - removing field")
-                    del clean_data['birthday']
-                    
-            # DO NOT add updated_at timestamp - let Supabase handle it through triggers
-            # The error suggests updated_at column is handled by the database
+        except Exception as e:
+            print(f"Contact update error: {e}")
+            print(f"Contact update failed for contact_id: {contact_id}")
+            print(f"Data being updated: {clean_data}")
+            return None
+    
+    @staticmethod
+    async def aupdate_contact(contact_id: str, contact_data: Dict) -> Optional[Dict]:
+        """Async version of update_contact"""
+        clean_data = contact_data
+        try:
+            # First get the current data to verify contact exists
+            current = await ContactService.aget_contact(contact_id)
+            if not current:
+                print(f"Contact {contact_id} not found for update")
+                return None
+            
+            clean_data = ContactService._prepare_update(contact_data)
             
-            # Direct update using the Supabase client
-            print(f"Sending update to Supabase for contact {contact_id} with data: {clean_data}")
-            response = supabase.table("contacts").update(clean_data).eq("id", contact_id).execute()
+            print(f"Sending update for contact {contact_id} with data: {clean_data}")
+            contact_cache.invalidate(contact_id)
+            updated = await get_contact_repository().aupdate_contact(contact_id, clean_data)
             
-            if not response.data:
+            if not updated:
                 print("Update returned no data")
-                # Get the current state of the contact to return
-                return ContactService.get_contact(contact_id)
+                return await ContactService.aget_contact(contact_id)
             
             print(f"Contact updated successfully with data: {clean_data}")
-            return response.data[0] if response.data else None
+            contact_cache.put(updated)
+            return updated
             
         except Exception as e:
-            print(f"Supabase update error: {e}")
+            print(f"Contact update error: {e}")
             print(f"Contact update failed for contact_id: {contact_id}")
             print(f"Data being updated: {clean_data}")
             return None
     
+    @staticmethod
+    async def aupdate_contact_if_unchanged(contact_id: str, contact_data: Dict, updated_at: str) -> Optional[Dict]:
+        """
+        Update a contact only if it hasn't been written since it was read
+
+        Returns the updated contact, or None if it doesn't exist or its updated_at
+        no longer matches (read it again and retry).
+        """
+        contact_cache.invalidate(contact_id)
+        updated = await get_contact_repository().aupdate_contact_if_unchanged(
+            contact_id, ContactService._prepare_update(contact_data), updated_at)
+        if updated:
+            contact_cache.put(updated)
+        return updated
+
+    @staticmethod
+    def merge_contact_profile(contact_id: str, patch: Dict) -> Optional[Dict]:
+        """
+        Merge profile data into a contact in a single atomic database call
+        
+        Merge rules (db/migrations/001_merge_contact_profile.sql, mirrored by the SQLite store):
+        - interests, conversation_topics, preferences.likes/dislikes are unioned with stored values
+        - important_dates are appended, de-duplicated by date and description
+        - personality is appended sentence by sentence, without repeats and capped at
+          PROFILE_TEXT_MAX_CHARS (db/profileText.py)
+        - any other field in the patch overwrites the stored value
+        
+        Returns the updated contact, or None if it doesn't exist.
+        """
+        contact_cache.invalidate(contact_id)
+        contact = get_contact_repository().merge_contact_profile(contact_id, patch)
+        if contact:
+            contact_cache.put(contact)
+        return contact
+    
+    @staticmethod
+    async def amerge_contact_profile(contact_id: str, patch: Dict) -> Optional[Dict]:
+        """Async version of merge_contact_profile"""
+        contact_cache.invalidate(contact_id)
+        contact = await get_contact_repository().amerge_contact_profile(contact_id, patch)
+        if contact:
+            contact_cache.put(contact)
+        return contact
+
+    @staticmethod
+    def merge_contact_profiles(patches: Dict[str, Dict]) -> Dict[str, Optional[Dict]]:
+        """
+        Merge profile data into many contacts with one database call
+
+        Each patch is merged with the rules of merge_contact_profile.
+
+        Returns the updated contact per contact id (None for contacts that don't exist).
+        """
+        if not patches:
+            return {}
+        for contact_id in patches:
+            contact_cache.invalidate(contact_id)
+        contacts = get_contact_repository().merge_contact_profiles(patches)
+        for contact in contacts.values():
+            if contact:
+                contact_cache.put(contact)
+        return contacts
+
+    @staticmethod
+    async def amerge_contact_profiles(patches: Dict[str, Dict]) -> Dict[str, Optional[Dict]]:
+        """Async version of merge_contact_profiles"""
+        if not patches:
+            return {}
+        for contact_id in patches:
+            contact_cache.invalidate(contact_id)
+        contacts = await get_contact_repository().amerge_contact_profiles(patches)
+        for contact in contacts.values():
+            if contact:
+                contact_cache.put(contact)
+        return contacts
+
     @staticmethod
     def delete_contact(contact_id: str) -> bool:
         """Delete a contact from the database"""
-        response = supabase.table("contacts").delete().eq("id", contact_id).execute()
-        return bool(response.data)
+        contact_cache.invalidate(contact_id)
+        deleted = get_contact_repository().delete_contact(contact_id)
+        # Invalidate again in case a concurrent read cached the row during the delete
+        contact_cache.invalidate(contact_id)
+        return deleted
     
     @staticmethod
-    def get_due_for_contact(days_threshold: int = 7) -> List[Dict]:
+    async def adelete_contact(contact_id: str) -> bool:
+        """Async version of delete_contact"""
+        contact_cache.invalidate(contact_id)
+        deleted = await get_contact_repository().adelete_contact(contact_id)
+        contact_cache.invalidate(contact_id)
+        return deleted
+    
+    @staticmethod
+    def get_due_for_contact(days_threshold: int = 7, limit: Optional[int] = None) -> List[Dict]:
         """
         Get contacts that are due for reaching out based on recommended contact frequency
         
         Returns contacts where:
         1. Current date - last_connection > recommended_contact_freq_days
         2. If recommended_contact_freq_days is not set, uses days_threshold parameter
-        """
-        from datetime import datetime, timedelta
-        
-        # Get all contacts
-        all_contacts = ContactService.list_contacts()
-        
-        # Filter contacts that are due for contact
-        due_contacts = []
-        current_date = datetime.now()
         
-        for contact in all_contacts:
-            # Skip if no last_connection date
-            if not contact.get("last_connection"):
-                continue
-                
-            last_connection = datetime.fromisoformat(contact["last_connection"].replace("Z", "+00:00"))
-            recommended_freq = contact.get("recommended_contact_freq_days", days_threshold)
-            
-            days_since_contact = (current_date - last_connection).days
-            if days_since_contact >= recommended_freq:
-                due_contacts.append(contact)
-                
-        return due_contacts
+        Filtering runs in the database against the indexed next_due_at column.
+        Results are ordered most overdue first and capped at limit if given.
+        """
+        return get_contact_repository().get_due_contacts(days_threshold, limit)
     
     @staticmethod
-    def search_contacts(query: str, limit: int = 10) -> List[Dict]:
+    async def aget_due_for_contact(days_threshold: int = 7, limit: Optional[int] = None) -> List[Dict]:
+        """Async version of get_due_for_contact"""
+        return await get_contact_repository().aget_due_contacts(days_threshold, limit)
+    
+    @staticmethod
+    def _search_after(cursor: Optional[str]) -> Optional[Tuple[float, str]]:
+        """Decode a search cursor into its (rank, id) sort key; raises ValueError if it is invalid"""
+        if not cursor:
+            return None
+        after_rank, after_id = ContactService._decode_key(cursor)
+        if not isinstance(after_rank, (int, float)) or isinstance(after_rank, bool):
+            raise ValueError("Invalid cursor")
+        try:
+            return float(after_rank), str(UUID(str(after_id)))
+        except ValueError:
+            raise ValueError("Invalid cursor")
+    
+    @staticmethod
+    def _search_page(rows: List[Dict], limit: int) -> Dict[str, Any]:
+        """Build a page response from up to limit + 1 search rows ({"contact", "rank"})"""
+        hits = rows[:limit]
+        next_cursor = None
+        if len(rows) > limit:
+            last = hits[-1]
+            next_cursor = ContactService._encode_key([last["rank"], str(last["contact"]["id"])])
+        return {"contacts": [hit["contact"] for hit in hits], "next_cursor": next_cursor}
+    
+    @staticmethod
+    def search_contacts(query: str, limit: int = 10, cursor: Optional[str] = None) -> Dict[str, Any]:
         """
         Search for contacts with a specific query string
         
         The search is performed across text fields including:
-        - Name
-        - Nickname
+        - Name and nickname
         - Contact methods
         - Conversation topics
         - Interests
-        """
-        # Use the list_contacts method with search parameter
-        contacts = ContactService.list_contacts(search=query)
+        - Family details, preferences and personality
         
-        # Limit the results
-        return contacts[:limit]
+        Results are ordered by relevance (name matches first). Every word of the
+        query matches as a prefix, so partial input works for type-ahead.
+        
+        Returns a page like list_contacts.
+        """
+        after = ContactService._search_after(cursor)
+        rows = get_contact_repository().search_contacts(query, limit + 1, after)
+        return ContactService._search_page(rows, limit)
+    
+    @staticmethod
+    async def asearch_contacts(query: str, limit: int = 10, cursor: Optional[str] = None) -> Dict[str, Any]:
+        """Async version of search_contacts"""
+        after = ContactService._search_after(cursor)
+        rows = await get_contact_repository().asearch_contacts(query, limit + 1, after)
+        return ContactService._search_page(rows, limit)
@@ -0,0 +1,248 @@
+"""
+Streaming bulk import and export of contacts.
+
+Import reads the request body as it arrives, one line (NDJSON) or record
+(CSV) at a time, validates every row with ContactCreate and inserts the
+valid rows CONTACTS_IMPORT_BATCH_SIZE at a time with one database call per
+batch. Rows that fail are reported by line number and don't stop the import.
+
+Export pages through the contacts table with the keyset cursor of the
+contact listing, CONTACTS_EXPORT_PAGE_SIZE rows per query, and writes each
+page to the response before fetching the next one.
+
+Memory use is bounded by one batch or page either way, however many
+contacts there are.
+
+CSV cells of list and object fields (interests, preferences, important_dates,
+...) hold JSON; interests and conversation_topics also accept plain text
+separated by semicolons.
+"""
+import codecs
+import csv
+import io
+import json
+import os
+from typing import Any, AsyncIterator, Dict, List, Optional, Tuple
+
+from pydantic import ValidationError
+
+from models import ContactCreate
+
+from .contactService import ContactService
+
+CONTACTS_IMPORT_BATCH_SIZE = int(os.getenv("CONTACTS_IMPORT_BATCH_SIZE", "500"))
+CONTACTS_IMPORT_MAX_ERRORS = int(os.getenv("CONTACTS_IMPORT_MAX_ERRORS", "100"))
+CONTACTS_IMPORT_MAX_LINE_CHARS = int(os.getenv("CONTACTS_IMPORT_MAX_LINE_CHARS", "1000000"))
+CONTACTS_EXPORT_PAGE_SIZE = int(os.getenv("CONTACTS_EXPORT_PAGE_SIZE", "500"))
+
+FORMATS = ("ndjson", "csv")
+MEDIA_TYPES = {"ndjson": "application/x-ndjson", "csv": "text/csv"}
+
+# Column order of CSV exports
+EXPORT_COLUMNS = ("id", "name", "nickname", "birthday", "contact_methods",
+                  "last_connection", "avg_days_btw_contacts", "recommended_contact_freq_days",
+                  "relationship_type", "relationship_strength",
+                  "conversation_topics", "important_dates", "reminders",
+                  "interests", "family_details", "preferences", "personality",
+                  "next_due_at", "created_at", "updated_at")
+JSON_COLUMNS = ("contact_methods", "conversation_topics", "important_dates",
+                "reminders", "interests", "preferences")
+# List columns that may also be written as "a; b; c"
+SEPARATED_COLUMNS = ("interests", "conversation_topics")
+
+
+def detect_format(content_type: Optional[str]) -> str:
+    """Import format for a request content type: "csv" for text/csv, otherwise "ndjson"."""
+    return "csv" if content_type and content_type.split(";")[0].strip().lower() == "text/csv" else "ndjson"
+
+
+async def _lines(chunks: AsyncIterator[bytes], max_line_chars: int) -> AsyncIterator[str]:
+    """Decode a byte stream and split it into lines without the line break."""
+    decoder = codecs.getincrementaldecoder("utf-8-sig")(errors="replace")
+    pending = ""
+    async for chunk in chunks:
+        pending += decoder.decode(chunk)
+        *lines, pending = pending.split("\n")
+        for line in lines:
+            yield line.rstrip("\r")
+        if len(pending) > max_line_chars:
+            raise ValueError(f"Line longer than {max_line_chars} characters")
+    pending += decoder.decode(b"", final=True)
+    if pending.strip():
+        yield pending.rstrip("\r")
+
+
+async def _ndjson_rows(lines: AsyncIterator[str]) -> AsyncIterator[Tuple[int, Any]]:
+    """(line number, parsed value or ValueError) for every non-blank line."""
+    line_no = 0
+    async for line in lines:
+        line_no += 1
+        if not line.strip():
+            continue
+        try:
+            yield line_no, json.loads(line)
+        except ValueError as e:
+            yield line_no, ValueError(f"Invalid JSON: {e}")
+
+
+def _csv_cell(column: str, value: str) -> Any:
+    """Convert a CSV cell to the value ContactCreate expects."""
+    if column in JSON_COLUMNS:
+        stripped = value.strip()
+        if stripped[:1] in ("[", "{"):
+            return json.loads(stripped)
+        if column in SEPARATED_COLUMNS:
+            return [item.strip() for item in stripped.split(";") if item.strip()]
+    return value
+
+
+async def _csv_rows(lines: AsyncIterator[str]) -> AsyncIterator[Tuple[int, Any]]:
+    """(line number, row dict or ValueError) for every CSV record after the header."""
+    header: Optional[List[str]] = None
+    record: List[str] = []
+    line_no = start = 0
+    async for line in lines:
+        line_no += 1
+        if not record:
+            start = line_no
+            if not line.strip():
+                continue
+        record.append(line)
+        # A quoted cell may span lines: the record ends once its quotes are balanced
+        if sum(part.count('"') for part in record) % 2:
+            if sum(map(len, record)) > CONTACTS_IMPORT_MAX_LINE_CHARS:
+                raise ValueError(f"Record at line {start} is longer than {CONTACTS_IMPORT_MAX_LINE_CHARS} characters")
+            continue
+
+        text, record = "\n".join(record), []
+        try:
+            cells = next(csv.reader(io.StringIO(text)))
+        except (csv.Error, StopIteration) as e:
+            yield start, ValueError(f"Invalid CSV: {e}")
+            continue
+        if header is None:
+            header = [cell.strip() for cell in cells]
+            continue
+        if len(cells) > len(header):
+            yield start, ValueError(f"Expected {len(header)} columns, got {len(cells)}")
+            continue
+        try:
+            yield start, {column: _csv_cell(column, value)
+                          for column, value in zip(header, cells) if value != ""}
+        except ValueError as e:
+            yield start, ValueError(f"Invalid JSON in a list or object column: {e}")
+
+    if record:
+        yield start, ValueError("Unterminated quoted cell")
+
+
+async def import_contacts(chunks: AsyncIterator[bytes], fmt: str = "ndjson",
+                          batch_size: int = CONTACTS_IMPORT_BATCH_SIZE,
+                          max_errors: int = CONTACTS_IMPORT_MAX_ERRORS) -> Dict[str, Any]:
+    """
+    Import contacts from a streamed NDJSON or CSV body.
+
+    Args:
+        chunks: The request body as it arrives
+        fmt: "ndjson" (one contact object per line) or "csv" (header row, one contact per record)
+        batch_size: Rows inserted per database call
+        max_errors: Number of row errors listed in the result (all are counted)
+
+    Returns:
+        Dictionary with the number of rows read, imported and failed, the number of
+        batches and the errors as {"line": ..., "error": ...}
+    """
+    if fmt not in FORMATS:
+        raise ValueError(f"Unknown import format: {fmt!r} (expected 'ndjson' or 'csv')")
+
+    result: Dict[str, Any] = {"rows": 0, "imported": 0, "failed": 0, "batches": 0, "errors": []}
+
+    def fail(line: int, error: str) -> None:
+        result["failed"] += 1
+        if len(result["errors"]) < max_errors:
+            result["errors"].append({"line": line, "error": error})
+
+    batch: List[Tuple[int, Dict]] = []
+
+    async def flush() -> None:
+        rows = [contact for _, contact in batch]
+        try:
+            await ContactService.acreate_contacts(rows)
+            result["imported"] += len(rows)
+        except Exception as e:
+            print(f"Contact import batch failed: {e}")
+            for line, _ in batch:
+                fail(line, f"Insert failed: {e}")
+        result["batches"] += 1
+        batch.clear()
+
+    lines = _lines(chunks, CONTACTS_IMPORT_MAX_LINE_CHARS)
+    rows = _csv_rows(lines) if fmt == "csv" else _ndjson_rows(lines)
+    try:
+        async for line, row in rows:
+            result["rows"] += 1
+            if isinstance(row, ValueError):
+                fail(line, str(row))
+                continue
+            if not isinstance(row, dict):
+                fail(line, "Expected a JSON object")
+                continue
+            try:
+                contact = ContactCreate.model_validate(row)
+            except ValidationError as e:
+                fail(line, "; ".join(f"{'.'.join(map(str, err['loc']))}: {err['msg']}" for err in e.errors()))
+                continue
+            batch.append((line, contact.model_dump(mode="json")))
+            if len(batch) >= batch_size:
+                await flush()
+    except ValueError as e:
+        # The body itself is unreadable (e.g. a runaway line): keep what was imported so far
+        result["aborted"] = str(e)
+
+    if batch:
+        await flush()
+    return result
+
+
+def _csv_line(values: List[Any]) -> str:
+    buffer = io.StringIO()
+    csv.writer(buffer, lineterminator="\n").writerow(values)
+    return buffer.getvalue()
+
+
+def _csv_value(column: str, value: Any) -> Any:
+    if value is None:
+        return ""
+    if column in JSON_COLUMNS:
+        return json.dumps(value)
+    return value
+
+
+async def export_contacts(fmt: str = "ndjson", page_size: int = CONTACTS_EXPORT_PAGE_SIZE) -> AsyncIterator[str]:
+    """
+    Stream all contacts, sorted by name, one page of rows at a time.
+
+    Args:
+        fmt: "ndjson" or "csv"
+        page_size: Rows fetched per query
+
+    Yields:
+        Chunks of the export, one per page (CSV starts with the header row)
+    """
+    if fmt not in FORMATS:
+        raise ValueError(f"Unknown export format: {fmt!r} (expected 'ndjson' or 'csv')")
+
+    if fmt == "csv":
+        yield _csv_line(list(EXPORT_COLUMNS))
+
+    cursor = None
+    while True:
+        page = await ContactService.alist_contacts(limit=page_size, cursor=cursor)
+        if fmt == "csv":
+            yield "".join(_csv_line([_csv_value(column, contact.get(column)) for column in EXPORT_COLUMNS])
+                          for contact in page["contacts"])
+        else:
+            yield "".join(json.dumps(contact, default=str) + "\n" for contact in page["contacts"])
+        cursor = page["next_cursor"]
+        if not cursor:
+            break
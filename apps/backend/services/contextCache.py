@@ -0,0 +1,178 @@
+"""
+Server-side context caching for the static prompt prefixes.
+
+Every Gemini call starts with the same instructions: the system prompt plus
+the chat, greeting or extraction templates. With context caching each
+distinct prefix is uploaded once as a cachedContents resource, and later
+calls send only their per-contact tail together with the cache handle.
+Handles are extended before they expire and recreated when a template
+changes.
+
+The API rejects prefixes below the model's minimum cacheable size. Such a
+prefix is sent inline instead, and creating the cache is retried after
+GEMINI_CONTEXT_CACHE_RETRY_SECONDS.
+"""
+import asyncio
+import hashlib
+import os
+import time
+from collections import Counter
+from dataclasses import dataclass
+from typing import Any, Dict, Optional
+
+from google import genai
+from google.genai import types
+
+GEMINI_CONTEXT_CACHE = os.getenv("GEMINI_CONTEXT_CACHE", "true").lower() == "true"
+GEMINI_CONTEXT_CACHE_TTL_SECONDS = int(os.getenv("GEMINI_CONTEXT_CACHE_TTL_SECONDS", "3600"))
+# Extend a cache when it has less than this many seconds left
+GEMINI_CONTEXT_CACHE_REFRESH_SECONDS = int(os.getenv("GEMINI_CONTEXT_CACHE_REFRESH_SECONDS", "300"))
+GEMINI_CONTEXT_CACHE_RETRY_SECONDS = int(os.getenv("GEMINI_CONTEXT_CACHE_RETRY_SECONDS", "600"))
+
+
+@dataclass
+class CachedPrefix:
+    """State of one prompt prefix: its cache handle, or when to try creating one again"""
+    digest: str
+    chars: int
+    name: Optional[str] = None
+    expires_at: float = 0.0
+    retry_at: float = 0.0
+
+
+class ContextCache:
+    """Creates, extends and replaces Gemini cachedContents for named prompt prefixes."""
+
+    def __init__(self, enabled: bool = GEMINI_CONTEXT_CACHE,
+                 ttl_seconds: int = GEMINI_CONTEXT_CACHE_TTL_SECONDS,
+                 refresh_seconds: int = GEMINI_CONTEXT_CACHE_REFRESH_SECONDS,
+                 retry_seconds: int = GEMINI_CONTEXT_CACHE_RETRY_SECONDS):
+        self.enabled = enabled
+        self.ttl_seconds = ttl_seconds
+        self.refresh_seconds = min(refresh_seconds, ttl_seconds // 2)
+        self.retry_seconds = retry_seconds
+        self._prefixes: Dict[str, CachedPrefix] = {}
+        self._locks: Dict[str, asyncio.Lock] = {}
+        self._counters: Counter = Counter()
+
+    @staticmethod
+    def _key(model: str, prefix_name: str) -> str:
+        return f"{model}/{prefix_name}"
+
+    def _usable(self, entry: Optional[CachedPrefix], digest: str, now: float) -> bool:
+        """Whether entry holds a handle for this prefix text that doesn't need extending yet"""
+        return (entry is not None and entry.digest == digest and entry.name is not None
+                and entry.expires_at - now > self.refresh_seconds)
+
+    async def get_handle(self, client: genai.Client, model: str,
+                         prefix_name: str, prefix_text: str) -> Optional[str]:
+        """
+        Get the cache handle for a prompt prefix, creating or extending the cache as needed.
+
+        Args:
+            client: The Gemini client
+            model: Model the cache is created for
+            prefix_name: Name of the prefix, e.g. "chat" or "extraction"
+            prefix_text: The prefix itself
+
+        Returns:
+            The cachedContents name to send with the request, or None to send the prefix inline
+        """
+        if not self.enabled or not prefix_text:
+            return None
+
+        key = self._key(model, prefix_name)
+        digest = hashlib.sha256(prefix_text.encode("utf-8")).hexdigest()
+        entry = self._prefixes.get(key)
+        if self._usable(entry, digest, time.monotonic()):
+            self._counters["hits"] += 1
+            return entry.name
+
+        # One caller per prefix talks to the API; the others wait and reuse its result
+        async with self._locks.setdefault(key, asyncio.Lock()):
+            now = time.monotonic()
+            entry = self._prefixes.get(key)
+            if self._usable(entry, digest, now):
+                self._counters["hits"] += 1
+                return entry.name
+            if entry is not None and entry.digest == digest and entry.name is None and now < entry.retry_at:
+                self._counters["inline"] += 1
+                return None
+
+            if entry is not None and entry.digest == digest and entry.name is not None:
+                if await self._extend(client, entry, now):
+                    self._counters["hits"] += 1
+                    return entry.name
+
+            name = await self._create(client, model, key, prefix_name, prefix_text, digest, now)
+            if entry is not None and entry.name and entry.name != name:
+                # The templates changed (or extending failed): drop the old cache
+                await self._delete(client, entry.name)
+            return name
+
+    async def _extend(self, client: genai.Client, entry: CachedPrefix, now: float) -> bool:
+        try:
+            await client.aio.caches.update(
+                name=entry.name,
+                config=types.UpdateCachedContentConfig(ttl=f"{self.ttl_seconds}s"),
+            )
+        except Exception as e:
+            print(f"Extending context cache {entry.name} failed, recreating it: {e}")
+            return False
+        entry.expires_at = now + self.ttl_seconds
+        self._counters["extended"] += 1
+        return True
+
+    async def _create(self, client: genai.Client, model: str, key: str, prefix_name: str,
+                      prefix_text: str, digest: str, now: float) -> Optional[str]:
+        try:
+            cached = await client.aio.caches.create(
+                model=model,
+                config=types.CreateCachedContentConfig(
+                    contents=[types.Content(role="user", parts=[types.Part(text=prefix_text)])],
+                    display_name=f"lazor-{prefix_name}",
+                    ttl=f"{self.ttl_seconds}s",
+                ),
+            )
+        except Exception as e:
+            print(f"Creating context cache for prompt prefix '{prefix_name}' failed, sending it inline: {e}")
+            self._prefixes[key] = CachedPrefix(digest, len(prefix_text), retry_at=now + self.retry_seconds)
+            self._counters["create_failures"] += 1
+            return None
+
+        self._prefixes[key] = CachedPrefix(digest, len(prefix_text), cached.name, now + self.ttl_seconds)
+        self._counters["created"] += 1
+        return cached.name
+
+    async def _delete(self, client: genai.Client, name: str) -> None:
+        try:
+            await client.aio.caches.delete(name=name)
+        except Exception as e:
+            # It expires on its own anyway
+            print(f"Deleting context cache {name} failed: {e}")
+
+    def invalidate(self, model: str, prefix_name: str) -> None:
+        """Forget a handle the API no longer accepts (e.g. deleted or expired early)"""
+        if self._prefixes.pop(self._key(model, prefix_name), None) is not None:
+            self._counters["invalidated"] += 1
+
+    def stats(self) -> Dict[str, Any]:
+        """Cached prefixes and handle usage"""
+        now = time.monotonic()
+        return {
+            "enabled": self.enabled,
+            "ttl_seconds": self.ttl_seconds,
+            "prefixes": {
+                key: {
+                    "chars": entry.chars,
+                    "cached": entry.name is not None,
+                    "expires_in_seconds": round(entry.expires_at - now) if entry.name else None,
+                }
+                for key, entry in self._prefixes.items()
+            },
+            **{name: self._counters[name] for name in
+               ("hits", "inline", "created", "extended", "create_failures", "invalidated")},
+        }
+
+
+context_cache = ContextCache()
@@ -0,0 +1,279 @@
+"""
+Local pre-filter for profile extraction.
+
+Most chat messages ("ok", "thanks", questions to the assistant) carry no
+profile facts, yet each would cost an extraction call. The filter decides
+per message, without the model, whether extraction is worth a call:
+
+1. Messages that are empty or only acknowledgements are skipped.
+2. Messages with profile cues (dates, family terms, likes and dislikes,
+   work and life events, nicknames, when you last talked) are extracted.
+3. Questions to the assistant without such cues are skipped.
+4. Everything else is scored by a naive Bayes model over words and word
+   pairs, trained on the outcomes of past extractions (did the call find
+   profile data?) and optionally on labelled messages from
+   EXTRACTION_FILTER_TRAINING_PATH (JSON lines with "message" and
+   "has_profile_data"). Until it has seen EXTRACTION_FILTER_MIN_SAMPLES
+   outcomes these messages are extracted; afterwards they are skipped when
+   the estimated chance of profile data is below
+   EXTRACTION_FILTER_SKIP_BELOW.
+
+A fraction EXTRACTION_FILTER_AUDIT_RATE of the skipped messages is
+extracted anyway; the share of those that did hold profile data estimates
+what the skips miss, and /stats reports it with the skip rates.
+"""
+import json
+import math
+import os
+import random
+import re
+from collections import Counter
+from typing import Any, Dict, Iterable, List, Tuple
+
+EXTRACTION_FILTER_ENABLED = os.getenv("EXTRACTION_FILTER_ENABLED", "true").lower() == "true"
+EXTRACTION_FILTER_SKIP_BELOW = float(os.getenv("EXTRACTION_FILTER_SKIP_BELOW", "0.1"))
+EXTRACTION_FILTER_MIN_SAMPLES = int(os.getenv("EXTRACTION_FILTER_MIN_SAMPLES", "200"))
+EXTRACTION_FILTER_AUDIT_RATE = float(os.getenv("EXTRACTION_FILTER_AUDIT_RATE", "0.05"))
+EXTRACTION_FILTER_MAX_FEATURES = int(os.getenv("EXTRACTION_FILTER_MAX_FEATURES", "20000"))
+EXTRACTION_FILTER_TRAINING_PATH = os.getenv("EXTRACTION_FILTER_TRAINING_PATH", "")
+
+_WORD = re.compile(r"[a-z0-9]+(?:'[a-z]+)?")
+
+# Replies that never say anything about a contact
+ACKNOWLEDGEMENTS = frozenset("""
+ok okay k kk sure yes yeah yep yup no nope nah thanks thank you ty thx cheers great good cool nice
+awesome perfect fine alright right got it sounds makes sense lol haha hehe hi hello hey bye see ya
+later np welcome oh ah hmm wow love that will do noted understood so much very
+""".split())
+
+_MONTHS = (r"jan(?:uary)?|feb(?:ruary)?|mar(?:ch)?|apr(?:il)?|may|june?|july?|aug(?:ust)?"
+           r"|sep(?:t(?:ember)?)?|oct(?:ober)?|nov(?:ember)?|dec(?:ember)?")
+
+# Patterns of the facts the extraction prompt looks for (prompts/profile_extraction.md)
+PROFILE_CUES: Dict[str, re.Pattern] = {
+    "date": re.compile(
+        rf"\b(?:{_MONTHS})\b\.?\s*\d{{1,2}}|\b\d{{1,2}}(?:st|nd|rd|th)?\s+(?:of\s+)?(?:{_MONTHS})\b"
+        r"|\b\d{1,4}[/.-]\d{1,2}(?:[/.-]\d{2,4})?\b"
+        r"|\b(?:birthday|bday|anniversary|born|wedding|graduat\w*|due date)\b"),
+    "family": re.compile(
+        r"\b(?:(?:mom|mum|mother|dad|father|parent|sister|brother|sibling|wife|husband|spouse|partner"
+        r"|son|daughter|kid|child|baby|twin|grand\w+|aunt|uncle|cousin|niece|nephew|girlfriend|boyfriend"
+        r"|in-law)s?|children|babies|wives|family|fianc\w*|married|engaged|divorc\w*|pregnan\w*)\b"),
+    "likes": re.compile(
+        r"\b(?:likes?|liked|loves?|loved|enjoys?|enjoyed|hates?|hated|dislikes?|disliked|prefers?|preferred"
+        r"|favou?rite|fan of|into|passionate|obsessed|allergic|vegan|vegetarian|can't stand|hobby|hobbies"
+        r"|plays|collects)\b"),
+    "life": re.compile(
+        r"\b(?:job|works?|worked|working|career|promot\w+|hired|fired|quit|retir\w+|school|college"
+        r"|universit\w+|studies|studying|moved|moving|lives|living|new (?:house|home|apartment|flat|car|job))\b"),
+    "nickname": re.compile(r"\b(?:nickname|goes by|known as|call (?:him|her|them))\b"),
+    "contact": re.compile(
+        r"\b(?:talked|spoke|chatted|met|saw|caught up|called|texted|visited|yesterday|last (?:week|month|year|time)"
+        r"|ago)\b"),
+    "personality": re.compile(
+        r"\b(?:he|she|they)(?:'s|'re| is| are| was| were| gets| tends| seems)\b"
+        r"|\b(?:shy|outgoing|introvert\w*|extrovert\w*|anxious|nervous|calm|funny|kind|stubborn)\b"),
+}
+
+# Requests to the assistant rather than statements about the contact
+_QUESTION_START = re.compile(
+    r"^(?:what|how|why|which|when|where|who|can|could|would|will|should|do|does|did|is|are|any|got)\b")
+
+
+def features(message: str) -> List[str]:
+    """Words and word pairs of a message, lower-cased and de-duplicated"""
+    words = _WORD.findall(message.lower())
+    pairs = [f"{a} {b}" for a, b in zip(words, words[1:])]
+    return list(dict.fromkeys(words + pairs))
+
+
+def has_profile_data(data: Any) -> bool:
+    """Whether an extraction result holds any value (an empty list of likes doesn't count)"""
+    if isinstance(data, dict):
+        return any(has_profile_data(value) for value in data.values())
+    if isinstance(data, (list, tuple)):
+        return any(has_profile_data(value) for value in data)
+    # Identity checks: 0 == False, but a zero is a value
+    return not (data is None or data is False or data == "")
+
+
+class NaiveBayes:
+    """Two-class naive Bayes over binary features with Laplace smoothing, trained incrementally."""
+
+    def __init__(self, max_features: int = EXTRACTION_FILTER_MAX_FEATURES):
+        self.max_features = max_features
+        # Index 1: messages with profile data, 0: without
+        self._docs = [0, 0]
+        self._counts = [Counter(), Counter()]
+        self._totals = [0, 0]
+        self._vocabulary: set = set()
+
+    @property
+    def samples(self) -> int:
+        return self._docs[0] + self._docs[1]
+
+    @property
+    def has_both_classes(self) -> bool:
+        return all(self._docs)
+
+    def learn(self, tokens: Iterable[str], positive: bool) -> None:
+        label = int(positive)
+        self._docs[label] += 1
+        for token in tokens:
+            if token not in self._vocabulary:
+                # A full vocabulary keeps its features; new ones are ignored
+                if len(self._vocabulary) >= self.max_features:
+                    continue
+                self._vocabulary.add(token)
+            self._counts[label][token] += 1
+            self._totals[label] += 1
+
+    def probability(self, tokens: Iterable[str]) -> float:
+        """Estimated probability that a message holds profile data"""
+        vocabulary = len(self._vocabulary) + 1
+        scores = []
+        for label in (0, 1):
+            score = math.log((self._docs[label] + 1) / (self.samples + 2))
+            denominator = self._totals[label] + vocabulary
+            for token in tokens:
+                if token in self._vocabulary:
+                    score += math.log((self._counts[label][token] + 1) / denominator)
+            scores.append(score)
+        # Softmax of the two log scores
+        return 1 / (1 + math.exp(max(-50.0, min(50.0, scores[0] - scores[1]))))
+
+    def stats(self) -> Dict[str, Any]:
+        return {"samples": self.samples, "with_profile_data": self._docs[1], "features": len(self._vocabulary)}
+
+
+class ExtractionFilter:
+    """Decides which messages are worth a profile-extraction call and counts the decisions."""
+
+    def __init__(self,
+                 enabled: bool = EXTRACTION_FILTER_ENABLED,
+                 skip_below: float = EXTRACTION_FILTER_SKIP_BELOW,
+                 min_samples: int = EXTRACTION_FILTER_MIN_SAMPLES,
+                 audit_rate: float = EXTRACTION_FILTER_AUDIT_RATE,
+                 training_path: str = EXTRACTION_FILTER_TRAINING_PATH,
+                 max_features: int = EXTRACTION_FILTER_MAX_FEATURES):
+        self.enabled = enabled
+        self.skip_below = skip_below
+        self.min_samples = min_samples
+        self.audit_rate = audit_rate
+        self.model = NaiveBayes(max_features)
+        if enabled and training_path:
+            self._load_training_data(training_path)
+
+        # Counters for observability
+        self._extracted: Dict[str, int] = {}
+        self._skipped: Dict[str, int] = {}
+        self._audited = 0
+        self._audit_misses = 0
+        self._empty_extractions = 0
+        self._outcomes = 0
+
+    def _load_training_data(self, path: str) -> None:
+        """Train the model on labelled messages, one JSON object per line"""
+        loaded = 0
+        try:
+            with open(path, encoding="utf-8") as f:
+                for line_number, line in enumerate(f, 1):
+                    if not line.strip():
+                        continue
+                    try:
+                        sample = json.loads(line)
+                        self.model.learn(features(str(sample["message"])), bool(sample["has_profile_data"]))
+                        loaded += 1
+                    except (ValueError, KeyError, TypeError):
+                        print(f"Warning: skipping malformed line {line_number} of {path}")
+        except OSError as e:
+            print(f"Warning: could not read extraction filter training data: {e}")
+            return
+        print(f"Extraction filter trained on {loaded} labelled messages from {path}")
+
+    def classify(self, message: str) -> Tuple[bool, str]:
+        """
+        Decide without side effects whether a message may hold profile data.
+
+        Args:
+            message: The user's message
+
+        Returns:
+            (extract, reason): whether to call the model, and the rule or "model" that decided
+        """
+        text = message.strip().lower().replace("\u2019", "'") if message else ""
+        words = _WORD.findall(text)
+        if not words or all(word in ACKNOWLEDGEMENTS for word in words):
+            return False, "acknowledgement"
+        for cue, pattern in PROFILE_CUES.items():
+            if pattern.search(text):
+                return True, cue
+        if text.endswith("?") and _QUESTION_START.match(text):
+            return False, "question"
+        if self.model.samples < self.min_samples or not self.model.has_both_classes:
+            return True, "untrained"
+        return self.model.probability(features(text)) >= self.skip_below, "model"
+
+    def check(self, message: str) -> Tuple[bool, bool]:
+        """
+        Decide whether to run extraction for a message and count the decision.
+
+        Args:
+            message: The user's message
+
+        Returns:
+            (extract, audit): whether to call the model, and whether the call is an audit
+            of a message the filter would have skipped (pass it back to record)
+        """
+        if not self.enabled:
+            return True, False
+        extract, reason = self.classify(message)
+        if extract:
+            self._extracted[reason] = self._extracted.get(reason, 0) + 1
+            return True, False
+        self._skipped[reason] = self._skipped.get(reason, 0) + 1
+        if random.random() < self.audit_rate:
+            self._audited += 1
+            return True, True
+        return False, False
+
+    def record(self, message: str, found: bool, audit: bool = False) -> None:
+        """
+        Learn from the outcome of a successful extraction call.
+
+        Args:
+            message: The message that was extracted
+            found: Whether the call returned any profile data (see has_profile_data)
+            audit: The value check returned for the message
+        """
+        if not self.enabled:
+            return
+        self._outcomes += 1
+        if not found:
+            self._empty_extractions += 1
+        if audit and found:
+            self._audit_misses += 1
+        self.model.learn(features(message), found)
+
+    def stats(self) -> Dict[str, Any]:
+        """Decisions by reason, skip rate, audit misses and the model's training size"""
+        extracted = sum(self._extracted.values())
+        skipped = sum(self._skipped.values())
+        checked = extracted + skipped
+        return {
+            "enabled": self.enabled,
+            "checked": checked,
+            "skipped": skipped,
+            "skip_rate": round(skipped / checked, 3) if checked else 0.0,
+            "skipped_by_reason": self._skipped,
+            "extracted_by_reason": self._extracted,
+            # Extraction calls (audits included) that found nothing
+            "empty_extraction_rate": round(self._empty_extractions / self._outcomes, 3) if self._outcomes else 0.0,
+            "audited": self._audited,
+            "audit_misses": self._audit_misses,
+            "audit_miss_rate": round(self._audit_misses / self._audited, 3) if self._audited else 0.0,
+            "model": self.model.stats(),
+        }
+
+
+extraction_filter = ExtractionFilter()
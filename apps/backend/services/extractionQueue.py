@@ -0,0 +1,208 @@
+"""
+Background work queue for profile extraction.
+
+Extraction and the profile write-back run on an in-process pool of worker
+tasks so the chat reply does not have to wait for them. Jobs are queued per
+contact: jobs for the same contact run one at a time and in order, while jobs
+for different contacts run concurrently.
+"""
+import os
+import time
+import asyncio
+from collections import OrderedDict, deque
+from datetime import datetime
+from typing import Any, Awaitable, Callable, Deque, Dict, List, Optional, Set
+from uuid import uuid4
+
+from .admission import Priority, request_priority
+
+EXTRACTION_WORKERS = int(os.getenv("EXTRACTION_WORKERS", "4"))
+EXTRACTION_QUEUE_MAX = int(os.getenv("EXTRACTION_QUEUE_MAX", "1000"))
+EXTRACTION_RESULTS_PER_CONTACT = int(os.getenv("EXTRACTION_RESULTS_PER_CONTACT", "10"))
+EXTRACTION_RESULTS_MAX_CONTACTS = int(os.getenv("EXTRACTION_RESULTS_MAX_CONTACTS", "1000"))
+
+ExtractionJob = Callable[[], Awaitable[Dict[str, Any]]]
+
+
+class ExtractionQueue:
+    """In-process worker pool that runs extraction jobs serially per contact."""
+
+    def __init__(self,
+                 worker_count: int = EXTRACTION_WORKERS,
+                 max_pending: int = EXTRACTION_QUEUE_MAX,
+                 results_per_contact: int = EXTRACTION_RESULTS_PER_CONTACT,
+                 max_contacts: int = EXTRACTION_RESULTS_MAX_CONTACTS):
+        self.worker_count = worker_count
+        self.max_pending = max_pending
+        self.results_per_contact = results_per_contact
+        self.max_contacts = max_contacts
+
+        # Contact ids that have runnable work; each contact is queued at most once
+        self._ready: Optional[asyncio.Queue] = None
+        self._workers: List[asyncio.Task] = []
+        self._pending: Dict[str, Deque[Dict[str, Any]]] = {}
+        self._scheduled: Set[str] = set()
+        self._running: Dict[str, str] = {}
+        self._results: "OrderedDict[str, Deque[Dict[str, Any]]]" = OrderedDict()
+
+        # Counters for observability
+        self._pending_count = 0
+        self._submitted = 0
+        self._completed = 0
+        self._failed = 0
+        self._rejected = 0
+        self._total_wait_ms = 0.0
+        self._total_run_ms = 0.0
+        self._max_latency_ms = 0.0
+        self._last_latency_ms = 0.0
+
+    def _ensure_workers(self) -> None:
+        """Start the worker tasks on the running event loop if needed."""
+        if self._ready is None:
+            self._ready = asyncio.Queue()
+        self._workers = [w for w in self._workers if not w.done()]
+        while len(self._workers) < self.worker_count:
+            self._workers.append(asyncio.create_task(self._worker()))
+
+    def submit(self, contact_id: str, job: ExtractionJob) -> Optional[str]:
+        """
+        Queue an extraction job for a contact.
+
+        Args:
+            contact_id: The contact the job belongs to
+            job: Zero-argument coroutine function returning the extracted data
+
+        Returns:
+            The job id, or None if the queue is full and the job was dropped
+        """
+        self._ensure_workers()
+
+        if self._pending_count >= self.max_pending:
+            self._rejected += 1
+            print(f"Extraction queue full ({self._pending_count} pending); dropping job for contact {contact_id}")
+            return None
+
+        job_id = uuid4().hex
+        self._pending.setdefault(contact_id, deque()).append({
+            "job_id": job_id,
+            "job": job,
+            "enqueued_at": time.monotonic(),
+        })
+        self._pending_count += 1
+        self._submitted += 1
+
+        if contact_id not in self._scheduled:
+            self._scheduled.add(contact_id)
+            self._ready.put_nowait(contact_id)
+
+        return job_id
+
+    async def _worker(self) -> None:
+        """Run queued jobs until cancelled."""
+        # Deferred extraction yields to interactive requests for model calls
+        request_priority.set(Priority.BACKGROUND)
+        while True:
+            contact_id = await self._ready.get()
+            try:
+                await self._run_next(contact_id)
+            finally:
+                self._ready.task_done()
+
+            # Re-queue the contact if more work arrived while this job was running
+            if self._pending.get(contact_id):
+                self._ready.put_nowait(contact_id)
+            else:
+                self._pending.pop(contact_id, None)
+                self._scheduled.discard(contact_id)
+
+    async def _run_next(self, contact_id: str) -> None:
+        """Run the oldest pending job for a contact and record its result."""
+        entry = self._pending[contact_id].popleft()
+        self._pending_count -= 1
+        self._running[contact_id] = entry["job_id"]
+
+        started_at = time.monotonic()
+        wait_ms = (started_at - entry["enqueued_at"]) * 1000
+        status = "done"
+        try:
+            suggestions = await entry["job"]() or {}
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            print(f"Extraction job {entry['job_id']} for contact {contact_id} failed: {e}")
+            status = "failed"
+            suggestions = {}
+        finally:
+            self._running.pop(contact_id, None)
+
+        run_ms = (time.monotonic() - started_at) * 1000
+        latency_ms = wait_ms + run_ms
+        if status == "done":
+            self._completed += 1
+        else:
+            self._failed += 1
+        self._total_wait_ms += wait_ms
+        self._total_run_ms += run_ms
+        self._last_latency_ms = latency_ms
+        self._max_latency_ms = max(self._max_latency_ms, latency_ms)
+
+        self._store_result(contact_id, {
+            "job_id": entry["job_id"],
+            "status": status,
+            "profile_suggestions": suggestions,
+            "completed_at": datetime.now().isoformat(),
+            "latency_ms": round(latency_ms, 1),
+        })
+
+    def _store_result(self, contact_id: str, result: Dict[str, Any]) -> None:
+        """Keep the latest results per contact, evicting the least recently updated contacts."""
+        results = self._results.pop(contact_id, None)
+        if results is None:
+            results = deque(maxlen=self.results_per_contact)
+        results.append(result)
+        self._results[contact_id] = results
+
+        while len(self._results) > self.max_contacts:
+            self._results.popitem(last=False)
+
+    def get_suggestions(self, contact_id: str) -> Dict[str, Any]:
+        """
+        Get the status and latest extraction results for a contact.
+
+        Args:
+            contact_id: The contact to look up
+
+        Returns:
+            Dictionary with the number of unfinished jobs and the latest results (newest first)
+        """
+        pending_jobs = len(self._pending.get(contact_id, ()))
+        if contact_id in self._running:
+            pending_jobs += 1
+
+        return {
+            "contact_id": contact_id,
+            "status": "pending" if pending_jobs else "ready",
+            "pending_jobs": pending_jobs,
+            "results": list(reversed(self._results.get(contact_id, ()))),
+        }
+
+    def stats(self) -> Dict[str, Any]:
+        """Queue depth, throughput counters and job latency."""
+        finished = self._completed + self._failed
+        return {
+            "workers": len([w for w in self._workers if not w.done()]),
+            "queue_depth": self._pending_count,
+            "active_jobs": len(self._running),
+            "contacts_waiting": len(self._scheduled) - len(self._running),
+            "submitted": self._submitted,
+            "completed": self._completed,
+            "failed": self._failed,
+            "rejected": self._rejected,
+            "avg_wait_ms": round(self._total_wait_ms / finished, 1) if finished else 0.0,
+            "avg_run_ms": round(self._total_run_ms / finished, 1) if finished else 0.0,
+            "last_latency_ms": round(self._last_latency_ms, 1),
+            "max_latency_ms": round(self._max_latency_ms, 1),
+        }
+
+
+extraction_queue = ExtractionQueue()
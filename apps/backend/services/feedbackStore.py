@@ -0,0 +1,197 @@
+"""
+Durable feedback log with incrementally maintained aggregates.
+
+Every feedback entry is appended as one JSON line to FEEDBACK_LOG_PATH and
+the log is replayed on startup, so feedback survives restarts. The summary
+statistics are updated on insert instead of being recomputed per request:
+- the total count
+- feedback counts per contact and word frequencies, each with an exactly
+  maintained top list of the FEEDBACK_TOP_MAX largest counts
+- the FEEDBACK_RECENT_MAX most recent entries
+
+Memory is bounded by the number of contacts plus FEEDBACK_MAX_WORDS tracked
+words, however much feedback arrives: once twice that many words are
+tracked, the rarest are dropped (their counts restart if they come back).
+A summary costs O(top_n).
+"""
+import json
+import os
+import re
+import threading
+from collections import deque
+from datetime import datetime
+from typing import Any, Deque, Dict, Hashable, List, Optional, Tuple
+
+from .utils import resolve_data_path
+
+# Relative to apps/backend, whatever the working directory; empty disables the log
+FEEDBACK_LOG_PATH = resolve_data_path(os.getenv("FEEDBACK_LOG_PATH", "feedback.jsonl"))
+FEEDBACK_RECENT_MAX = int(os.getenv("FEEDBACK_RECENT_MAX", "100"))
+FEEDBACK_MAX_WORDS = int(os.getenv("FEEDBACK_MAX_WORDS", "10000"))
+# Largest top_n a summary can return
+FEEDBACK_TOP_MAX = int(os.getenv("FEEDBACK_TOP_MAX", "50"))
+
+_WORD = re.compile(r"\b\w{4,}\b")  # 4+ letter words
+STOPWORDS = frozenset([
+    "this", "that", "with", "have", "from", "your", "just", "like", "about", "would", "could", "should",
+    "doing", "good", "bad", "very", "more", "less", "than", "what", "when", "where", "which", "their",
+    "them", "they", "been", "some", "much", "well", "even", "only", "also", "into", "over", "such",
+    "most", "many", "other", "because", "after", "before", "while", "still", "make", "made", "want",
+    "need", "know", "time", "help", "thanks", "thank",
+])
+
+
+def feedback_words(message: str) -> List[str]:
+    """Words of a feedback message that count towards the common words"""
+    return [w for w in _WORD.findall(message.lower()) if w not in STOPWORDS]
+
+
+class TopCounter:
+    """
+    Counter that keeps its top_size largest keys sorted as counts are incremented.
+
+    Counts only grow by one at a time, so a key can only enter the top list by
+    passing its last entry: keeping the list exact costs O(top_size) per increment.
+    """
+
+    def __init__(self, top_size: int, max_keys: Optional[int] = None):
+        self.top_size = top_size
+        self.max_keys = max_keys
+        self.counts: Dict[Hashable, int] = {}
+        self._top: List[Hashable] = []
+
+    def increment(self, key: Hashable) -> None:
+        count = self.counts.get(key, 0) + 1
+        self.counts[key] = count
+
+        top = self._top
+        if key in top:
+            i = top.index(key)
+        elif len(top) < self.top_size:
+            top.append(key)
+            i = len(top) - 1
+        elif count > self.counts[top[-1]]:
+            top[-1] = key
+            i = len(top) - 1
+        else:
+            i = None
+        # Move the key up past the entries it now outranks
+        while i is not None and i > 0 and self.counts[top[i - 1]] < count:
+            top[i - 1], top[i] = top[i], top[i - 1]
+            i -= 1
+
+        if self.max_keys and len(self.counts) > 2 * self.max_keys:
+            self._prune()
+
+    def _prune(self) -> None:
+        """Keep the max_keys largest counts (always including the top list)."""
+        keep = sorted(self.counts.items(), key=lambda item: item[1], reverse=True)[:self.max_keys]
+        self.counts = dict(keep)
+        self._top = [key for key in self._top if key in self.counts]
+
+    def top(self, n: int) -> List[Tuple[Hashable, int]]:
+        """The n largest counts, largest first"""
+        return [(key, self.counts[key]) for key in self._top[:n]]
+
+
+class FeedbackStore:
+    """Append-only feedback log plus the aggregates behind /feedback/summary."""
+
+    def __init__(self, path: Optional[str] = FEEDBACK_LOG_PATH,
+                 recent_max: int = FEEDBACK_RECENT_MAX,
+                 max_words: int = FEEDBACK_MAX_WORDS,
+                 top_max: int = FEEDBACK_TOP_MAX):
+        self.path = path
+        self.top_max = top_max
+        self._lock = threading.Lock()
+        self._total = 0
+        self._per_contact = TopCounter(top_max)
+        self._words = TopCounter(top_max, max_words)
+        self._recent: Deque[Dict[str, Any]] = deque(maxlen=recent_max)
+        self._log = None
+        if path:
+            self._replay(path)
+            self._log = open(path, "a", encoding="utf-8")
+
+    def _replay(self, path: str) -> None:
+        """Rebuild the aggregates from an existing log."""
+        if not os.path.exists(path):
+            return
+        skipped = 0
+        with open(path, encoding="utf-8") as log:
+            for line in log:
+                try:
+                    entry = json.loads(line)
+                except ValueError:
+                    # e.g. a line cut off by a crash while it was written
+                    skipped += 1
+                    continue
+                if isinstance(entry, dict):
+                    self._apply(entry)
+        if skipped:
+            print(f"Skipped {skipped} unreadable lines in feedback log {path}")
+
+    def _apply(self, entry: Dict[str, Any]) -> None:
+        self._total += 1
+        self._per_contact.increment(str(entry.get("contact_id", "unknown")))
+        message = entry.get("message")
+        if isinstance(message, str):
+            for word in feedback_words(message):
+                self._words.increment(word)
+        self._recent.append(entry)
+
+    def add(self, feedback: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Record a feedback entry.
+
+        Args:
+            feedback: The feedback, e.g. {"type": "like", "message": ..., "contact_id": ...}
+
+        Returns:
+            The stored entry, with its timestamp
+        """
+        entry = {**feedback, "timestamp": datetime.now().isoformat()}
+        line = json.dumps(entry, default=str)
+        with self._lock:
+            if self._log is not None:
+                self._log.write(line + "\n")
+                self._log.flush()
+            self._apply(entry)
+        return entry
+
+    def recent(self, limit: Optional[int] = None) -> List[Dict[str, Any]]:
+        """The most recent entries, newest first"""
+        with self._lock:
+            entries = list(self._recent)
+        entries.reverse()
+        return entries[:limit] if limit is not None else entries
+
+    def summary(self, top_n: int = 5) -> Dict[str, Any]:
+        """
+        Feedback trends for model improvement analysis.
+
+        Args:
+            top_n: Number of contacts, recent entries and words to return (at most top_max)
+
+        Returns:
+            Total count, the contacts with the most feedback, the most recent
+            feedback and the most common words
+        """
+        top_n = max(0, min(top_n, self.top_max))
+        with self._lock:
+            return {
+                "total_feedback": self._total,
+                "contacts_with_feedback": len(self._per_contact.counts),
+                "feedback_per_contact": dict(self._per_contact.top(top_n)),
+                "recent_feedback": [self._recent[-i] for i in range(1, min(top_n, len(self._recent)) + 1)],
+                "common_words": self._words.top(top_n),
+            }
+
+    def close(self) -> None:
+        with self._lock:
+            if self._log is not None:
+                self._log.close()
+                self._log = None
+
+
+feedback_store = FeedbackStore()
@@ -1,65 +1,470 @@
 import os
+import re
 import json
-from typing import Dict, Any
+import asyncio
+from typing import Dict, Any, AsyncIterator, List, Optional
+
+import httpx
 from google import genai
+from google.genai import errors as genai_errors
+from google.genai import types
 
+from .admission import ServiceOverloaded, gemini_admission
+from .contextCache import context_cache
+from .resilience import gemini_breaker, gemini_retry
+from .promptBuilder import CONVERSATION_FIELDS, GREETING_FIELDS, contact_context_builder
 from .promptService import prompt_loader
+from .responseCache import response_cache
 from .utils import clean_json_response
 
+# Limits for outgoing Gemini traffic (per worker process); concurrency is capped in services/admission.py
+GEMINI_MAX_CONNECTIONS = int(os.getenv("GEMINI_MAX_CONNECTIONS", "100"))
+# Deadline of a call, including retries; each attempt gets at most GEMINI_ATTEMPT_TIMEOUT_SECONDS of it
+GEMINI_TIMEOUT_SECONDS = float(os.getenv("GEMINI_TIMEOUT_SECONDS", "30"))
+GEMINI_ATTEMPT_TIMEOUT_SECONDS = float(os.getenv("GEMINI_ATTEMPT_TIMEOUT_SECONDS", "15"))
+# Retry-After for quota errors from the API that don't say when to retry
+GEMINI_QUOTA_RETRY_AFTER_SECONDS = float(os.getenv("GEMINI_QUOTA_RETRY_AFTER_SECONDS", "30"))
+# Alternative API endpoint, e.g. the fake Gemini server used by the load tests
+GEMINI_BASE_URL = os.getenv("GEMINI_BASE_URL") or None
+
+# Structured output for single-call "reply + extraction" chat turns
+_STRING_LIST = {"type": "ARRAY", "items": {"type": "STRING"}}
+COMBINED_RESPONSE_SCHEMA: Dict[str, Any] = {
+    "type": "OBJECT",
+    "properties": {
+        "reply": {"type": "STRING"},
+        "profile": {
+            "type": "OBJECT",
+            "properties": {
+                "nickname": {"type": "STRING"},
+                "birthday": {"type": "STRING"},
+                "interests": _STRING_LIST,
+                "important_dates": {
+                    "type": "ARRAY",
+                    "items": {
+                        "type": "OBJECT",
+                        "properties": {
+                            "date": {"type": "STRING"},
+                            "description": {"type": "STRING"},
+                        },
+                    },
+                },
+                "relationship_type": {"type": "STRING"},
+                "preferences": {
+                    "type": "OBJECT",
+                    "properties": {
+                        "likes": _STRING_LIST,
+                        "dislikes": _STRING_LIST,
+                    },
+                },
+                "family_details": {"type": "STRING"},
+                "personality": {"type": "STRING"},
+                "last_connection": {"type": "STRING"},
+                "conversation_topics": _STRING_LIST,
+            },
+        },
+    },
+    "required": ["reply"],
+}
+
+# One Gemini client (and therefore one pooled HTTP client) shared by every GeminiClient
+_shared_client: Optional[genai.Client] = None
+# Cacheable calls in progress by cache key, so identical concurrent calls share one request.
+# Each runs in its own task, so a caller that is cancelled doesn't cancel it for the others.
+_inflight_calls: Dict[str, asyncio.Task] = {}
+
+
+def get_shared_client(api_key: str) -> genai.Client:
+    """
+    Get the process-wide Gemini client, creating it on first use.
+    
+    Args:
+        api_key: The Gemini API key
+        
+    Returns:
+        The shared genai.Client instance
+    """
+    global _shared_client
+    if _shared_client is None:
+        _shared_client = genai.Client(
+            api_key=api_key,
+            http_options=types.HttpOptions(
+                base_url=GEMINI_BASE_URL,
+                timeout=int(GEMINI_ATTEMPT_TIMEOUT_SECONDS * 1000),
+                async_client_args={
+                    "limits": httpx.Limits(
+                        max_connections=GEMINI_MAX_CONNECTIONS,
+                        max_keepalive_connections=GEMINI_MAX_CONNECTIONS,
+                    )
+                },
+            ),
+        )
+    return _shared_client
+
+
+_RETRY_DELAY = re.compile(r"retryDelay['\"]?\s*:\s*['\"]?(\d+(?:\.\d+)?)s")
+
+
+def quota_error(e: Exception) -> Optional[ServiceOverloaded]:
+    """
+    Translate a quota error (HTTP 429) from the Gemini API into ServiceOverloaded.
+    
+    Returns:
+        The ServiceOverloaded to raise, or None if e is not a quota error
+    """
+    if not isinstance(e, genai_errors.APIError) or e.code != 429:
+        return None
+    match = _RETRY_DELAY.search(str(e))
+    retry_after = float(match.group(1)) if match else GEMINI_QUOTA_RETRY_AFTER_SECONDS
+    return ServiceOverloaded("The AI model is over its quota, try again later", retry_after)
+
+
+# Status codes of transient API failures
+RETRYABLE_STATUS_CODES = frozenset([408, 500, 502, 503, 504])
+
+
+def is_retryable(e: BaseException) -> bool:
+    """Whether an error is a transient upstream failure: a timeout, a connection error or a 5xx"""
+    if isinstance(e, genai_errors.APIError):
+        return e.code in RETRYABLE_STATUS_CODES
+    return isinstance(e, (asyncio.TimeoutError, httpx.TransportError))
+
+
 class GeminiClient:
     """A client for interacting with the Gemini API."""
     
-    def __init__(self):
+    def __init__(self, timeout: Optional[float] = None):
         self.api_key = os.getenv("GEMINI_API_KEY")
         if not self.api_key:
             print("WARNING: GEMINI_API_KEY not available. GeminiClient may not function correctly.")
             self.client = None
         else:
-            self.client = genai.Client(api_key=self.api_key)
+            self.client = get_shared_client(self.api_key)
         
         self.model = "gemini-2.0-flash"
+        self.timeout = timeout if timeout is not None else GEMINI_TIMEOUT_SECONDS
     
     def is_available(self) -> bool:
         return self.client is not None
     
-    async def generate_content(self, prompt: str ) -> str:
+    def _static_prefix(self, prefix: str) -> str:
+        """
+        Build the static start of a prompt: the system prompt plus the templates of the call type.
+        
+        Prefixes only contain template text, so they are identical for every contact and can be
+        cached server-side (see services/contextCache.py).
+        
+        Args:
+            prefix: "system", "greeting", "chat", "extraction", "combined" or "summary"
+            
+        Returns:
+            The prefix text
+        """
+        system_prompt = prompt_loader.load_prompt("system_prompt")
+        if not system_prompt:
+            print("WARNING: system_prompt.md template not found. Using default system prompt.")
+            system_prompt = "You are a helpful assistant for enriching contact relationships."
+        
+        parts = [system_prompt]
+        if prefix == "greeting":
+            parts.append(prompt_loader.load_prompt("initial_greeting") or "")
+        if prefix in ("chat", "combined"):
+            parts.append(self._build_chat_instructions())
+        if prefix in ("extraction", "combined"):
+            parts.append(self._load_extraction_instructions() or "")
+        if prefix == "combined":
+            parts.append(prompt_loader.load_prompt("combined_response") or "")
+        if prefix == "summary":
+            parts.append(prompt_loader.load_prompt("profile_summary") or "")
+        
+        return "\n\n".join(part for part in parts if part)
+    
+    async def generate_content(self, prompt: str, timeout: Optional[float] = None,
+                               response_schema: Optional[Dict[str, Any]] = None,
+                               cache_type: Optional[str] = None,
+                               cache_version: Optional[str] = None,
+                               prefix: str = "system", with_status: bool = False):
+        """
+        Generate a response for the prompt without blocking the event loop.
+        
+        Args:
+            prompt: The variable part of the prompt, sent after the static prefix
+            timeout: Optional deadline of the call in seconds, retries included; defaults to self.timeout
+            response_schema: Optional schema; when set the model returns JSON matching it
+            cache_type: Optional call type ("greeting", "extraction"); successful responses
+                are cached with that type's TTL (see services/responseCache.py)
+            cache_version: Optional version of the data behind the prompt, part of the cache key
+            prefix: Name of the static prompt prefix (see _static_prefix)
+            with_status: Also return whether the model answered (False with an error message)
+            
+        Returns:
+            The generated text, or an error message if the call failed; with with_status,
+            a (text, succeeded) tuple
+            
+        Raises:
+            ServiceOverloaded: If the call was shed, the API is over its quota or the
+                circuit breaker is open (CircuitOpen)
+        """
         if not self.client:
             print("ERROR: Gemini client not initialized. Please set GEMINI_API_KEY.")
-            return "Error: AI model not available."
+            text = "Error: AI model not available."
+            return (text, False) if with_status else text
         
-        try:            
-            # Load system prompt from markdown file
-            system_prompt = prompt_loader.load_prompt("system_prompt")
-            if not system_prompt:
-                print("WARNING: system_prompt.md template not found. Using default system prompt.")
-                system_prompt = "You are a helpful assistant for enriching contact relationships."
-
-            # Include system prompt as part of the user prompt
-            full_prompt = f"{system_prompt}\n\n{prompt}"
-            response = self.client.models.generate_content(
-            model=self.model,
-            contents=[full_prompt])
+        prefix_text = self._static_prefix(prefix)
+        if not response_cache.enabled(cache_type):
+            return await self._call_model(prefix, prefix_text, prompt, timeout, response_schema,
+                                          with_status=with_status)
+        
+        cache_key = response_cache.make_key(cache_type, self.model, f"{prefix_text}\n\n{prompt}",
+                                            version=cache_version, extra=response_schema)
+        cached = response_cache.get(cache_type, cache_key)
+        if cached is not None:
+            return (cached, True) if with_status else cached
         
+        # Identical calls already in progress (e.g. a chat opened twice) share one request
+        inflight = _inflight_calls.get(cache_key)
+        if inflight is None:
+            inflight = asyncio.create_task(self._call_model(prefix, prefix_text, prompt, timeout, response_schema,
+                                                            with_status=True))
+            _inflight_calls[cache_key] = inflight
+            inflight.add_done_callback(lambda task: self._finish_inflight(cache_type, cache_key, task))
+        text, ok = await asyncio.shield(inflight)
+        return (text, ok) if with_status else text
+    
+    @staticmethod
+    def _finish_inflight(cache_type: str, cache_key: str, task: asyncio.Task) -> None:
+        """Cache the result of a shared call once it is done, and stop sharing it"""
+        _inflight_calls.pop(cache_key, None)
+        # Retrieve the exception even if every caller went away
+        if task.cancelled() or task.exception() is not None:
+            return
+        text, ok = task.result()
+        # Only successful responses are cached
+        if ok and text:
+            response_cache.set(cache_type, cache_key, text)
+    
+    async def _prepare_request(self, prefix: str, prefix_text: str, prompt: str,
+                               timeout: float, response_schema: Optional[Dict[str, Any]] = None,
+                               use_context_cache: bool = True):
+        """
+        Build the contents and config of a request, referencing the cached prefix when there is one.
+        
+        Returns:
+            Tuple of (contents, config, cache handle or None)
+        """
+        handle = None
+        if use_context_cache:
+            handle = await context_cache.get_handle(self.client, self.model, prefix, prefix_text)
+        config = types.GenerateContentConfig(
+            http_options=types.HttpOptions(timeout=int(min(timeout, GEMINI_ATTEMPT_TIMEOUT_SECONDS) * 1000)),
+            response_mime_type="application/json" if response_schema else None,
+            response_schema=response_schema,
+            cached_content=handle,
+        )
+        contents = [prompt] if handle else [f"{prefix_text}\n\n{prompt}"]
+        return contents, config, handle
+    
+    async def _send(self, contents: List[str], config: types.GenerateContentConfig, deadline: float):
+        """
+        Send a request, retrying transient failures with backoff until the deadline
+        (see services/resilience.py).
+        
+        Args:
+            contents: The request contents
+            config: The request config
+            deadline: Event loop time by which the call must have finished
+        """
+        loop = asyncio.get_running_loop()
+        attempt = 0
+        while True:
+            probe = gemini_breaker.allow()
+            succeeded = None
+            try:
+                # Use the async API so the event loop keeps serving other requests
+                async with gemini_admission.slot():
+                    response = await asyncio.wait_for(
+                        self.client.aio.models.generate_content(model=self.model, contents=contents, config=config),
+                        timeout=max(min(GEMINI_ATTEMPT_TIMEOUT_SECONDS, deadline - loop.time()), 0))
+                succeeded = True
+                if attempt:
+                    gemini_retry.record_recovery()
+                return response
+            except Exception as e:
+                overloaded = quota_error(e)
+                if overloaded:
+                    raise overloaded from e
+                if not is_retryable(e):
+                    raise
+                succeeded = False
+                delay = gemini_retry.next_delay(attempt, deadline - loop.time())
+                if delay is None:
+                    raise
+                print(f"Gemini call failed ({type(e).__name__}: {e}), retrying in {delay:.2f}s")
+            finally:
+                gemini_breaker.record(succeeded, probe)
+            attempt += 1
+            await asyncio.sleep(delay)
+    
+    async def _call_model(self, prefix: str, prefix_text: str, prompt: str,
+                          timeout: Optional[float] = None,
+                          response_schema: Optional[Dict[str, Any]] = None, with_status: bool = False):
+        """
+        Send a prompt to the model, with its static prefix cached server-side when possible.
+        
+        Returns:
+            The generated text or an error message; with with_status, a (text, succeeded) tuple
+        """
+        call_timeout = timeout if timeout is not None else self.timeout
+        deadline = asyncio.get_running_loop().time() + call_timeout
+        
+        try:
+            contents, config, handle = await self._prepare_request(
+                prefix, prefix_text, prompt, call_timeout, response_schema)
+            try:
+                response = await self._send(contents, config, deadline)
+            except Exception as e:
+                if handle is None or isinstance(e, ServiceOverloaded) or is_retryable(e):
+                    raise
+                # The cached prefix may be gone (deleted or expired early): resend it inline once
+                print(f"Gemini call with cached prefix '{prefix}' failed, retrying inline: {e}")
+                context_cache.invalidate(self.model, prefix)
+                contents, config, _ = await self._prepare_request(
+                    prefix, prefix_text, prompt, call_timeout, response_schema, use_context_cache=False)
+                response = await self._send(contents, config, deadline)
+            
             # Extract text from the response
-            return response.text
+            text, ok = response.text, True
             
+        except ServiceOverloaded:
+            # Shed, over quota or failing fast: the caller answers with 429 or 503
+            raise
         except Exception as e:
             print(f"Error calling Gemini API: {e}")
-            return f"Sorry, I encountered an error trying to reach the AI: {e}"
+            text, ok = f"Sorry, I encountered an error trying to reach the AI: {e}", False
+        
+        return (text, ok) if with_status else text
     
-    async def extract_profile_data(self, message: str) -> Dict[str, Any]:
+    async def generate_content_stream(self, prompt: str, timeout: Optional[float] = None,
+                                      cache_type: Optional[str] = None,
+                                      cache_version: Optional[str] = None,
+                                      prefix: str = "system", raise_errors: bool = False) -> AsyncIterator[str]:
         """
-        Analyzes a message to extract structured data that could update a profile.
+        Stream a response for the prompt as text chunks using the model's streaming API.
         
         Args:
-            message: The message to analyze
+            prompt: The variable part of the prompt, sent after the static prefix
+            timeout: Optional timeout in seconds for the whole stream, defaults to self.timeout;
+                transient failures before the first chunk are retried within it
+            cache_type: Optional call type; a cached response is yielded as a single chunk,
+                and a completed stream is cached (see generate_content)
+            cache_version: Optional version of the data behind the prompt, part of the cache key
+            prefix: Name of the static prompt prefix (see _static_prefix)
+            raise_errors: Raise a failed call's error instead of yielding an error message
             
-        Returns:
-            Dictionary containing extracted profile data
+        Yields:
+            Text chunks as they arrive, or a single error message if the call failed
+            
+        Raises:
+            ServiceOverloaded: If the call was shed, the API is over its quota or the
+                circuit breaker is open (CircuitOpen)
+            RuntimeError: With raise_errors, if the client isn't initialized
+            Exception: With raise_errors, the error of a failed call
         """
-        if not self.is_available() or not message:
-            return {}
+        if not self.client:
+            print("ERROR: Gemini client not initialized. Please set GEMINI_API_KEY.")
+            if raise_errors:
+                raise RuntimeError("AI model not available")
+            yield "Error: AI model not available."
+            return
+        
+        prefix_text = self._static_prefix(prefix)
+        cache_key = None
+        if response_cache.enabled(cache_type):
+            cache_key = response_cache.make_key(cache_type, self.model, f"{prefix_text}\n\n{prompt}",
+                                                version=cache_version)
+            cached = response_cache.get(cache_type, cache_key)
+            if cached is not None:
+                yield cached
+                return
+        
+        call_timeout = timeout if timeout is not None else self.timeout
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + call_timeout
+        chunks: List[str] = []
+        use_context_cache = True
+        attempt = 0
+        
+        while True:
+            handle = None
+            probe = gemini_breaker.allow()
+            succeeded = None
+            delay = 0.0
+            try:
+                contents, config, handle = await self._prepare_request(
+                    prefix, prefix_text, prompt, call_timeout, use_context_cache=use_context_cache)
+                async with gemini_admission.slot():
+                    stream = await asyncio.wait_for(
+                        self.client.aio.models.generate_content_stream(
+                            model=self.model, contents=contents, config=config),
+                        timeout=max(deadline - loop.time(), 0))
+                    
+                    while True:
+                        try:
+                            chunk = await asyncio.wait_for(stream.__anext__(), timeout=max(deadline - loop.time(), 0))
+                        except StopAsyncIteration:
+                            break
+                        if chunk.text:
+                            chunks.append(chunk.text)
+                            yield chunk.text
+                succeeded = True
+                if attempt:
+                    gemini_retry.record_recovery()
+                break
+            
+            except ServiceOverloaded:
+                raise
+            except Exception as e:
+                overloaded = quota_error(e)
+                if overloaded:
+                    raise overloaded from e
+                retry_delay = None
+                if is_retryable(e):
+                    succeeded = False
+                    # Only retried while nothing was yielded yet
+                    if not chunks:
+                        retry_delay = gemini_retry.next_delay(attempt, deadline - loop.time())
+                        if retry_delay is not None:
+                            print(f"Gemini stream failed ({type(e).__name__}: {e}), retrying in {retry_delay:.2f}s")
+                elif handle is not None and not chunks:
+                    # The cached prefix may be gone: resend it inline once, nothing was yielded yet
+                    print(f"Gemini stream with cached prefix '{prefix}' failed, retrying inline: {e}")
+                    context_cache.invalidate(self.model, prefix)
+                    use_context_cache = False
+                    retry_delay = 0.0
+                if retry_delay is None:
+                    print(f"Error streaming from Gemini API: {e}")
+                    if raise_errors:
+                        raise
+                    yield f"Sorry, I encountered an error trying to reach the AI: {e}"
+                    return
+                delay = retry_delay
+            finally:
+                gemini_breaker.record(succeeded, probe)
+            if succeeded is False:
+                attempt += 1
+            await asyncio.sleep(delay)
         
+        # Only complete streams are cached
+        if cache_key and chunks:
+            response_cache.set(cache_type, cache_key, "".join(chunks))
+    
+    def _load_extraction_instructions(self) -> Optional[str]:
+        """
+        Load and join the prompt templates used for profile extraction.
+        
+        Returns:
+            The combined extraction instructions, or None if a template is missing
+        """
         # Load prompt templates from markdown files
         profile_extraction_prompt = prompt_loader.load_prompt("profile_extraction")
         extraction_rules_prompt = prompt_loader.load_prompt("extraction_rules")
@@ -77,19 +482,39 @@ class GeminiClient:
         
         if missing_templates:
             print(f"Error: Required prompt templates not found: {', '.join(missing_templates)}.")
-            return {}
+            return None
         
-        # Create a prompt that asks the model to extract structured data from the message
-        extraction_prompt = (
+        return (
             f"{profile_extraction_prompt}\n\n"
             f"{extraction_rules_prompt}\n\n"
-            f"{json_format_prompt}\n\n"
-            f"Message: '{message}'"
+            f"{json_format_prompt}"
         )
+    
+    async def extract_profile_data(self, message: str, with_status: bool = False):
+        """
+        Analyzes a message to extract structured data that could update a profile.
+        
+        Args:
+            message: The message to analyze
+            with_status: Also return whether the model answered with valid JSON
+            
+        Returns:
+            Dictionary containing extracted profile data; with with_status, a (data, succeeded) tuple
+            
+        Raises:
+            ServiceOverloaded: If the call was shed, the API is over its quota or the
+                circuit breaker is open
+        """
+        if not self.is_available() or not message or not self._load_extraction_instructions():
+            return ({}, False) if with_status else {}
         
         try:
-            # Call Gemini API to extract structured data
-            response = await self.generate_content(extraction_prompt)
+            # Call Gemini API to extract structured data; the instructions are the static prefix
+            response, ok = await self.generate_content(f"Message: '{message}'", prefix="extraction",
+                                                       cache_type="extraction", with_status=True)
+            if not ok:
+                # An error message, not an answer: not the same as "nothing to extract"
+                return ({}, False) if with_status else {}
             
             # Process and clean the response text
             extracted_text = clean_json_response(response)
@@ -101,43 +526,61 @@ class GeminiClient:
             except json.JSONDecodeError as json_err:
                 print(f"JSON parsing error: {json_err}")
                 print(f"Raw JSON text: {extracted_text}")
-                return {}
+                return ({}, False) if with_status else {}
             
-            return extracted_data
+            return (extracted_data, True) if with_status else extracted_data
+        except ServiceOverloaded:
+            raise
         except Exception as e:
             print(f"Error extracting profile data: {e}")
-            return {}
+            return ({}, False) if with_status else {}
     
-    async def get_initial_greeting(self, contact_data: Dict, profile_completeness: int) -> str:
+    async def summarize_profile_text(self, text: str, max_chars: int) -> Optional[str]:
         """
-        Provides an initial greeting focused on building the contact's profile.
+        Condense a contact's personality notes.
         
         Args:
-            contact_data: Dictionary containing contact data
-            profile_completeness: Integer representing profile completeness percentage
+            text: The notes to summarize
+            max_chars: Length the summary should stay within
             
         Returns:
-            Greeting text response
+            The summary, or None if the call failed or the result is unusable
         """
-        # Load the initial greeting template
-        greeting_template = prompt_loader.load_prompt("initial_greeting")
+        if not self.is_available() or not text:
+            return None
         
-        # Start with contact's name and basic context
-        context_parts = [
-            f"You're helping with {contact_data.get('name', 'this person')}."
-        ]
+        prompt = f"Character limit: {max_chars}\n\nNotes:\n{text}"
+        summary, ok = await self._call_model("summary", self._static_prefix("summary"), prompt, with_status=True)
+        summary = (summary or "").strip()
+        if not ok or not summary or len(summary) >= len(text):
+            return None
+        return summary
+    
+    @staticmethod
+    def _contact_version(contact_data: Dict) -> Optional[str]:
+        """Version of a contact for cache keys: its id and updated_at timestamp"""
+        if not contact_data.get("updated_at"):
+            return None
+        return f"{contact_data.get('id')}@{contact_data['updated_at']}"
+    
+    def _build_greeting_prompt(self, contact_data: Dict, profile_completeness: int) -> str:
+        """
+        Builds the contact-specific part of the initial greeting prompt. The greeting
+        template itself is part of the static "greeting" prefix.
         
-        # Add contact details when available
-        fields_to_check = {
-            "interests": "Known interests: {0}",
-            "family_details": "Family details: {0}",
-            "personality": "Personality: {0}",
-        }
-
-        for field, format_str in fields_to_check.items():
-            if value := contact_data.get(field):
-                formatted_value = ", ".join(value) if isinstance(value, list) else value
-                context_parts.append(format_str.format(formatted_value))
+        Args:
+            contact_data: Dictionary containing contact data
+            profile_completeness: Integer representing profile completeness percentage
+            
+        Returns:
+            The greeting prompt without the template
+        """
+        # Contact's name and the details that fit into the context token budget
+        context_parts = contact_context_builder.build(
+            contact_data,
+            header=f"You're helping with {contact_data.get('name', 'this person')}.",
+            field_names=GREETING_FIELDS,
+        )
         
         # Add profile completeness context
         if profile_completeness < 50:
@@ -145,24 +588,71 @@ class GeminiClient:
         else:
             context_parts.append(f"This contact's profile is {profile_completeness}% complete.")
         
-        # Combine the template with context parts
-        prompt = f"{greeting_template}\n\n" + "\n".join(context_parts)
-        greeting_text = await self.generate_content(prompt)
+        return "\n".join(context_parts)
+    
+    async def get_initial_greeting(self, contact_data: Dict, profile_completeness: int,
+                                   with_status: bool = False):
+        """
+        Provides an initial greeting focused on building the contact's profile.
         
-        return greeting_text
+        Args:
+            contact_data: Dictionary containing contact data
+            profile_completeness: Integer representing profile completeness percentage
+            with_status: Also return whether the model answered
+            
+        Returns:
+            Greeting text response (an error message if the call failed); with with_status,
+            a (text, succeeded) tuple
+        """
+        prompt = self._build_greeting_prompt(contact_data, profile_completeness)
+        # Cached per contact version: repeat chat opens reuse the greeting until the contact changes
+        return await self.generate_content(prompt, prefix="greeting", cache_type="greeting",
+                                           cache_version=self._contact_version(contact_data),
+                                           with_status=with_status)
+    
+    def stream_initial_greeting(self, contact_data: Dict, profile_completeness: int) -> AsyncIterator[str]:
+        """
+        Streams an initial greeting as text chunks.
         
-    async def handle_conversation(self, contact_data: Dict, user_message: str) -> str:
+        Args:
+            contact_data: Dictionary containing contact data
+            profile_completeness: Integer representing profile completeness percentage
+            
+        Returns:
+            Async iterator of greeting text chunks; a failed call raises its error
+            instead of yielding an error message, so callers can fall back
         """
-        Handles a conversation message, creating an appropriate response based on contact data.
+        return self.generate_content_stream(self._build_greeting_prompt(contact_data, profile_completeness),
+                                            prefix="greeting", cache_type="greeting",
+                                            cache_version=self._contact_version(contact_data),
+                                            raise_errors=True)
+        
+    def _build_contact_context(self, contact_data: Dict, user_message: Optional[str] = None) -> List[str]:
+        """
+        Build the contact-specific context lines shared by conversation prompts, within
+        the context token budget (see services/promptBuilder.py).
         
         Args:
             contact_data: Dictionary containing contact data
-            user_message: The message from the user
+            user_message: Optional user message; the details it mentions are kept first
             
         Returns:
-            The bot's response
+            List of prompt lines describing the contact
+        """
+        return contact_context_builder.build(
+            contact_data,
+            header=f"You are currently helping with a contact named {contact_data.get('name', 'this person')}.",
+            field_names=CONVERSATION_FIELDS,
+            message=user_message,
+        )
+    
+    def _build_chat_instructions(self) -> str:
+        """
+        Load the chat instructions shared by every conversation turn (part of the "chat" prefix).
+        
+        Returns:
+            The base and assistant instructions
         """
-        # Construct the prompt for Gemini focused on contact profile building
         prompt_parts = []
         
         # Load base chat instructions
@@ -173,29 +663,6 @@ class GeminiClient:
             print("Warning: chat_base_instructions.md template not found.")
             prompt_parts.append("You are a helpful assistant for enriching contact relationships. You keep responses brief and conversational.")
         
-        prompt_parts.append(f"You are currently helping with a contact named {contact_data.get('name', 'this person')}.")
-        
-        # Add context from relevant contact fields
-        if contact_data.get('interests'):
-            prompt_parts.append(f"Known interests: {', '.join(contact_data.get('interests'))}")
-        if contact_data.get('conversation_topics'):
-            prompt_parts.append(f"Previous conversation topics: {', '.join(contact_data.get('conversation_topics'))}")
-        if contact_data.get('important_dates'):
-            dates = [f"{d.get('description')}: {d.get('date')}" for d in contact_data.get('important_dates')]
-            prompt_parts.append(f"Important dates: {', '.join(dates)}")
-        if contact_data.get('last_connection'):
-            prompt_parts.append(f"Last connection: {contact_data.get('last_connection')}")
-        if contact_data.get('relationship_type'):
-            prompt_parts.append(f"Relationship type: {contact_data.get('relationship_type')}")
-        if contact_data.get('preferences') and contact_data.get('preferences').get('likes'):
-            prompt_parts.append(f"Likes: {', '.join(contact_data.get('preferences').get('likes'))}")
-        if contact_data.get('preferences') and contact_data.get('preferences').get('dislikes'):
-            prompt_parts.append(f"Dislikes: {', '.join(contact_data.get('preferences').get('dislikes'))}")
-        if contact_data.get('family_details'):
-            prompt_parts.append(f"Family details: {contact_data.get('family_details')}")
-        if contact_data.get('personality'):
-            prompt_parts.append(f"Personality: {contact_data.get('personality')}")
-        
         # Load and add assistant instructions from markdown file
         assistant_instructions = prompt_loader.load_prompt("assistant_instructions")
         if assistant_instructions:
@@ -203,13 +670,98 @@ class GeminiClient:
         else:
             print("Warning: assistant_instructions.md not found")
         
-        prompt_parts.append(f"The user's message is: '{user_message}'")
+        return "\n".join(prompt_parts)
+    
+    def _build_conversation_prompt(self, contact_data: Dict, user_message: str) -> str:
+        """
+        Build the per-turn part of a conversation prompt: the contact context and the user message.
+        The instructions are sent as the static "chat" or "combined" prefix.
         
-        # Final prompt assembly
-        full_prompt = "\n".join(prompt_parts)
+        Args:
+            contact_data: Dictionary containing contact data
+            user_message: The message from the user
+            
+        Returns:
+            The prompt tail
+        """
+        prompt_parts = self._build_contact_context(contact_data, user_message)
+        prompt_parts.append(f"The user's message is: '{user_message}'")
+        return "\n".join(prompt_parts)
+    
+    async def handle_conversation(self, contact_data: Dict, user_message: str, with_status: bool = False):
+        """
+        Handles a conversation message, creating an appropriate response based on contact data.
         
+        Args:
+            contact_data: Dictionary containing contact data
+            user_message: The message from the user
+            with_status: Also return whether the model answered
+            
+        Returns:
+            The bot's response (an error message if the call failed); with with_status,
+            a (text, succeeded) tuple
+        """
         # Call the API with our contact-focused prompt
-        return await self.generate_content(prompt=full_prompt)
+        return await self.generate_content(prompt=self._build_conversation_prompt(contact_data, user_message),
+                                           prefix="chat", with_status=with_status)
+    
+    def stream_conversation(self, contact_data: Dict, user_message: str) -> AsyncIterator[str]:
+        """
+        Streams the response to a conversation message as text chunks.
+        
+        Args:
+            contact_data: Dictionary containing contact data
+            user_message: The message from the user
+            
+        Returns:
+            Async iterator of response text chunks
+        """
+        return self.generate_content_stream(prompt=self._build_conversation_prompt(contact_data, user_message),
+                                            prefix="chat")
+    
+    async def handle_conversation_with_extraction(self, contact_data: Dict, user_message: str) -> Dict[str, Any]:
+        """
+        Produces the conversational reply and the extracted profile data with a single
+        structured-output request instead of two separate calls.
+        
+        Args:
+            contact_data: Dictionary containing contact data
+            user_message: The message from the user
+            
+        Returns:
+            Dictionary with "reply" (the bot's response), "profile" (extracted profile data)
+            and "structured" (whether the model answered with the structured format); if the
+            call failed, the error message as the reply
+            
+        Raises:
+            ValueError: If the model answered, but not with a JSON object holding a reply
+        """
+        prefix = "combined"
+        if not (self._load_extraction_instructions() and prompt_loader.load_prompt("combined_response")):
+            print("Warning: extraction templates not found. Combined response will not include profile data.")
+            prefix = "chat"
+        
+        response, ok = await self.generate_content(
+            prompt=self._build_conversation_prompt(contact_data, user_message),
+            prefix=prefix, response_schema=COMBINED_RESPONSE_SCHEMA, with_status=True)
+        if not ok:
+            # An error message: use it as the reply
+            return {"reply": response, "profile": {}, "structured": False}
+        
+        try:
+            combined = json.loads(clean_json_response(response))
+        except json.JSONDecodeError as json_err:
+            raise ValueError(f"combined response is not JSON: {json_err}") from json_err
+        
+        if not isinstance(combined, dict) or not isinstance(combined.get("reply"), str) or not combined["reply"]:
+            raise ValueError(f"combined response has no reply: {type(combined).__name__}")
+        
+        profile = combined.get("profile")
+        return {
+            "reply": combined["reply"],
+            "profile": profile if isinstance(profile, dict) else {},
+            "structured": prefix == "combined"
+        }
         
     def _create_template_if_missing(self, template_name: str, template_content: str) -> bool:
         """
@@ -0,0 +1,200 @@
+"""
+Locally rendered greetings for when the model is slow or unavailable.
+
+With GREETING_DEADLINE_SECONDS set, opening a chat waits at most that long
+for the model's greeting. If it hasn't answered by then, a greeting is
+rendered from the contact's fields and the templates in
+prompts/greeting_templates.md, while the model call finishes in the
+background and its greeting is cached for the next open (see
+services/responseCache.py). The same templates replace the generic
+greeting when the model call fails or is shed.
+
+Templates are picked per contact, so a contact gets the same fallback
+greeting on every open until its details change. For incomplete profiles a
+question about the first missing detail is added, as the model's greeting
+would ask one.
+"""
+import os
+import re
+import zlib
+from datetime import date, datetime, timedelta
+from typing import Any, Dict, List, Optional
+
+from .promptService import prompt_loader
+
+# 0 waits for the model as long as it takes
+GREETING_DEADLINE_SECONDS = float(os.getenv("GREETING_DEADLINE_SECONDS", "0"))
+# Important dates and birthdays this many days ahead are mentioned
+GREETING_UPCOMING_DAYS = int(os.getenv("GREETING_UPCOMING_DAYS", "30"))
+
+DEFAULT_GREETING = "Hello! I'm here to help you keep in touch with your contacts."
+
+_SECTION = re.compile(r"^##\s+(.+?)\s*$", re.MULTILINE)
+
+# Question sections and the contact fields whose absence they ask about
+QUESTION_SECTIONS = {
+    "ask about interests": ("interests",),
+    "ask about dates": ("birthday", "important_dates"),
+    "ask about relationship": ("relationship_type",),
+}
+
+
+def parse_templates(text: Optional[str]) -> Dict[str, List[str]]:
+    """Templates per section: the "- " bullet lines under each "## " heading, keyed by lower-case heading"""
+    sections: Dict[str, List[str]] = {}
+    if not text:
+        return sections
+    parts = _SECTION.split(text)
+    # parts: [preamble, heading, body, heading, body, ...]
+    for heading, body in zip(parts[1::2], parts[2::2]):
+        templates = [line.strip()[2:].strip() for line in body.splitlines() if line.strip().startswith("- ")]
+        if templates:
+            sections[heading.lower()] = templates
+    return sections
+
+
+def _first(values: Any) -> Optional[str]:
+    if isinstance(values, list):
+        values = next((v for v in values if isinstance(v, str) and v.strip()), None)
+    return values.strip() if isinstance(values, str) and values.strip() else None
+
+
+def _next_occurrence(value: Any, today: date) -> Optional[date]:
+    """Next anniversary of a stored date, today included"""
+    try:
+        stored = value if isinstance(value, date) else datetime.strptime(str(value)[:10], "%Y-%m-%d").date()
+    except ValueError:
+        return None
+    for year in (today.year, today.year + 1):
+        try:
+            candidate = stored.replace(year=year)
+        except ValueError:
+            # February 29th outside a leap year
+            candidate = date(year, 3, 1)
+        if candidate >= today:
+            return candidate
+    return None
+
+
+class GreetingFallback:
+    """Renders template greetings and counts how greetings were served."""
+
+    def __init__(self, deadline_seconds: float = GREETING_DEADLINE_SECONDS,
+                 upcoming_days: int = GREETING_UPCOMING_DAYS):
+        self.deadline_seconds = deadline_seconds
+        self.upcoming_days = upcoming_days
+        self._templates: Optional[Dict[str, List[str]]] = None
+
+        # Counters for observability
+        self._served = {"model": 0, "template": 0}
+        self._reasons: Dict[str, int] = {}
+
+    @property
+    def enabled(self) -> bool:
+        return self.deadline_seconds > 0
+
+    def templates(self) -> Dict[str, List[str]]:
+        if self._templates is None:
+            self._templates = parse_templates(prompt_loader.load_prompt("greeting_templates"))
+            if not self._templates:
+                print("Warning: greeting_templates.md not found or empty. Using the default greeting.")
+        return self._templates
+
+    def _upcoming(self, contact: Dict, today: date) -> Optional[Dict[str, str]]:
+        """The soonest birthday or important date within upcoming_days"""
+        dates = [(contact.get("birthday"), "birthday")]
+        for entry in contact.get("important_dates") or []:
+            if isinstance(entry, dict) and entry.get("description"):
+                dates.append((entry.get("date"), str(entry["description"])))
+        upcoming = []
+        for value, occasion in dates:
+            when = _next_occurrence(value, today) if value else None
+            if when and when - today <= timedelta(days=self.upcoming_days):
+                upcoming.append((when, occasion))
+        if not upcoming:
+            return None
+        when, occasion = min(upcoming)
+        return {"occasion": occasion[:1].lower() + occasion[1:], "date": f"{when:%B} {when.day}"}
+
+    def _fields(self, section: str, contact: Dict, today: date) -> Optional[Dict[str, str]]:
+        """Placeholder values for a section, or None if the contact lacks the details"""
+        if section == "upcoming date":
+            return self._upcoming(contact, today)
+        if section == "interests":
+            interest = _first(contact.get("interests"))
+            return {"interest": interest} if interest else None
+        if section == "conversation topics":
+            topic = _first(contact.get("conversation_topics"))
+            return {"topic": topic} if topic else None
+        if section == "family":
+            return {} if _first(contact.get("family_details")) else None
+        if section == "no details":
+            return {}
+        return None
+
+    def _question(self, contact: Dict, templates: Dict[str, List[str]], pick: int, name: str) -> Optional[str]:
+        """A question about the first detail the contact is missing"""
+        for section, fields in QUESTION_SECTIONS.items():
+            options = templates.get(section)
+            if options and not any(contact.get(field) for field in fields):
+                return options[pick % len(options)].format(name=name)
+        return None
+
+    def render(self, contact: Dict, profile_completeness: int, reason: str,
+               today: Optional[date] = None) -> str:
+        """
+        Render a greeting for a contact without the model.
+
+        Args:
+            contact: The contact
+            profile_completeness: Profile completeness percentage; below 50 a question
+                that helps fill in the profile is added
+            reason: Why the model's greeting isn't used ("deadline", "error", ...), for the stats
+            today: Date to count upcoming dates from, defaults to today
+
+        Returns:
+            The greeting text
+        """
+        self._served["template"] += 1
+        self._reasons[reason] = self._reasons.get(reason, 0) + 1
+
+        templates = self.templates()
+        today = today or date.today()
+        name = _first(contact.get("nickname")) or _first(contact.get("name")) or "this contact"
+        # Stable per contact, so repeated opens show the same greeting
+        pick = zlib.crc32(str(contact.get("id") or name).encode("utf-8"))
+
+        parts = []
+        for section, options in templates.items():
+            fields = self._fields(section, contact, today)
+            if fields is None:
+                continue
+            try:
+                parts = [options[pick % len(options)].format(name=name, **fields)]
+                question = None
+                if section != "no details" and profile_completeness < 50:
+                    question = self._question(contact, templates, pick, name)
+                if question:
+                    parts.append(question)
+            except (KeyError, IndexError):
+                print(f"Warning: greeting template in section '{section}' has unknown placeholders")
+                parts = []
+                continue
+            break
+
+        return " ".join(parts) or DEFAULT_GREETING
+
+    def record_model(self) -> None:
+        """Count a greeting the model produced in time"""
+        self._served["model"] += 1
+
+    def stats(self) -> Dict[str, Any]:
+        """Deadline and greetings served by the model and by templates, with the reasons for the latter"""
+        return {
+            "deadline_seconds": self.deadline_seconds,
+            "served": self._served,
+            "template_reasons": self._reasons,
+        }
+
+
+greeting_fallback = GreetingFallback()
@@ -0,0 +1,161 @@
+"""
+Background summarization of long personality text.
+
+Merges keep a contact's personality bounded: repeated sentences are dropped
+and only the newest PROFILE_TEXT_MAX_CHARS are kept (db/profileText.py).
+That cap drops the oldest notes, so before it is reached, once the text
+grows past PROFILE_SUMMARY_TRIGGER_CHARS, the model condenses it to about
+PROFILE_SUMMARY_TARGET_CHARS in a background task. Prompt size then stays
+roughly constant over a contact's lifetime without losing older facts.
+"""
+import os
+import asyncio
+from typing import Any, Dict, Optional, Set
+
+from db.profileText import PROFILE_TEXT_MAX_CHARS, append_profile_text, sentence_key, split_sentences
+
+from .admission import Priority, request_priority
+from .contactService import ContactService
+from .geminiClient import GeminiClient
+
+PROFILE_SUMMARY_TRIGGER_CHARS = int(os.getenv("PROFILE_SUMMARY_TRIGGER_CHARS", "1500"))
+PROFILE_SUMMARY_TARGET_CHARS = int(os.getenv("PROFILE_SUMMARY_TARGET_CHARS", "500"))
+PROFILE_SUMMARY_CONCURRENCY = int(os.getenv("PROFILE_SUMMARY_CONCURRENCY", "2"))
+
+# Writes of a summary that lose to concurrent merges before it is given up
+WRITE_ATTEMPTS = 3
+
+
+class ProfileCompactor:
+    """Summarizes personality text that has grown past the trigger length, one task per contact."""
+
+    def __init__(self,
+                 trigger_chars: int = PROFILE_SUMMARY_TRIGGER_CHARS,
+                 target_chars: int = PROFILE_SUMMARY_TARGET_CHARS,
+                 concurrency: int = PROFILE_SUMMARY_CONCURRENCY):
+        self.trigger_chars = min(trigger_chars, PROFILE_TEXT_MAX_CHARS)
+        self.target_chars = target_chars
+        self.concurrency = concurrency
+        self._client: Optional[GeminiClient] = None
+        self._semaphore: Optional[asyncio.Semaphore] = None
+        # Contacts with a summary scheduled or running, and the tasks themselves
+        self._active: Set[str] = set()
+        self._tasks: Set[asyncio.Task] = set()
+
+        # Counters for observability
+        self._scheduled = 0
+        self._compacted = 0
+        self._skipped = 0
+        self._failed = 0
+        self._conflicts = 0
+        self._chars_before = 0
+        self._chars_after = 0
+
+    def needs_compaction(self, contact: Optional[Dict]) -> bool:
+        """Whether the contact's personality text is long enough to summarize"""
+        return bool(contact) and len(contact.get("personality") or "") >= self.trigger_chars
+
+    def schedule(self, contact: Optional[Dict]) -> bool:
+        """
+        Summarize the contact's personality in the background if it has grown too long.
+
+        Args:
+            contact: The contact as just stored
+
+        Returns:
+            True if a summary task was started
+        """
+        if not self.needs_compaction(contact) or contact["id"] in self._active:
+            return False
+
+        contact_id = contact["id"]
+        self._active.add(contact_id)
+        self._scheduled += 1
+        task = asyncio.create_task(self._run(contact_id))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+        return True
+
+    async def _run(self, contact_id: str) -> None:
+        request_priority.set(Priority.BACKGROUND)
+        try:
+            if self._semaphore is None:
+                self._semaphore = asyncio.Semaphore(self.concurrency)
+            async with self._semaphore:
+                await self.compact(contact_id)
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            self._failed += 1
+            print(f"Personality summary for contact {contact_id} failed: {e}")
+        finally:
+            self._active.discard(contact_id)
+
+    async def compact(self, contact_id: str) -> Optional[Dict]:
+        """
+        Replace a contact's personality text with a summary.
+
+        Notes merged while the model was summarizing are kept after the summary,
+        and the write is retried if a merge lands between reading and writing.
+
+        Args:
+            contact_id: The contact to compact
+
+        Returns:
+            The updated contact, or None if nothing was written
+        """
+        contact = await ContactService.aget_contact(contact_id)
+        if not self.needs_compaction(contact):
+            self._skipped += 1
+            return None
+
+        if self._client is None:
+            self._client = GeminiClient()
+        text = contact["personality"]
+        summary = await self._client.summarize_profile_text(text, self.target_chars)
+        if not summary:
+            self._failed += 1
+            print(f"No usable personality summary for contact {contact_id}")
+            return None
+
+        # Keep whatever was merged in since the text was read. The write only
+        # succeeds if the contact is unchanged since it was re-read; a merge in
+        # between means reading it again
+        summarized = {sentence_key(s) for s in split_sentences(text)}
+        for _ in range(WRITE_ATTEMPTS):
+            current = await ContactService.aget_contact(contact_id)
+            if not current:
+                return None
+            added = [s for s in split_sentences(current.get("personality"))
+                     if sentence_key(s) not in summarized]
+            compacted = append_profile_text(summary, " ".join(added))
+
+            updated = await ContactService.aupdate_contact_if_unchanged(
+                contact_id, {"personality": compacted}, current["updated_at"])
+            if updated:
+                self._compacted += 1
+                self._chars_before += len(text)
+                self._chars_after += len(compacted or "")
+                return updated
+
+        self._conflicts += 1
+        print(f"Personality summary for contact {contact_id} dropped: the contact kept changing")
+        return None
+
+    def stats(self) -> Dict[str, Any]:
+        """Summary counters and the average size reduction"""
+        return {
+            "trigger_chars": self.trigger_chars,
+            "target_chars": self.target_chars,
+            "active": len(self._active),
+            "scheduled": self._scheduled,
+            "compacted": self._compacted,
+            "skipped": self._skipped,
+            "failed": self._failed,
+            "conflicts": self._conflicts,
+            "avg_chars_before": round(self._chars_before / self._compacted) if self._compacted else 0,
+            "avg_chars_after": round(self._chars_after / self._compacted) if self._compacted else 0,
+        }
+
+
+profile_compactor = ProfileCompactor()
@@ -0,0 +1,243 @@
+"""
+Token-budgeted contact context for prompts.
+
+Contact fields are added to the prompt in priority order until the token
+budget (PROMPT_CONTEXT_TOKEN_BUDGET) is spent. Every field first gets up to
+its share of the budget, then what is left over goes to the fields in
+priority order. Within a field the most relevant items are kept: items that
+share words with the user's message (among the newest MAX_SCANNED_ITEMS),
+then upcoming dates and the most recently added items. Lines keep their usual order in the prompt, and the
+tokens trimmed are counted for /stats.
+
+Tokens are estimated as characters / 4, close enough for budgeting.
+"""
+import os
+import re
+from datetime import date
+from functools import lru_cache
+from typing import Any, Callable, Dict, FrozenSet, List, Optional, Sequence, Set
+
+from db.profileText import clamp_profile_text, split_sentences
+
+PROMPT_CONTEXT_TOKEN_BUDGET = int(os.getenv("PROMPT_CONTEXT_TOKEN_BUDGET", "800"))
+CHARS_PER_TOKEN = 4
+# Items per field checked against the user's message
+MAX_SCANNED_ITEMS = 500
+
+_WORD = re.compile(r"[a-z0-9]{3,}")
+_MONTH_DAY = re.compile(r"(\d{1,2})-(\d{1,2})\b")
+
+
+def _tokens(chars: int) -> int:
+    return (chars + CHARS_PER_TOKEN - 1) // CHARS_PER_TOKEN
+
+
+def estimate_tokens(text: str) -> int:
+    """Estimated token count of a text"""
+    return _tokens(len(text))
+
+
+def _words(text: str) -> Set[str]:
+    return set(_WORD.findall(text.lower()))
+
+
+@lru_cache(maxsize=8192)
+def _item_words(item: str) -> FrozenSet[str]:
+    """Words of a profile item; the same items come back on every turn about a contact"""
+    return frozenset(_WORD.findall(item.lower()))
+
+
+def _list(value: Any) -> List[str]:
+    return list(filter(None, value)) if isinstance(value, list) else []
+
+
+def _preferences(contact: Dict, key: str) -> List[str]:
+    preferences = contact.get("preferences")
+    return _list(preferences.get(key)) if isinstance(preferences, dict) else []
+
+
+def _dates(contact: Dict) -> List[str]:
+    dates = contact.get("important_dates")
+    if not isinstance(dates, list):
+        return []
+    return [f"{d.get('description')}: {d.get('date')}" for d in dates if isinstance(d, dict)]
+
+
+def _days_until(item: str, today: date) -> int:
+    """Days until the next anniversary of the date in an "description: date" item"""
+    match = _MONTH_DAY.search(item.rsplit(": ", 1)[-1])
+    if not match:
+        return 366
+    try:
+        upcoming = date(today.year, int(match.group(1)), int(match.group(2)))
+    except ValueError:
+        return 366
+    if upcoming < today:
+        upcoming = upcoming.replace(year=today.year + 1)
+    return (upcoming - today).days
+
+
+class ContextField:
+    """One prompt line built from a contact field"""
+
+    def __init__(self, name: str, label: str, values: Callable[[Dict], List[str]],
+                 share: float, separator: str = ", ", newest_first: bool = True,
+                 rank: Optional[Callable[[str, date], int]] = None):
+        self.name = name
+        self.label = label
+        # Characters of the line besides the items, including its newline
+        self.overhead = len(label.format("")) + 1
+        self.values = values
+        # Fraction of the budget the field may use before leftovers are shared out
+        self.share = share
+        self.separator = separator
+        self.newest_first = newest_first
+        self.rank = rank
+
+
+# In priority order
+CONTEXT_FIELDS: Sequence[ContextField] = (
+    ContextField("relationship_type", "Relationship type: {0}",
+                 lambda c: [str(c["relationship_type"])] if c.get("relationship_type") else [], share=1.0),
+    ContextField("last_connection", "Last connection: {0}",
+                 lambda c: [str(c["last_connection"])] if c.get("last_connection") else [], share=1.0),
+    ContextField("important_dates", "Important dates: {0}", _dates, share=0.15, rank=_days_until),
+    ContextField("interests", "Known interests: {0}", lambda c: _list(c.get("interests")), share=0.2),
+    ContextField("personality", "Personality: {0}",
+                 lambda c: split_sentences(clamp_profile_text(c.get("personality"))),
+                 share=0.2, separator=" "),
+    ContextField("likes", "Likes: {0}", lambda c: _preferences(c, "likes"), share=0.1),
+    ContextField("dislikes", "Dislikes: {0}", lambda c: _preferences(c, "dislikes"), share=0.05),
+    ContextField("conversation_topics", "Previous conversation topics: {0}",
+                 lambda c: _list(c.get("conversation_topics")), share=0.15),
+    ContextField("family_details", "Family details: {0}",
+                 lambda c: split_sentences(str(c["family_details"])) if c.get("family_details") else [],
+                 share=0.1, separator=" ", newest_first=False),
+)
+
+# Line order in conversation prompts
+CONVERSATION_FIELDS = ("interests", "conversation_topics", "important_dates", "last_connection",
+                       "relationship_type", "likes", "dislikes", "family_details", "personality")
+GREETING_FIELDS = ("interests", "family_details", "personality")
+
+
+class ContactContextBuilder:
+    """Builds contact context lines within a token budget and counts what was trimmed."""
+
+    def __init__(self, token_budget: int = PROMPT_CONTEXT_TOKEN_BUDGET):
+        self.token_budget = token_budget
+        self._calls = 0
+        self._trimmed_calls = 0
+        self._tokens_used = 0
+        self._tokens_trimmed = 0
+        self._max_tokens_trimmed = 0
+
+    @staticmethod
+    def _ranked(field: ContextField, values: List[str], message_words: Set[str], limit: int) -> List[int]:
+        """Indexes of the (at most limit) most relevant values, most relevant first"""
+        # Mentioned items may come from beyond the limit, up to MAX_SCANNED_ITEMS deep
+        span = max(limit, MAX_SCANNED_ITEMS) if message_words else limit
+        if field.rank is not None:
+            today = date.today()
+            order = sorted(range(len(values)), key=lambda i: field.rank(values[i], today))[:span]
+        elif field.newest_first:
+            order = list(range(len(values) - 1, max(len(values) - 1 - span, -1), -1))
+        else:
+            order = list(range(min(len(values), span)))
+        if not message_words:
+            return order
+
+        # Items the message mentions go first; only the top of very long lists is
+        # scanned so the cost doesn't grow with the profile
+        scanned = order[:MAX_SCANNED_ITEMS]
+        mentioned = [i for i in scanned if not message_words.isdisjoint(_item_words(values[i]))][:limit]
+        if not mentioned:
+            return order[:limit]
+        first = set(mentioned)
+        return mentioned + [i for i in order[:limit - len(mentioned)] if i not in first]
+
+    def build(self, contact: Dict, header: str, field_names: Sequence[str] = CONVERSATION_FIELDS,
+              message: Optional[str] = None) -> List[str]:
+        """
+        Build the context lines for a contact.
+
+        Args:
+            contact: Dictionary containing contact data
+            header: First line, always included
+            field_names: Fields to include, in the order their lines appear
+            message: The user's message; items it mentions are kept first
+
+        Returns:
+            List of prompt lines
+        """
+        budget_chars = self.token_budget * CHARS_PER_TOKEN
+        used = len(header) + 1
+
+        fields = []
+        full_chars = used
+        for field in CONTEXT_FIELDS:
+            if field.name not in field_names:
+                continue
+            values = field.values(contact)
+            if values:
+                fields.append((field, values))
+                full_chars += field.overhead + sum(map(len, values)) + len(field.separator) * (len(values) - 1)
+
+        if full_chars <= budget_chars:
+            # Everything fits
+            lines_by_field = {field.name: field.label.format(field.separator.join(values))
+                              for field, values in fields}
+            self._record(_tokens(full_chars), 0)
+            return [header] + [lines_by_field[name] for name in field_names if name in lines_by_field]
+
+        # [field, values, ranked indexes, number kept, chars used by the line]
+        message_words = _words(message) if message else set()
+        # No line can hold more items than this (one character each plus the separator)
+        plans = [[field, values, self._ranked(field, values, message_words, budget_chars // (len(field.separator) + 1)), 0, 0]
+                 for field, values in fields]
+
+        # First each field up to its share, then the leftovers in priority order
+        for capped in (True, False):
+            for plan in plans:
+                field, values, ranked, kept, line_chars = plan
+                cap = field.share * budget_chars if capped else budget_chars
+                while kept < len(ranked):
+                    item = len(values[ranked[kept]])
+                    added = item + (len(field.separator) if kept else field.overhead)
+                    if used + added > budget_chars or line_chars + added > cap:
+                        break
+                    used += added
+                    line_chars += added
+                    kept += 1
+                plan[3], plan[4] = kept, line_chars
+
+        lines_by_field = {}
+        for field, values, ranked, kept, _ in plans:
+            if kept:
+                chosen = sorted(ranked[:kept])
+                lines_by_field[field.name] = field.label.format(field.separator.join(values[i] for i in chosen))
+
+        self._record(_tokens(used), _tokens(full_chars - used))
+        return [header] + [lines_by_field[name] for name in field_names if name in lines_by_field]
+
+    def _record(self, tokens_used: int, tokens_trimmed: int) -> None:
+        self._calls += 1
+        self._tokens_used += tokens_used
+        if tokens_trimmed:
+            self._trimmed_calls += 1
+            self._tokens_trimmed += tokens_trimmed
+            self._max_tokens_trimmed = max(self._max_tokens_trimmed, tokens_trimmed)
+
+    def stats(self) -> Dict[str, Any]:
+        """Budget usage and trimmed tokens"""
+        return {
+            "token_budget": self.token_budget,
+            "contexts_built": self._calls,
+            "contexts_trimmed": self._trimmed_calls,
+            "avg_tokens_used": round(self._tokens_used / self._calls, 1) if self._calls else 0.0,
+            "tokens_trimmed": self._tokens_trimmed,
+            "max_tokens_trimmed": self._max_tokens_trimmed,
+        }
+
+
+contact_context_builder = ContactContextBuilder()
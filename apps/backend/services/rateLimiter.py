@@ -0,0 +1,167 @@
+"""
+Token-bucket rate limiting for the LLM-backed endpoints.
+
+Every /chat request that calls the model takes one token from three buckets:
+- the user's: RATE_LIMIT_USER_PER_MINUTE, bursts of RATE_LIMIT_USER_BURST.
+  Users are keyed by client address; the X-User-Id header is only used with
+  RATE_LIMIT_TRUST_USER_HEADER, when a trusted proxy in front of the API
+  sets it (clients could otherwise dodge their limit by varying it)
+- the contact's: RATE_LIMIT_CONTACT_PER_MINUTE, bursts of RATE_LIMIT_CONTACT_BURST
+- a global one: RATE_LIMIT_GLOBAL_PER_SECOND, bursts of RATE_LIMIT_GLOBAL_BURST
+
+A request is only let through if all of its buckets have a token, so a
+rejected request costs nothing. Rejections raise RateLimitExceeded, which
+the API answers with 429 and the time until the emptiest bucket refills.
+At most RATE_LIMIT_MAX_KEYS user and contact buckets are kept; the least
+recently used are dropped (a dropped bucket is full, which is what an idle
+key would have refilled to anyway). Limits are per worker process.
+"""
+import os
+import time
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional, Tuple
+
+from .admission import ServiceOverloaded
+
+RATE_LIMIT_ENABLED = os.getenv("RATE_LIMIT_ENABLED", "true").lower() == "true"
+RATE_LIMIT_USER_PER_MINUTE = float(os.getenv("RATE_LIMIT_USER_PER_MINUTE", "30"))
+RATE_LIMIT_USER_BURST = int(os.getenv("RATE_LIMIT_USER_BURST", "10"))
+RATE_LIMIT_CONTACT_PER_MINUTE = float(os.getenv("RATE_LIMIT_CONTACT_PER_MINUTE", "20"))
+RATE_LIMIT_CONTACT_BURST = int(os.getenv("RATE_LIMIT_CONTACT_BURST", "5"))
+RATE_LIMIT_GLOBAL_PER_SECOND = float(os.getenv("RATE_LIMIT_GLOBAL_PER_SECOND", "20"))
+RATE_LIMIT_GLOBAL_BURST = int(os.getenv("RATE_LIMIT_GLOBAL_BURST", "50"))
+RATE_LIMIT_MAX_KEYS = int(os.getenv("RATE_LIMIT_MAX_KEYS", "10000"))
+RATE_LIMIT_TRUST_USER_HEADER = os.getenv("RATE_LIMIT_TRUST_USER_HEADER", "false").lower() == "true"
+
+
+class RateLimitExceeded(ServiceOverloaded):
+    """A user, contact or the whole service is over its request rate."""
+
+
+class TokenBucket:
+    """Holds up to capacity tokens, refilled at rate tokens per second."""
+
+    def __init__(self, rate: float, capacity: int):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = float(capacity)
+        self.updated = time.monotonic()
+
+    def _refill(self, now: float) -> None:
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def wait_time(self, now: float) -> float:
+        """Seconds until a token is available (0 if one is now)"""
+        self._refill(now)
+        if self.tokens >= 1:
+            return 0.0
+        return (1 - self.tokens) / self.rate if self.rate > 0 else float("inf")
+
+    def take(self) -> None:
+        self.tokens -= 1
+
+
+class KeyedBuckets:
+    """One TokenBucket per key, keeping the max_keys most recently used."""
+
+    def __init__(self, rate: float, capacity: int, max_keys: int = RATE_LIMIT_MAX_KEYS):
+        self.rate = rate
+        self.capacity = capacity
+        self.max_keys = max_keys
+        self._buckets: "OrderedDict[str, TokenBucket]" = OrderedDict()
+
+    def get(self, key: str) -> TokenBucket:
+        bucket = self._buckets.get(key)
+        if bucket is None:
+            bucket = self._buckets[key] = TokenBucket(self.rate, self.capacity)
+            if len(self._buckets) > self.max_keys:
+                self._buckets.popitem(last=False)
+        else:
+            self._buckets.move_to_end(key)
+        return bucket
+
+    def __len__(self) -> int:
+        return len(self._buckets)
+
+
+class RateLimiter:
+    """Per-user, per-contact and global request limits."""
+
+    def __init__(self,
+                 enabled: bool = RATE_LIMIT_ENABLED,
+                 user_per_minute: float = RATE_LIMIT_USER_PER_MINUTE,
+                 user_burst: int = RATE_LIMIT_USER_BURST,
+                 contact_per_minute: float = RATE_LIMIT_CONTACT_PER_MINUTE,
+                 contact_burst: int = RATE_LIMIT_CONTACT_BURST,
+                 global_per_second: float = RATE_LIMIT_GLOBAL_PER_SECOND,
+                 global_burst: int = RATE_LIMIT_GLOBAL_BURST,
+                 max_keys: int = RATE_LIMIT_MAX_KEYS,
+                 trust_user_header: bool = RATE_LIMIT_TRUST_USER_HEADER):
+        self.enabled = enabled
+        self.trust_user_header = trust_user_header
+        self._users = KeyedBuckets(user_per_minute / 60, user_burst, max_keys)
+        self._contacts = KeyedBuckets(contact_per_minute / 60, contact_burst, max_keys)
+        self._global = TokenBucket(global_per_second, global_burst)
+
+        # Counters for observability
+        self._allowed = 0
+        self._limited = {"user": 0, "contact": 0, "global": 0}
+
+    def user_key(self, client_host: Optional[str], user_header: Optional[str] = None) -> str:
+        """
+        The key of a request's user bucket.
+
+        Args:
+            client_host: The client address of the request
+            user_header: The X-User-Id header, if sent
+
+        Returns:
+            The header if it is trusted and set, else the client address
+        """
+        if self.trust_user_header and user_header:
+            return f"user:{user_header}"
+        return f"addr:{client_host or 'unknown'}"
+
+    def check(self, user: str, contact_id: Optional[str] = None) -> None:
+        """
+        Take a token for a request, or reject it.
+
+        Args:
+            user: The user (or client address) making the request
+            contact_id: The contact the request is about, if any
+
+        Raises:
+            RateLimitExceeded: If any of the request's buckets is empty
+        """
+        if not self.enabled:
+            return
+
+        buckets: List[Tuple[str, TokenBucket]] = [("user", self._users.get(user))]
+        if contact_id:
+            buckets.append(("contact", self._contacts.get(contact_id)))
+        buckets.append(("global", self._global))
+
+        now = time.monotonic()
+        waits = [(bucket.wait_time(now), scope) for scope, bucket in buckets]
+        wait, scope = max(waits)
+        if wait > 0:
+            self._limited[scope] += 1
+            raise RateLimitExceeded(f"Rate limit exceeded ({scope}), try again later", wait)
+
+        for _, bucket in buckets:
+            bucket.take()
+        self._allowed += 1
+
+    def stats(self) -> Dict[str, Any]:
+        """Allowed and rejected requests, and the number of tracked users and contacts"""
+        return {
+            "enabled": self.enabled,
+            "allowed": self._allowed,
+            "limited": self._limited,
+            "tracked_users": len(self._users),
+            "tracked_contacts": len(self._contacts),
+        }
+
+
+rate_limiter = RateLimiter()
@@ -0,0 +1,180 @@
+"""
+Retries and circuit breaking for Gemini calls.
+
+Transient failures (timeouts, connection errors, 5xx responses) are retried
+up to GEMINI_RETRY_MAX_ATTEMPTS times in total, with exponential backoff and
+full jitter: before retry n the call sleeps a random time between 0 and
+min(GEMINI_RETRY_MAX_BACKOFF_SECONDS, GEMINI_RETRY_BASE_SECONDS * 2**n), so
+clients that failed together don't retry together. A retry is only made if
+its backoff fits within the call's deadline. Other errors (bad requests,
+quota errors) are not retried.
+
+The circuit breaker counts transient failures. After
+GEMINI_BREAKER_FAILURE_THRESHOLD in a row it opens: calls fail fast with
+CircuitOpen (503 with Retry-After) instead of each waiting for the upstream
+to fail. After GEMINI_BREAKER_RESET_SECONDS it is half-open and lets
+GEMINI_BREAKER_HALF_OPEN_PROBES calls through; a successful probe closes it,
+a failed one opens it again.
+"""
+import os
+import random
+import time
+from typing import Any, Dict, Optional
+
+from .admission import ServiceOverloaded
+
+GEMINI_RETRY_MAX_ATTEMPTS = int(os.getenv("GEMINI_RETRY_MAX_ATTEMPTS", "3"))
+GEMINI_RETRY_BASE_SECONDS = float(os.getenv("GEMINI_RETRY_BASE_SECONDS", "0.5"))
+GEMINI_RETRY_MAX_BACKOFF_SECONDS = float(os.getenv("GEMINI_RETRY_MAX_BACKOFF_SECONDS", "8"))
+GEMINI_BREAKER_FAILURE_THRESHOLD = int(os.getenv("GEMINI_BREAKER_FAILURE_THRESHOLD", "5"))
+GEMINI_BREAKER_RESET_SECONDS = float(os.getenv("GEMINI_BREAKER_RESET_SECONDS", "30"))
+GEMINI_BREAKER_HALF_OPEN_PROBES = int(os.getenv("GEMINI_BREAKER_HALF_OPEN_PROBES", "1"))
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+
+class CircuitOpen(ServiceOverloaded):
+    """The upstream is failing and calls fail fast; answered with 503 and Retry-After."""
+
+    status_code = 503
+
+
+class RetryPolicy:
+    """Exponential backoff with full jitter for transient failures."""
+
+    def __init__(self,
+                 max_attempts: int = GEMINI_RETRY_MAX_ATTEMPTS,
+                 base_seconds: float = GEMINI_RETRY_BASE_SECONDS,
+                 max_backoff_seconds: float = GEMINI_RETRY_MAX_BACKOFF_SECONDS):
+        self.max_attempts = max(1, max_attempts)
+        self.base_seconds = base_seconds
+        self.max_backoff_seconds = max_backoff_seconds
+
+        # Counters for observability
+        self._retries = 0
+        self._recovered = 0
+        self._exhausted = 0
+
+    def next_delay(self, attempt: int, remaining: float) -> Optional[float]:
+        """
+        Backoff before retrying a transient failure.
+
+        Args:
+            attempt: Number of the failed attempt, starting at 0
+            remaining: Seconds left until the call's deadline
+
+        Returns:
+            Seconds to sleep before the retry, or None to give up
+        """
+        delay = random.uniform(0, min(self.max_backoff_seconds, self.base_seconds * 2 ** attempt))
+        if attempt + 1 >= self.max_attempts or delay >= remaining:
+            self._exhausted += 1
+            return None
+        self._retries += 1
+        return delay
+
+    def record_recovery(self) -> None:
+        """Count a call that succeeded after retrying"""
+        self._recovered += 1
+
+    def stats(self) -> Dict[str, Any]:
+        """Retries made, calls they rescued and failures given up on"""
+        return {
+            "max_attempts": self.max_attempts,
+            "retries": self._retries,
+            "recovered": self._recovered,
+            "exhausted": self._exhausted,
+        }
+
+
+class CircuitBreaker:
+    """Consecutive-failure circuit breaker with half-open probing."""
+
+    def __init__(self,
+                 failure_threshold: int = GEMINI_BREAKER_FAILURE_THRESHOLD,
+                 reset_seconds: float = GEMINI_BREAKER_RESET_SECONDS,
+                 half_open_probes: int = GEMINI_BREAKER_HALF_OPEN_PROBES):
+        self.failure_threshold = max(1, failure_threshold)
+        self.reset_seconds = reset_seconds
+        self.half_open_probes = max(1, half_open_probes)
+        self._state = CLOSED
+        self._failures = 0
+        self._opened_at = 0.0
+        self._probing = 0
+
+        # Counters for observability
+        self._opened = 0
+        self._rejected = 0
+
+    @property
+    def state(self) -> str:
+        if self._state == OPEN and time.monotonic() - self._opened_at >= self.reset_seconds:
+            self._state = HALF_OPEN
+            self._probing = 0
+        return self._state
+
+    def allow(self) -> bool:
+        """
+        Check that a call may go to the upstream.
+
+        Returns:
+            Whether the call is a half-open probe (pass it back to record)
+
+        Raises:
+            CircuitOpen: If the circuit is open, or half-open with all probes in flight
+        """
+        state = self.state
+        if state == CLOSED:
+            return False
+        if state == HALF_OPEN and self._probing < self.half_open_probes:
+            self._probing += 1
+            return True
+        self._rejected += 1
+        retry_after = self.reset_seconds - (time.monotonic() - self._opened_at) if state == OPEN else 1
+        raise CircuitOpen("The AI model is unavailable, try again later", retry_after)
+
+    def record(self, succeeded: Optional[bool], probe: bool = False) -> None:
+        """
+        Record the outcome of an allowed call.
+
+        Args:
+            succeeded: True on success, False on a transient failure, None if the call
+                says nothing about the upstream's health (e.g. a bad request or a cancellation)
+            probe: The value allow returned for the call
+        """
+        if probe:
+            self._probing -= 1
+        if succeeded is None:
+            return
+        if succeeded:
+            self._failures = 0
+            if self._state == HALF_OPEN and probe:
+                self._state = CLOSED
+            return
+        self._failures += 1
+        if self._state == HALF_OPEN and probe or self._state == CLOSED and self._failures >= self.failure_threshold:
+            self._open()
+
+    def _open(self) -> None:
+        self._state = OPEN
+        self._opened_at = time.monotonic()
+        self._opened += 1
+        print(f"Gemini circuit breaker opened after {self._failures} consecutive failures")
+
+    def stats(self) -> Dict[str, Any]:
+        """State, consecutive failures and how often the circuit opened and failed calls fast"""
+        state = self.state
+        return {
+            "state": state,
+            "consecutive_failures": self._failures,
+            "open_seconds_left": round(max(0.0, self.reset_seconds - (time.monotonic() - self._opened_at)), 1)
+            if state == OPEN else 0.0,
+            "opened": self._opened,
+            "rejected": self._rejected,
+        }
+
+
+gemini_retry = RetryPolicy()
+gemini_breaker = CircuitBreaker()
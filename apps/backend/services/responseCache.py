@@ -0,0 +1,217 @@
+"""
+Cache for Gemini responses.
+
+Responses are keyed by a hash of the model name, the call type, an optional
+version (e.g. the contact's updated_at for greetings) and the fully
+assembled prompt, so any change to the prompt, the templates or the contact
+produces a new key. Each call type has its own TTL; a TTL of 0 disables
+caching for that type.
+
+Backends:
+- "memory": in-process LRU with per-entry TTL (default)
+- "disk": SQLite file shared by worker processes and kept across restarts
+- "none": caching disabled
+"""
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from typing import Any, Dict, Optional
+
+from cachetools import TLRUCache
+
+from .utils import resolve_data_path
+
+LLM_CACHE_BACKEND = os.getenv("LLM_CACHE_BACKEND", "memory")
+LLM_CACHE_MAXSIZE = int(os.getenv("LLM_CACHE_MAXSIZE", "2000"))
+# Relative to apps/backend, whatever the working directory
+LLM_CACHE_PATH = resolve_data_path(os.getenv("LLM_CACHE_PATH", "llm_cache.db"))
+
+# TTL in seconds per call type (0 disables caching for that type)
+LLM_CACHE_TTLS: Dict[str, float] = {
+    "greeting": float(os.getenv("LLM_CACHE_TTL_GREETING", "86400")),
+    "extraction": float(os.getenv("LLM_CACHE_TTL_EXTRACTION", "3600")),
+}
+
+
+class MemoryCacheBackend:
+    """In-process LRU cache where every entry carries its own TTL."""
+
+    name = "memory"
+
+    def __init__(self, maxsize: int = LLM_CACHE_MAXSIZE):
+        # Values are (text, ttl); the cache expires each entry ttl seconds after it was stored
+        self._cache = TLRUCache(maxsize=maxsize, ttu=lambda key, value, now: now + value[1],
+                                timer=time.monotonic)
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> Optional[str]:
+        with self._lock:
+            entry = self._cache.get(key)
+        return entry[0] if entry else None
+
+    def set(self, key: str, value: str, ttl: float) -> None:
+        with self._lock:
+            self._cache[key] = (value, ttl)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._cache.clear()
+
+    def size(self) -> int:
+        with self._lock:
+            self._cache.expire()
+            return len(self._cache)
+
+
+class DiskCacheBackend:
+    """SQLite-backed cache, evicting the least recently used entries beyond maxsize."""
+
+    name = "disk"
+
+    def __init__(self, path: str = LLM_CACHE_PATH, maxsize: int = LLM_CACHE_MAXSIZE):
+        self.maxsize = maxsize
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._conn.execute("pragma journal_mode = wal")
+        self._conn.execute("pragma busy_timeout = 5000")
+        self._conn.execute(
+            "create table if not exists llm_cache ("
+            " key text primary key, value text not null,"
+            " expires_at real not null, accessed_at real not null)"
+        )
+        self._conn.execute("create index if not exists llm_cache_accessed_at_idx on llm_cache (accessed_at)")
+
+    def get(self, key: str) -> Optional[str]:
+        now = time.time()
+        with self._lock:
+            row = self._conn.execute(
+                "select value from llm_cache where key = ? and expires_at > ?", (key, now)
+            ).fetchone()
+            if row:
+                self._conn.execute("update llm_cache set accessed_at = ? where key = ?", (now, key))
+        return row[0] if row else None
+
+    def set(self, key: str, value: str, ttl: float) -> None:
+        now = time.time()
+        with self._lock:
+            self._conn.execute(
+                "insert or replace into llm_cache (key, value, expires_at, accessed_at) values (?, ?, ?, ?)",
+                (key, value, now + ttl, now)
+            )
+            # Drop expired entries, then the least recently used ones beyond maxsize
+            self._conn.execute("delete from llm_cache where expires_at <= ?", (now,))
+            self._conn.execute(
+                "delete from llm_cache where key in ("
+                " select key from llm_cache order by accessed_at desc limit -1 offset ?)",
+                (self.maxsize,)
+            )
+
+    def clear(self) -> None:
+        with self._lock:
+            self._conn.execute("delete from llm_cache")
+
+    def size(self) -> int:
+        with self._lock:
+            return self._conn.execute(
+                "select count(*) from llm_cache where expires_at > ?", (time.time(),)
+            ).fetchone()[0]
+
+
+class ResponseCache:
+    """Gemini response cache with per-call-type TTLs and hit/miss counters."""
+
+    def __init__(self, backend: Optional[Any] = None, ttls: Optional[Dict[str, float]] = None):
+        self.backend = backend
+        self.ttls = dict(LLM_CACHE_TTLS if ttls is None else ttls)
+        self._counters: Dict[str, Dict[str, int]] = {}
+        self._lock = threading.Lock()
+
+    def enabled(self, call_type: Optional[str]) -> bool:
+        """Whether responses of this call type are cached"""
+        return self.backend is not None and call_type is not None and self.ttls.get(call_type, 0) > 0
+
+    @staticmethod
+    def make_key(call_type: str, model: str, prompt: str,
+                 version: Optional[str] = None, extra: Optional[Any] = None) -> str:
+        """
+        Build the cache key for a call.
+
+        Args:
+            call_type: Kind of call, e.g. "greeting" or "extraction"
+            model: Model name
+            prompt: The fully assembled prompt sent to the model
+            version: Optional version of the data behind the prompt (e.g. the contact's updated_at)
+            extra: Other request options that change the response (e.g. a response schema)
+
+        Returns:
+            Hex digest identifying the call
+        """
+        material = json.dumps([call_type, model, version, extra, prompt], sort_keys=True, default=str)
+        return hashlib.sha256(material.encode("utf-8")).hexdigest()
+
+    def _count(self, call_type: str, field: str) -> None:
+        with self._lock:
+            counters = self._counters.setdefault(call_type, {"hits": 0, "misses": 0, "stores": 0})
+            counters[field] += 1
+
+    def get(self, call_type: str, key: str) -> Optional[str]:
+        """Look up a cached response, counting the hit or miss"""
+        try:
+            value = self.backend.get(key)
+        except Exception as e:
+            print(f"LLM cache read failed: {e}")
+            value = None
+        self._count(call_type, "hits" if value is not None else "misses")
+        return value
+
+    def set(self, call_type: str, key: str, value: str) -> None:
+        """Store a response with the TTL of its call type"""
+        try:
+            self.backend.set(key, value, self.ttls[call_type])
+            self._count(call_type, "stores")
+        except Exception as e:
+            print(f"LLM cache write failed: {e}")
+
+    def clear(self) -> None:
+        if self.backend is not None:
+            self.backend.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        """Hit rates per call type and overall"""
+        with self._lock:
+            by_type = {
+                call_type: {
+                    **counters,
+                    "hit_rate": round(counters["hits"] / (counters["hits"] + counters["misses"]), 3)
+                    if counters["hits"] + counters["misses"] else 0.0,
+                }
+                for call_type, counters in self._counters.items()
+            }
+        hits = sum(c["hits"] for c in by_type.values())
+        lookups = hits + sum(c["misses"] for c in by_type.values())
+        return {
+            "backend": getattr(self.backend, "name", type(self.backend).__name__) if self.backend is not None else "none",
+            "size": self.backend.size() if self.backend is not None else 0,
+            "ttls": self.ttls,
+            "hits": hits,
+            "misses": lookups - hits,
+            "hit_rate": round(hits / lookups, 3) if lookups else 0.0,
+            "by_type": by_type,
+        }
+
+
+def create_backend(name: str = LLM_CACHE_BACKEND):
+    """Create the cache backend selected by LLM_CACHE_BACKEND"""
+    if name == "memory":
+        return MemoryCacheBackend()
+    if name == "disk":
+        return DiskCacheBackend()
+    if name == "none":
+        return None
+    raise ValueError(f"Unknown LLM_CACHE_BACKEND: {name!r} (expected 'memory', 'disk' or 'none')")
+
+
+response_cache = ResponseCache(create_backend())
@@ -1,10 +1,29 @@
 """
 Utility functions for the backend services.
 """
-from typing import Dict, Any
+from typing import Dict, Any, Optional
 from datetime import datetime
+from pathlib import Path
 import re
 
+# apps/backend; relative data file paths are resolved against it
+APP_DIR = Path(__file__).resolve().parent.parent
+
+def resolve_data_path(path: Optional[str]) -> Optional[str]:
+    """
+    Resolve a data file path from the environment.
+    
+    Args:
+        path: An absolute path, a path relative to apps/backend, or empty
+        
+    Returns:
+        The absolute path, so the file doesn't depend on the working directory
+        the app was started from; the empty value unchanged
+    """
+    if not path:
+        return path
+    return str(APP_DIR / Path(path).expanduser())
+
 def clean_json_response(text: str) -> str:
     """
     Clean and prepare JSON text from AI response.
@@ -0,0 +1,35 @@
+"""
+Shared fixtures. Tests run offline: the contact store is a SQLite file per
+test and nothing calls the Gemini API.
+
+Run from apps/backend:
+    python -m pytest -q
+"""
+import os
+import sys
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BACKEND_DIR)
+
+# Settings read at import time; real values from a .env file take precedence
+os.environ.setdefault("SUPABASE_URL", "http://localhost:1")
+os.environ.setdefault("SUPABASE_KEY", "eyJhbGciOiJIUzI1NiJ9.eyJyb2xlIjoiYW5vbiJ9.c2ln")
+os.environ.setdefault("GEMINI_API_KEY", "test-key")
+
+import pytest
+
+from db.contactRepository import set_contact_repository
+from db.sqliteContactRepository import SqliteContactRepository
+from services.contactService import contact_cache
+
+
+@pytest.fixture
+def sqlite_store(tmp_path):
+    """A fresh SQLite contact store behind ContactService"""
+    repository = SqliteContactRepository(str(tmp_path / "contacts.db"))
+    set_contact_repository(repository)
+    contact_cache.clear()
+    yield repository
+    set_contact_repository(None)
+    contact_cache.clear()
+    repository.close()
@@ -0,0 +1,142 @@
+"""Priority queue and load shedding in front of the Gemini API (services/admission.py)."""
+import asyncio
+
+import pytest
+
+from services.admission import AdmissionQueue, AdmissionRejected, Priority
+
+
+async def _settle():
+    # Let queued tasks run up to their wait
+    for _ in range(5):
+        await asyncio.sleep(0)
+
+
+def test_calls_run_right_away_while_slots_are_free():
+    async def run():
+        queue = AdmissionQueue(max_concurrency=2, max_waiting=10, wait_timeout=1)
+        await queue.acquire(Priority.BACKGROUND)
+        await queue.acquire(Priority.INTERACTIVE)
+        return queue.stats()
+
+    stats = asyncio.run(run())
+    assert stats["active"] == 2
+    assert stats["admitted"] == {"interactive": 1, "greeting": 0, "background": 1}
+
+
+def test_waiters_are_admitted_by_priority_then_arrival():
+    async def run():
+        queue = AdmissionQueue(max_concurrency=1, max_waiting=10, wait_timeout=5)
+        await queue.acquire(Priority.INTERACTIVE)
+        admitted = []
+
+        async def call(name, priority):
+            await queue.acquire(priority)
+            admitted.append(name)
+
+        tasks = [asyncio.create_task(call(name, priority)) for name, priority in [
+            ("background", Priority.BACKGROUND), ("greeting", Priority.GREETING),
+            ("first send", Priority.INTERACTIVE), ("second send", Priority.INTERACTIVE)]]
+        await _settle()
+        assert queue.stats()["waiting"] == {"interactive": 2, "greeting": 1, "background": 1}
+
+        for _ in tasks:
+            queue.release()
+            await _settle()
+        await asyncio.gather(*tasks)
+        return admitted, queue.stats()
+
+    admitted, stats = asyncio.run(run())
+    assert admitted == ["first send", "second send", "greeting", "background"]
+    assert stats["active"] == 1
+
+
+def test_full_queue_sheds_a_lower_priority_waiter():
+    async def run():
+        queue = AdmissionQueue(max_concurrency=1, max_waiting=1, wait_timeout=5)
+        await queue.acquire(Priority.INTERACTIVE)
+        greeting = asyncio.create_task(queue.acquire(Priority.GREETING))
+        await _settle()
+        send = asyncio.create_task(queue.acquire(Priority.INTERACTIVE))
+        await _settle()
+
+        with pytest.raises(AdmissionRejected) as shed:
+            await greeting
+        queue.release()
+        await send
+        return shed.value, queue.stats()
+
+    shed, stats = asyncio.run(run())
+    assert "replaced" in str(shed)
+    assert shed.retry_after >= 1
+    assert stats["shed"]["greeting"] == 1
+    assert stats["admitted"]["interactive"] == 2
+
+
+def test_full_queue_rejects_a_call_that_outranks_nobody():
+    async def run():
+        queue = AdmissionQueue(max_concurrency=1, max_waiting=1, wait_timeout=5)
+        await queue.acquire(Priority.INTERACTIVE)
+        waiting = asyncio.create_task(queue.acquire(Priority.INTERACTIVE))
+        await _settle()
+
+        with pytest.raises(AdmissionRejected, match="queue full"):
+            await queue.acquire(Priority.GREETING)
+        with pytest.raises(AdmissionRejected, match="queue full"):
+            await queue.acquire(Priority.INTERACTIVE)
+        queue.release()
+        await waiting
+        return queue.stats()
+
+    stats = asyncio.run(run())
+    assert stats["shed"] == {"interactive": 1, "greeting": 1, "background": 0}
+
+
+def test_background_calls_are_never_shed():
+    async def run():
+        queue = AdmissionQueue(max_concurrency=1, max_waiting=0, wait_timeout=0.01)
+        await queue.acquire(Priority.INTERACTIVE)
+        background = asyncio.create_task(queue.acquire(Priority.BACKGROUND))
+        await asyncio.sleep(0.05)
+        with pytest.raises(AdmissionRejected):
+            await queue.acquire(Priority.INTERACTIVE)
+        assert not background.done()
+        queue.release()
+        await background
+
+    asyncio.run(run())
+
+
+def test_waiters_give_up_after_the_timeout():
+    async def run():
+        queue = AdmissionQueue(max_concurrency=1, max_waiting=10, wait_timeout=0.01)
+        await queue.acquire(Priority.INTERACTIVE)
+        with pytest.raises(AdmissionRejected, match="waited too long"):
+            await queue.acquire(Priority.INTERACTIVE)
+        # The slot isn't handed to the waiter that left
+        queue.release()
+        return queue.stats()
+
+    stats = asyncio.run(run())
+    assert stats["timed_out"] == 1
+    assert stats["active"] == 0
+    assert stats["waiting"]["interactive"] == 0
+
+
+def test_a_cancelled_waiter_leaves_the_queue():
+    async def run():
+        queue = AdmissionQueue(max_concurrency=1, max_waiting=10, wait_timeout=5)
+        await queue.acquire(Priority.INTERACTIVE)
+        waiter = asyncio.create_task(queue.acquire(Priority.INTERACTIVE))
+        await _settle()
+        waiter.cancel()
+        await _settle()
+        queue.release()
+        async with queue.slot(Priority.GREETING):
+            active = queue.stats()["active"]
+        return active, queue.stats()
+
+    active, stats = asyncio.run(run())
+    assert active == 1
+    assert stats["active"] == 0
+    assert stats["waiting"]["interactive"] == 0
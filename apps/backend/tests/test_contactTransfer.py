@@ -0,0 +1,126 @@
+"""Streaming bulk import and export of contacts (services/contactTransfer.py)."""
+import asyncio
+import json
+
+import pytest
+
+from db.contactRepository import set_contact_repository
+from db.sqliteContactRepository import SqliteContactRepository
+from services.contactTransfer import detect_format, export_contacts, import_contacts
+
+CONTACTS = [
+    {"name": "Zoë Müller", "nickname": "Zo", "birthday": "1990-05-01", "relationship_type": "friend",
+     "relationship_strength": 4, "recommended_contact_freq_days": 14,
+     "interests": ["chess", "jazz, blues"], "conversation_topics": ["work"],
+     "important_dates": [{"date": "2020-06-10", "description": "Wedding"}],
+     "contact_methods": [{"type": "phone", "value": "123-456", "preferred": True}],
+     "preferences": {"likes": ["tea"], "dislikes": ["noise"]},
+     "personality": "Calm, \"dry\" humour.\nLoves puzzles.",
+     "family_details": "Two kids."},
+    {"name": "Al", "interests": []},
+    {"name": "Bea", "last_connection": "2024-03-01T12:00:00+00:00"},
+]
+# Maintained by the store, so they differ between the original and the re-imported rows
+GENERATED = ("id", "created_at", "updated_at")
+
+
+async def _chunks(data: bytes, size: int = 7):
+    # Small chunks split lines and multi-byte characters
+    for start in range(0, len(data), size):
+        yield data[start:start + size]
+
+
+async def _export(fmt: str, page_size: int = 2) -> str:
+    return "".join([chunk async for chunk in export_contacts(fmt, page_size=page_size)])
+
+
+def _import(text: str, fmt: str, **kwargs):
+    return asyncio.run(import_contacts(_chunks(text.encode("utf-8")), fmt, **kwargs))
+
+
+def _stored(repository):
+    return sorted(({k: v for k, v in c.items() if k not in GENERATED} for c in repository.list_contacts(limit=100)),
+                  key=lambda c: c["name"])
+
+
+@pytest.mark.parametrize("fmt", ["ndjson", "csv"])
+def test_export_then_import_round_trips(sqlite_store, tmp_path, fmt):
+    result = _import("".join(json.dumps(c) + "\n" for c in CONTACTS), "ndjson")
+    assert result["imported"] == len(CONTACTS)
+    original = _stored(sqlite_store)
+
+    exported = asyncio.run(_export(fmt))
+
+    copy = SqliteContactRepository(str(tmp_path / "copy.db"))
+    set_contact_repository(copy)
+    try:
+        result = _import(exported, fmt, batch_size=2)
+        assert result == {"rows": 3, "imported": 3, "failed": 0, "batches": 2, "errors": []}
+        assert _stored(copy) == original
+    finally:
+        copy.close()
+
+
+def test_export_pages_through_all_contacts(sqlite_store):
+    sqlite_store.create_contacts([{"name": f"Contact {i:02d}"} for i in range(7)])
+
+    lines = asyncio.run(_export("ndjson", page_size=3)).splitlines()
+
+    assert [json.loads(line)["name"] for line in lines] == [f"Contact {i:02d}" for i in range(7)]
+
+
+def test_csv_export_starts_with_the_header(sqlite_store):
+    assert asyncio.run(_export("csv")).splitlines()[0].startswith("id,name,nickname,")
+
+
+def test_csv_lists_accept_semicolon_separated_text(sqlite_store):
+    result = _import("name,interests,conversation_topics\nAnn,chess; go ;,work\n", "csv")
+
+    assert result["imported"] == 1
+    contact = sqlite_store.list_contacts()[0]
+    assert contact["interests"] == ["chess", "go"]
+    assert contact["conversation_topics"] == ["work"]
+
+
+def test_bad_rows_are_reported_by_line_and_the_rest_imported(sqlite_store):
+    body = "\n".join([
+        json.dumps({"name": "Ann"}),
+        "{not json",
+        "",
+        json.dumps(["a list"]),
+        json.dumps({"nickname": "no name"}),
+        json.dumps({"name": "Bo"}),
+    ])
+
+    result = _import(body, "ndjson", max_errors=2)
+
+    assert result["imported"] == 2
+    assert result["failed"] == 3
+    assert [error["line"] for error in result["errors"]] == [2, 4]
+    assert "Invalid JSON" in result["errors"][0]["error"]
+
+
+def test_csv_errors_point_at_the_record(sqlite_store):
+    body = 'name,interests\nAnn,"[""chess""]"\n"Bo\nB",\nCy,[broken\nDi,a,extra\n'
+
+    result = _import(body, "csv")
+
+    assert result["imported"] == 2
+    assert [error["line"] for error in result["errors"]] == [5, 6]
+
+
+def test_runaway_line_aborts_but_keeps_earlier_rows(sqlite_store, monkeypatch):
+    monkeypatch.setattr("services.contactTransfer.CONTACTS_IMPORT_MAX_LINE_CHARS", 50)
+
+    result = _import(json.dumps({"name": "Ann"}) + "\n" + "x" * 200, "ndjson")
+
+    assert result["imported"] == 1
+    assert "aborted" in result
+
+
+def test_unknown_format_is_rejected():
+    with pytest.raises(ValueError):
+        _import("", "xml")
+    assert detect_format("text/csv; charset=utf-8") == "csv"
+    assert detect_format("application/x-ndjson") == "ndjson"
+    assert detect_format(None) == "ndjson"
@@ -0,0 +1,146 @@
+"""Context caching of the static prompt prefixes (services/contextCache.py)."""
+import asyncio
+from types import SimpleNamespace
+
+import pytest
+
+from services import contextCache
+from services.contextCache import ContextCache
+
+MODEL = "gemini-test"
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def monotonic(self) -> float:
+        return self.now
+
+
+class FakeCaches:
+    """Stand-in for client.aio.caches"""
+
+    def __init__(self):
+        self.created, self.updated, self.deleted = [], [], []
+        self.fail_create = self.fail_update = False
+
+    async def create(self, model, config):
+        if self.fail_create:
+            raise RuntimeError("Cached content is too small")
+        self.created.append(config.display_name)
+        return SimpleNamespace(name=f"cachedContents/{len(self.created)}")
+
+    async def update(self, name, config):
+        if self.fail_update:
+            raise RuntimeError("Not found")
+        self.updated.append(name)
+
+    async def delete(self, name):
+        self.deleted.append(name)
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = FakeClock()
+    monkeypatch.setattr(contextCache, "time", clock)
+    return clock
+
+
+@pytest.fixture
+def caches():
+    return FakeCaches()
+
+
+def _handle(cache: ContextCache, caches: FakeCaches, prefix_text: str = "System prompt", name: str = "chat"):
+    client = SimpleNamespace(aio=SimpleNamespace(caches=caches))
+    return asyncio.run(cache.get_handle(client, MODEL, name, prefix_text))
+
+
+def _cache(**kwargs) -> ContextCache:
+    settings = dict(enabled=True, ttl_seconds=3600, refresh_seconds=300, retry_seconds=600)
+    settings.update(kwargs)
+    return ContextCache(**settings)
+
+
+def test_a_prefix_is_uploaded_once_and_reused(clock, caches):
+    cache = _cache()
+
+    first = _handle(cache, caches)
+    second = _handle(cache, caches)
+
+    assert first == second == "cachedContents/1"
+    assert caches.created == ["lazor-chat"]
+    assert cache.stats()["hits"] == 1
+
+
+def test_prefixes_are_cached_by_name(clock, caches):
+    cache = _cache()
+
+    assert _handle(cache, caches, name="chat") != _handle(cache, caches, name="extraction")
+    assert len(caches.created) == 2
+
+
+def test_changed_templates_replace_the_cache(clock, caches):
+    cache = _cache()
+    old = _handle(cache, caches, "System prompt v1")
+
+    new = _handle(cache, caches, "System prompt v2")
+
+    assert new != old
+    assert caches.deleted == [old]
+
+
+def test_handles_are_extended_before_they_expire(clock, caches):
+    cache = _cache()
+    name = _handle(cache, caches)
+
+    clock.now += 3600 - 299
+    assert _handle(cache, caches) == name
+    assert caches.updated == [name]
+
+    clock.now += 3000
+    assert _handle(cache, caches) == name
+    assert len(caches.updated) == 1
+
+
+def test_a_failed_extension_recreates_the_cache(clock, caches):
+    cache = _cache()
+    old = _handle(cache, caches)
+    caches.fail_update = True
+
+    clock.now += 3500
+    new = _handle(cache, caches)
+
+    assert new != old
+    assert caches.deleted == [old]
+
+
+def test_a_prefix_the_api_rejects_is_sent_inline_until_the_retry(clock, caches):
+    cache = _cache()
+    caches.fail_create = True
+
+    assert _handle(cache, caches) is None
+    assert _handle(cache, caches) is None
+    assert cache.stats()["create_failures"] == 1
+    assert cache.stats()["inline"] == 1
+
+    caches.fail_create = False
+    clock.now += 600
+    assert _handle(cache, caches) == "cachedContents/1"
+
+
+def test_invalidated_handles_are_recreated(clock, caches):
+    cache = _cache()
+    _handle(cache, caches)
+
+    cache.invalidate(MODEL, "chat")
+
+    assert _handle(cache, caches) == "cachedContents/2"
+    assert cache.stats()["invalidated"] == 1
+
+
+def test_disabled_cache_sends_everything_inline(clock, caches):
+    assert _handle(_cache(enabled=False), caches) is None
+    assert _handle(_cache(), caches, prefix_text="") is None
+    assert caches.created == []
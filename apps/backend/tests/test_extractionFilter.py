@@ -0,0 +1,183 @@
+"""Local pre-filter for profile extraction (services/extractionFilter.py) and the outcomes it learns from."""
+import asyncio
+import json
+
+import pytest
+
+from services import chatService, extractionFilter
+from services.chatService import ChatService
+from services.contactService import ContactService
+from services.extractionFilter import ExtractionFilter, has_profile_data
+from services.geminiClient import GeminiClient
+
+POSITIVE = ["tennis every sunday morning", "plays tennis at the club on sunday", "sunday tennis league again"]
+NEGATIVE = ["the weather today is grey", "traffic was awful this morning", "weather app says rain"]
+
+
+def _filter(**kwargs) -> ExtractionFilter:
+    settings = dict(enabled=True, skip_below=0.5, min_samples=6, audit_rate=0.0, training_path="")
+    settings.update(kwargs)
+    return ExtractionFilter(**settings)
+
+
+def _train(extraction_filter: ExtractionFilter) -> None:
+    for message in POSITIVE:
+        extraction_filter.record(message, True)
+    for message in NEGATIVE:
+        extraction_filter.record(message, False)
+
+
+@pytest.mark.parametrize("message, extract, reason", [
+    ("", False, "acknowledgement"),
+    ("Ok thanks!", False, "acknowledgement"),
+    ("sounds good, thank you so much", False, "acknowledgement"),
+    ("Her birthday is on March 3rd", True, "date"),
+    ("His brothers visit every summer", True, "family"),
+    ("She loves Thai food", True, "likes"),
+    ("He got promoted last month", True, "life"),
+    ("What should I ask next?", False, "question"),
+    ("Random thoughts about nothing", True, "untrained"),
+])
+def test_rules_decide_before_the_model(message, extract, reason):
+    assert _filter().classify(message) == (extract, reason)
+
+
+def test_the_model_decides_once_trained():
+    extraction_filter = _filter()
+    _train(extraction_filter)
+
+    assert extraction_filter.classify("tennis again on sunday") == (True, "model")
+    assert extraction_filter.classify("grey weather and traffic") == (False, "model")
+
+
+def test_the_model_waits_for_enough_samples_of_both_outcomes():
+    extraction_filter = _filter(min_samples=2)
+    for message in NEGATIVE:
+        extraction_filter.record(message, False)
+
+    assert extraction_filter.classify("grey weather and traffic") == (True, "untrained")
+
+
+def test_check_counts_decisions_and_audits_skips(monkeypatch):
+    extraction_filter = _filter(audit_rate=0.5)
+    monkeypatch.setattr(extractionFilter.random, "random", lambda: 0.1)
+
+    assert extraction_filter.check("She loves Thai food") == (True, False)
+    assert extraction_filter.check("ok") == (True, True)
+    monkeypatch.setattr(extractionFilter.random, "random", lambda: 0.9)
+    assert extraction_filter.check("thanks") == (False, False)
+
+    stats = extraction_filter.stats()
+    assert stats["checked"] == 3
+    assert stats["skipped"] == 2
+    assert stats["skipped_by_reason"] == {"acknowledgement": 2}
+    assert stats["extracted_by_reason"] == {"likes": 1}
+    assert stats["audited"] == 1
+
+
+def test_recorded_audits_measure_misses():
+    extraction_filter = _filter()
+    extraction_filter.record("ok", True, audit=True)
+    extraction_filter.record("thanks", False, audit=True)
+    extraction_filter.record("She loves Thai food", True)
+
+    stats = extraction_filter.stats()
+    assert stats["audit_misses"] == 1
+    assert stats["empty_extraction_rate"] == round(1 / 3, 3)
+    assert stats["model"]["samples"] == 3
+
+
+def test_a_disabled_filter_extracts_everything_and_learns_nothing():
+    extraction_filter = _filter(enabled=False)
+
+    assert extraction_filter.check("ok") == (True, False)
+    extraction_filter.record("ok", False)
+    assert extraction_filter.stats()["model"]["samples"] == 0
+
+
+def test_training_data_is_loaded_and_bad_lines_skipped(tmp_path):
+    path = tmp_path / "training.jsonl"
+    lines = [json.dumps({"message": m, "has_profile_data": True}) for m in POSITIVE]
+    lines += [json.dumps({"message": m, "has_profile_data": False}) for m in NEGATIVE]
+    lines += ["not json", json.dumps({"message": "no label"}), ""]
+    path.write_text("\n".join(lines))
+
+    extraction_filter = _filter(training_path=str(path))
+
+    assert extraction_filter.model.samples == 6
+    assert extraction_filter.classify("tennis again on sunday") == (True, "model")
+
+
+def test_has_profile_data_ignores_empty_values():
+    assert not has_profile_data({})
+    assert not has_profile_data({"interests": [], "preferences": {"likes": [], "dislikes": None}, "nickname": ""})
+    assert has_profile_data({"preferences": {"likes": ["tea"]}})
+    assert has_profile_data({"relationship_strength": 0})
+
+
+@pytest.mark.parametrize("response, expected", [
+    (("Error: the AI model failed", False), ({}, False)),
+    (("not json at all", True), ({}, True)),
+    (('```json\n{"interests": ["tennis"]}\n```', True), ({"interests": ["tennis"]}, True)),
+])
+def test_extraction_reports_whether_the_model_answered(monkeypatch, response, expected):
+    client = GeminiClient()
+
+    async def generate_content(prompt, **kwargs):
+        assert kwargs["with_status"] is True
+        return response
+
+    monkeypatch.setattr(client, "generate_content", generate_content)
+
+    assert asyncio.run(client.extract_profile_data("He plays tennis", with_status=True)) == expected
+    assert asyncio.run(client.extract_profile_data("He plays tennis")) == expected[0]
+
+
+class FakeClient:
+    def __init__(self, result):
+        self.result = result
+
+    def is_available(self) -> bool:
+        return True
+
+    async def extract_profile_data(self, message, with_status=False):
+        return self.result if with_status else self.result[0]
+
+
+@pytest.fixture
+def fresh_filter(monkeypatch):
+    extraction_filter = _filter()
+    monkeypatch.setattr(chatService, "extraction_filter", extraction_filter)
+    return extraction_filter
+
+
+def test_failed_extractions_are_not_learned(sqlite_store, fresh_filter):
+    contact = sqlite_store.create_contact({"name": "Ann"})
+    service = ChatService(ContactService())
+    service.client = FakeClient(({}, False))
+
+    assert asyncio.run(service._extract_if_worthwhile(contact["id"], "Random thoughts about nothing")) == {}
+    assert fresh_filter.stats()["model"]["samples"] == 0
+
+
+def test_successful_extractions_are_learned_and_applied(sqlite_store, fresh_filter):
+    contact = sqlite_store.create_contact({"name": "Ann"})
+    service = ChatService(ContactService())
+
+    service.client = FakeClient(({"interests": ["tennis"]}, True))
+    asyncio.run(service._extract_if_worthwhile(contact["id"], "Sunday tennis league again"))
+    service.client = FakeClient(({}, True))
+    asyncio.run(service._extract_if_worthwhile(contact["id"], "Random thoughts about nothing"))
+
+    model = fresh_filter.stats()["model"]
+    assert (model["samples"], model["with_profile_data"]) == (2, 1)
+    assert fresh_filter.stats()["empty_extraction_rate"] == 0.5
+    assert sqlite_store.get_contact(contact["id"])["interests"] == ["tennis"]
+
+
+def test_skipped_messages_make_no_call(sqlite_store, fresh_filter):
+    service = ChatService(ContactService())
+    service.client = FakeClient(None)
+
+    assert asyncio.run(service._extract_if_worthwhile("any-id", "ok thanks")) == {}
+    assert fresh_filter.stats()["skipped"] == 1
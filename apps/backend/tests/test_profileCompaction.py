@@ -0,0 +1,86 @@
+"""Background summarization of long personality text (services/profileCompaction.py)."""
+import asyncio
+
+from services.contactService import ContactService
+from services.profileCompaction import WRITE_ATTEMPTS, ProfileCompactor
+
+LONG_TEXT = " ".join(f"He likes thing number {i}." for i in range(60))
+
+
+class FakeClient:
+    def __init__(self, summary="He likes many things."):
+        self.summary = summary
+
+    async def summarize_profile_text(self, text, max_chars):
+        return self.summary
+
+
+def _compactor(summary="He likes many things.") -> ProfileCompactor:
+    compactor = ProfileCompactor(trigger_chars=100, target_chars=50)
+    compactor._client = FakeClient(summary)
+    return compactor
+
+
+def test_short_text_is_left_alone(sqlite_store):
+    contact = sqlite_store.create_contact({"name": "Bo", "personality": "Calm."})
+    compactor = _compactor()
+
+    assert asyncio.run(compactor.compact(contact["id"])) is None
+    assert compactor.stats()["skipped"] == 1
+
+
+def test_long_text_is_replaced_by_the_summary(sqlite_store):
+    contact = sqlite_store.create_contact({"name": "Bo", "personality": LONG_TEXT})
+    compactor = _compactor()
+
+    updated = asyncio.run(compactor.compact(contact["id"]))
+
+    assert updated["personality"] == "He likes many things."
+    assert compactor.stats()["compacted"] == 1
+
+
+def test_no_summary_writes_nothing(sqlite_store):
+    contact = sqlite_store.create_contact({"name": "Bo", "personality": LONG_TEXT})
+    compactor = _compactor(summary="")
+
+    assert asyncio.run(compactor.compact(contact["id"])) is None
+    assert sqlite_store.get_contact(contact["id"])["personality"] == LONG_TEXT
+
+
+def test_a_merge_before_the_write_is_kept(sqlite_store, monkeypatch):
+    contact = sqlite_store.create_contact({"name": "Bo", "personality": LONG_TEXT})
+    compactor = _compactor()
+    read = ContactService.aget_contact
+    reads = []
+
+    async def racing_read(contact_id):
+        current = await read(contact_id)
+        reads.append(current)
+        if len(reads) == 2:
+            # Lands between re-reading the contact and writing the summary
+            await ContactService.amerge_contact_profile(contact_id, {"personality": "She moved to Oslo."})
+        return current
+
+    monkeypatch.setattr(ContactService, "aget_contact", staticmethod(racing_read))
+    updated = asyncio.run(compactor.compact(contact["id"]))
+
+    assert updated["personality"] == "He likes many things. She moved to Oslo."
+    assert len(reads) == 3
+
+
+def test_gives_up_when_the_contact_keeps_changing(sqlite_store, monkeypatch):
+    contact = sqlite_store.create_contact({"name": "Bo", "personality": LONG_TEXT})
+    compactor = _compactor()
+
+    writes = []
+
+    async def never_unchanged(contact_id, contact_data, updated_at):
+        writes.append(updated_at)
+        return None
+
+    monkeypatch.setattr(ContactService, "aupdate_contact_if_unchanged", staticmethod(never_unchanged))
+
+    assert asyncio.run(compactor.compact(contact["id"])) is None
+    assert compactor.stats()["conflicts"] == 1
+    assert len(writes) == WRITE_ATTEMPTS
+    assert sqlite_store.get_contact(contact["id"])["personality"] == LONG_TEXT
@@ -0,0 +1,126 @@
+"""
+Profile merge rules of db/profileMerge.py and db/profileText.py, which must
+match merge_contact_profile (migrations 001 and 004) and profile_text_append
+(migration 004) in the Supabase database.
+"""
+from db.profileMerge import merge_profile
+from db.profileText import append_profile_text, clamp_profile_text, split_sentences
+
+
+def test_scalar_fields_overwrite_and_nulls_are_ignored():
+    current = {"nickname": "Bob", "birthday": "1990-01-01", "family_details": "Two kids."}
+    patch = {"nickname": "Bobby", "birthday": None, "relationship_type": "friend"}
+
+    assert merge_profile(current, patch) == {"nickname": "Bobby", "relationship_type": "friend"}
+
+
+def test_fields_outside_the_merge_are_not_written():
+    merged = merge_profile({"name": "Bob"}, {"name": "Robert", "id": "x", "relationship_strength": 5})
+
+    assert merged == {}
+
+
+def test_lists_are_unioned_in_order_without_duplicates():
+    current = {"interests": ["chess", "hiking"], "conversation_topics": None}
+    patch = {"interests": ["hiking", "jazz", "chess", "jazz"], "conversation_topics": ["work"]}
+
+    merged = merge_profile(current, patch)
+
+    assert merged["interests"] == ["chess", "hiking", "jazz"]
+    assert merged["conversation_topics"] == ["work"]
+
+
+def test_objects_in_lists_compare_by_value():
+    current = {"interests": [{"name": "chess", "level": 2}]}
+    patch = {"interests": [{"level": 2, "name": "chess"}, {"name": "go"}]}
+
+    assert merge_profile(current, patch)["interests"] == [{"name": "chess", "level": 2}, {"name": "go"}]
+
+
+def test_non_list_values_count_as_empty():
+    merged = merge_profile({"interests": "chess"}, {"interests": "go", "conversation_topics": ["work"]})
+
+    assert merged["interests"] == []
+    assert merged["conversation_topics"] == ["work"]
+
+
+def test_preferences_union_likes_and_dislikes_and_keep_other_keys():
+    current = {"preferences": {"likes": ["tea"], "dislikes": ["noise"], "notes": "early riser"}}
+    patch = {"preferences": {"likes": ["coffee", "tea"]}}
+
+    assert merge_profile(current, patch)["preferences"] == {
+        "likes": ["tea", "coffee"], "dislikes": ["noise"], "notes": "early riser"}
+
+
+def test_preferences_stored_as_non_object_start_empty():
+    merged = merge_profile({"preferences": "tea"}, {"preferences": {"dislikes": ["noise"]}})
+
+    assert merged["preferences"] == {"likes": [], "dislikes": ["noise"]}
+
+
+def test_important_dates_are_deduplicated_by_date_and_description():
+    current = {"important_dates": [{"date": "05-01", "description": "Birthday", "recurring": True}]}
+    patch = {"important_dates": [
+        {"date": "05-01", "description": "Birthday", "recurring": False},
+        {"date": "06-10", "description": "Anniversary"},
+    ]}
+
+    # The stored entry wins, as the first occurrence does in the SQL
+    assert merge_profile(current, patch)["important_dates"] == [
+        {"date": "05-01", "description": "Birthday", "recurring": True},
+        {"date": "06-10", "description": "Anniversary"},
+    ]
+
+
+def test_empty_personality_is_not_written():
+    assert "personality" not in merge_profile({"personality": "Calm."}, {"personality": ""})
+    assert "personality" not in merge_profile({"personality": "Calm."}, {"personality": None})
+
+
+def test_personality_is_appended_without_repeated_sentences():
+    merged = merge_profile({"personality": "Calm. Likes puzzles."},
+                           {"personality": "likes puzzles!  Very punctual."})
+
+    assert merged["personality"] == "Calm. Likes puzzles. Very punctual."
+
+
+def test_sentences_split_on_punctuation_and_blank_lines():
+    assert split_sentences("One. Two!\nThree?\n\nFour\n\n  five  ") == ["One.", "Two!", "Three?", "Four", "five"]
+    assert split_sentences(None) == []
+
+
+def test_appended_text_keeps_the_newest_sentences_that_fit():
+    current = "First note. Second note."
+
+    assert append_profile_text(current, "Third note.", max_chars=24) == "Second note. Third note."
+    assert append_profile_text(current, "Third note.", max_chars=23) == "Third note."
+
+
+def test_a_single_sentence_over_the_limit_is_cut():
+    assert append_profile_text("Old.", "A very long sentence indeed.", max_chars=10) == "A very lon"
+
+
+def test_no_text_gives_none():
+    assert append_profile_text(None, None) is None
+    assert append_profile_text("", "  ") is None
+
+
+def test_clamp_leaves_short_text_and_bounds_long_text():
+    assert clamp_profile_text("Short. Text.", max_chars=100) == "Short. Text."
+
+    long_text = " ".join(f"Note {i}." for i in range(100))
+    clamped = clamp_profile_text(long_text, max_chars=50)
+    assert len(clamped) <= 50
+    assert clamped.endswith("Note 99.")
+
+
+def test_sqlite_store_merges_with_the_same_rules(sqlite_store):
+    contact = sqlite_store.create_contact({"name": "Ann", "interests": ["chess"], "personality": "Calm."})
+
+    merged = sqlite_store.merge_contact_profile(contact["id"], {
+        "interests": ["go", "chess"], "personality": "calm. Funny.", "nickname": "Annie"})
+
+    assert merged["interests"] == ["chess", "go"]
+    assert merged["personality"] == "Calm. Funny."
+    assert merged["nickname"] == "Annie"
+    assert sqlite_store.merge_contact_profile("00000000-0000-0000-0000-000000000000", {"nickname": "x"}) is None
@@ -0,0 +1,93 @@
+"""Token-budgeted contact context (services/promptBuilder.py)."""
+from datetime import date, timedelta
+
+from services.promptBuilder import CHARS_PER_TOKEN, ContactContextBuilder
+
+HEADER = "Contact: Ann"
+
+
+def _chars(lines):
+    return sum(len(line) + 1 for line in lines)
+
+
+def test_everything_fits_in_a_large_budget():
+    contact = {"relationship_type": "friend", "interests": ["chess", "jazz"],
+               "personality": "Calm. Funny.", "preferences": {"likes": ["tea"], "dislikes": []}}
+    builder = ContactContextBuilder(token_budget=1000)
+
+    lines = builder.build(contact, HEADER)
+
+    assert lines == [HEADER, "Known interests: chess, jazz", "Relationship type: friend",
+                     "Likes: tea", "Personality: Calm. Funny."]
+    assert builder.stats()["contexts_trimmed"] == 0
+
+
+def test_only_requested_fields_are_included_in_their_order():
+    contact = {"interests": ["chess"], "family_details": "Two kids.", "relationship_type": "friend"}
+
+    lines = ContactContextBuilder(token_budget=1000).build(
+        contact, HEADER, field_names=("family_details", "interests"))
+
+    assert lines == [HEADER, "Family details: Two kids.", "Known interests: chess"]
+
+
+def test_trimmed_context_stays_within_the_budget():
+    contact = {"relationship_type": "friend",
+               "interests": [f"interest {i}" for i in range(200)],
+               "conversation_topics": [f"topic {i}" for i in range(200)],
+               "personality": " ".join(f"Note {i}." for i in range(200))}
+    builder = ContactContextBuilder(token_budget=100)
+
+    lines = builder.build(contact, HEADER)
+
+    assert _chars(lines) <= 100 * CHARS_PER_TOKEN
+    assert "Relationship type: friend" in lines
+    stats = builder.stats()
+    assert stats["contexts_trimmed"] == 1
+    assert stats["tokens_trimmed"] > 0
+
+
+def test_newest_items_are_kept_in_their_original_order():
+    contact = {"interests": [f"interest {i:02d}" for i in range(50)]}
+
+    lines = ContactContextBuilder(token_budget=20).build(contact, HEADER, field_names=("interests",))
+
+    kept = lines[1][len("Known interests: "):].split(", ")
+    assert kept == sorted(kept)
+    assert kept[-1] == "interest 49"
+    assert "interest 00" not in kept
+
+
+def test_items_the_message_mentions_are_kept_first():
+    contact = {"interests": ["sailing"] + [f"interest {i:02d}" for i in range(50)]}
+
+    lines = ContactContextBuilder(token_budget=20).build(
+        contact, HEADER, field_names=("interests",), message="Any tips for sailing?")
+
+    assert lines[1].startswith("Known interests: sailing, ")
+
+
+def test_upcoming_dates_are_kept_first():
+    today = date.today()
+    soon = today + timedelta(days=3)
+    dates = [{"date": f"{(today + timedelta(days=d)).month:02d}-{(today + timedelta(days=d)).day:02d}",
+              "description": f"Event {d}"} for d in range(100, 300, 5)]
+    dates.append({"date": f"{soon.month:02d}-{soon.day:02d}", "description": "Soon"})
+
+    lines = ContactContextBuilder(token_budget=12).build(
+        {"important_dates": dates}, HEADER, field_names=("important_dates",))
+
+    assert lines[1].startswith("Important dates: ")
+    assert "Soon" in lines[1]
+
+
+def test_leftover_budget_goes_to_fields_in_priority_order():
+    contact = {"interests": [f"interest {i:02d}" for i in range(100)], "family_details": "Two kids."}
+
+    lines = ContactContextBuilder(token_budget=100).build(
+        contact, HEADER, field_names=("interests", "family_details"))
+
+    interests = lines[1][len("Known interests: "):].split(", ")
+    # Well past the 20% share interests get before leftovers are shared out
+    assert len(", ".join(interests)) > 0.2 * 100 * CHARS_PER_TOKEN
+    assert lines[2] == "Family details: Two kids."
@@ -0,0 +1,121 @@
+"""Token-bucket rate limiting of the model-backed endpoints (services/rateLimiter.py)."""
+import pytest
+
+from services import rateLimiter
+from services.rateLimiter import RateLimiter, RateLimitExceeded
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def monotonic(self) -> float:
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = FakeClock()
+    monkeypatch.setattr(rateLimiter, "time", clock)
+    return clock
+
+
+def _limiter(**kwargs) -> RateLimiter:
+    settings = dict(enabled=True, user_per_minute=60, user_burst=2, contact_per_minute=600, contact_burst=100,
+                    global_per_second=100, global_burst=100, max_keys=100)
+    settings.update(kwargs)
+    return RateLimiter(**settings)
+
+
+def test_burst_then_limited(clock):
+    limiter = _limiter()
+    limiter.check("ann")
+    limiter.check("ann")
+
+    with pytest.raises(RateLimitExceeded, match="user") as limited:
+        limiter.check("ann")
+
+    assert limited.value.status_code == 429
+    assert limited.value.retry_after == 1
+    assert limiter.stats()["limited"]["user"] == 1
+
+
+def test_tokens_refill_over_time(clock):
+    limiter = _limiter()
+    limiter.check("ann")
+    limiter.check("ann")
+
+    clock.now += 0.5
+    with pytest.raises(RateLimitExceeded):
+        limiter.check("ann")
+    clock.now += 0.5
+    limiter.check("ann")
+    # Refills stop at the burst size
+    clock.now += 3600
+    limiter.check("ann")
+    limiter.check("ann")
+    with pytest.raises(RateLimitExceeded):
+        limiter.check("ann")
+
+
+def test_users_have_separate_buckets(clock):
+    limiter = _limiter(user_burst=1)
+    limiter.check("ann")
+    limiter.check("bo")
+
+    with pytest.raises(RateLimitExceeded):
+        limiter.check("ann")
+
+
+def test_contact_and_global_limits(clock):
+    limiter = _limiter(user_burst=100, contact_per_minute=6, contact_burst=1, global_burst=3)
+    limiter.check("ann", "contact-1")
+    with pytest.raises(RateLimitExceeded, match="contact") as limited:
+        limiter.check("bo", "contact-1")
+    # The retry delay is that of the emptiest bucket: 10 seconds per contact token
+    assert limited.value.retry_after == 10
+
+    limiter.check("bo", "contact-2")
+    limiter.check("bo")
+    with pytest.raises(RateLimitExceeded, match="global"):
+        limiter.check("cy", "contact-3")
+
+
+def test_a_rejected_request_takes_no_tokens(clock):
+    limiter = _limiter(user_burst=1, contact_burst=1)
+    limiter.check("ann", "contact-1")
+    # Rejected by the contact bucket; bo's user token is left alone
+    with pytest.raises(RateLimitExceeded):
+        limiter.check("bo", "contact-1")
+
+    limiter.check("bo", "contact-2")
+    assert limiter.stats()["allowed"] == 2
+
+
+def test_least_recently_used_keys_are_dropped(clock):
+    limiter = _limiter(user_burst=1, max_keys=2)
+    limiter.check("ann")
+    limiter.check("bo")
+    limiter.check("cy")
+
+    # ann's empty bucket was dropped, so ann starts over with a full one
+    limiter.check("ann")
+    assert limiter.stats()["tracked_users"] == 2
+
+
+def test_disabled_limiter_lets_everything_through(clock):
+    limiter = _limiter(enabled=False, user_burst=1)
+    for _ in range(10):
+        limiter.check("ann", "contact-1")
+
+
+def test_user_header_is_only_used_when_trusted():
+    untrusted = _limiter(trust_user_header=False)
+    trusted = _limiter(trust_user_header=True)
+
+    assert untrusted.user_key("10.0.0.1", "alice") == untrusted.user_key("10.0.0.1", "mallory")
+    assert trusted.user_key("10.0.0.1", "alice") != trusted.user_key("10.0.0.1", "mallory")
+    assert trusted.user_key("10.0.0.1", None) == untrusted.user_key("10.0.0.1", "alice")
+    # A header can't pose as an address
+    assert trusted.user_key("10.0.0.1", "10.0.0.2") != trusted.user_key("10.0.0.2", None)
+    assert untrusted.user_key(None) == untrusted.user_key(None, "alice")
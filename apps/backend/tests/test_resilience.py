@@ -0,0 +1,132 @@
+"""Retries and circuit breaking for Gemini calls (services/resilience.py)."""
+import pytest
+
+from services import resilience
+from services.resilience import CLOSED, HALF_OPEN, OPEN, CircuitBreaker, CircuitOpen, RetryPolicy
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def monotonic(self) -> float:
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = FakeClock()
+    monkeypatch.setattr(resilience, "time", clock)
+    return clock
+
+
+def _fail(breaker: CircuitBreaker, times: int) -> None:
+    for _ in range(times):
+        breaker.record(False, breaker.allow())
+
+
+def test_opens_after_consecutive_failures(clock):
+    breaker = CircuitBreaker(failure_threshold=3, reset_seconds=30)
+    _fail(breaker, 2)
+    assert breaker.state == CLOSED
+
+    _fail(breaker, 1)
+
+    assert breaker.state == OPEN
+    with pytest.raises(CircuitOpen) as rejected:
+        breaker.allow()
+    assert rejected.value.status_code == 503
+    assert rejected.value.retry_after == 30
+    assert breaker.stats()["opened"] == 1
+    assert breaker.stats()["rejected"] == 1
+
+
+def test_a_success_resets_the_failure_count(clock):
+    breaker = CircuitBreaker(failure_threshold=3, reset_seconds=30)
+    _fail(breaker, 2)
+    breaker.record(True, breaker.allow())
+    _fail(breaker, 2)
+
+    assert breaker.state == CLOSED
+
+
+def test_outcomes_that_say_nothing_about_the_upstream_are_ignored(clock):
+    breaker = CircuitBreaker(failure_threshold=2, reset_seconds=30)
+    _fail(breaker, 1)
+    breaker.record(None, breaker.allow())
+
+    assert breaker.stats()["consecutive_failures"] == 1
+    assert breaker.state == CLOSED
+
+
+def test_half_open_after_the_reset_time(clock):
+    breaker = CircuitBreaker(failure_threshold=1, reset_seconds=30)
+    _fail(breaker, 1)
+
+    clock.now += 20
+    with pytest.raises(CircuitOpen) as rejected:
+        breaker.allow()
+    assert rejected.value.retry_after == 10
+
+    clock.now += 10
+    assert breaker.state == HALF_OPEN
+
+
+def test_successful_probe_closes_the_circuit(clock):
+    breaker = CircuitBreaker(failure_threshold=1, reset_seconds=30, half_open_probes=1)
+    _fail(breaker, 1)
+    clock.now += 30
+
+    probe = breaker.allow()
+    assert probe is True
+    # Only one probe at a time
+    with pytest.raises(CircuitOpen):
+        breaker.allow()
+    breaker.record(True, probe)
+
+    assert breaker.state == CLOSED
+    assert breaker.allow() is False
+
+
+def test_failed_probe_opens_the_circuit_again(clock):
+    breaker = CircuitBreaker(failure_threshold=5, reset_seconds=30, half_open_probes=2)
+    _fail(breaker, 5)
+    clock.now += 30
+
+    first, second = breaker.allow(), breaker.allow()
+    breaker.record(False, first)
+
+    assert breaker.state == OPEN
+    assert breaker.stats()["opened"] == 2
+    # The other probe's late success doesn't close the reopened circuit
+    breaker.record(True, second)
+    assert breaker.state == OPEN
+
+
+def test_a_probe_that_says_nothing_frees_its_place(clock):
+    breaker = CircuitBreaker(failure_threshold=1, reset_seconds=30, half_open_probes=1)
+    _fail(breaker, 1)
+    clock.now += 30
+
+    breaker.record(None, breaker.allow())
+
+    assert breaker.state == HALF_OPEN
+    assert breaker.allow() is True
+
+
+def test_retry_backoff_grows_and_is_capped(monkeypatch):
+    monkeypatch.setattr(resilience.random, "uniform", lambda low, high: high)
+    policy = RetryPolicy(max_attempts=10, base_seconds=0.5, max_backoff_seconds=3)
+
+    assert [policy.next_delay(attempt, remaining=100) for attempt in range(5)] == [0.5, 1.0, 2.0, 3, 3]
+    assert policy.stats()["retries"] == 5
+
+
+def test_retries_stop_at_the_attempt_limit_or_deadline(monkeypatch):
+    monkeypatch.setattr(resilience.random, "uniform", lambda low, high: high)
+    policy = RetryPolicy(max_attempts=3, base_seconds=1, max_backoff_seconds=8)
+
+    assert policy.next_delay(0, remaining=10) == 1
+    assert policy.next_delay(1, remaining=1.5) is None
+    assert policy.next_delay(2, remaining=100) is None
+    assert policy.stats()["exhausted"] == 2
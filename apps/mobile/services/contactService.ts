@@ -1,6 +1,6 @@
 import axios from 'axios';
 
-import { Contact, ContactCreate } from '~/types/contact';
+import { Contact, ContactCreate, ContactPage } from '~/types/contact';
 
 const API_URL = process.env.EXPO_PUBLIC_API_URL;
 
@@ -64,10 +64,18 @@ const createContact = async (contact: ContactCreate) => {
 
 const getContacts = async (): Promise<Contact[]> => {
   try {
-    const response = await api.get('/contacts');
+    // Follow the pagination cursor until every page has been fetched
+    const contacts: Contact[] = [];
+    let cursor: string | null = null;
+    do {
+      const response = await api.get<ContactPage>('/contacts', {
+        params: cursor ? { cursor } : undefined,
+      });
+      contacts.push(...response.data.contacts);
+      cursor = response.data.next_cursor;
+    } while (cursor);
 
-    // Return the complete contact objects directly
-    return response ? response.data : [];
+    return contacts;
   } catch (error) {
     console.error('Error fetching contacts:', error);
     return [];
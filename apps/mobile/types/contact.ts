@@ -34,4 +34,9 @@ interface Contact extends ContactBase {
 
 interface ContactCreate extends ContactBase {}
 
-export { Contact, ContactCreate };
+interface ContactPage {
+  contacts: Contact[];
+  next_cursor: string | null; // Pass back as `cursor` to fetch the next page
+}
+
+export { Contact, ContactCreate, ContactPage };